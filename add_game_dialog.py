@@ -4,20 +4,52 @@ from PyQt5.QtWidgets import (QApplication, QDialog, QVBoxLayout, QHBoxLayout, QG
                              QLabel, QLineEdit, QPushButton, QComboBox, QFileDialog,
                              QMessageBox)
 from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import os
+from rom_ident import identify_roms, fill_from_match
+from cores import core_registry
+from rom_source import rom_source_name, resolve_rom_source
+
+class RomIdentifyThread(QThread):
+    """Worker thread that lists a picked ROM's archive, hashes it and looks it up in the DAT index."""
+    done = pyqtSignal(str, object, object, str)
+
+    def __init__(self, rom_path, rom_index):
+        super().__init__()
+        self.rom_path = rom_path
+        self.rom_index = rom_index
+
+    def run(self):
+        source = info = None
+        try:
+            source = resolve_rom_source(self.rom_path)
+            if self.rom_index:
+                index, cache = self.rom_index
+                info, error = identify_roms([self.rom_path], index, cache)[self.rom_path]
+            else:
+                error = None
+        except (RuntimeError, OSError) as e:
+            error = str(e)
+        self.done.emit(self.rom_path, source, info, error or "")
+
 
 class AddGameDialog(QDialog):
-    def __init__(self, logic, eversd_path, parent=None):
+    # Identification threads still hashing after their dialog closed; kept referenced until they finish
+    _identify_threads = set()
+
+    def __init__(self, logic, eversd_path, parent=None, title_catalog=None, rom_index=None):
         super().__init__(parent)
         self.setWindowTitle("Add New Game Entry")
         self.setGeometry(150, 150, 700, 500)
         
         self.logic = logic
         self.eversd_path = eversd_path
+        self.title_catalog = title_catalog # Optional TitleCatalog for auto-filling metadata
+        self.rom_index = rom_index # Optional (HashIndex, DigestCache) for identifying ROMs by checksum
 
         # Store selected file paths
         self.rom_path = None
+        self.rom_source = None # RomSource of rom_path, so its archive is listed only once
         self.boxart_path = None
         self.banner_path = None
 
@@ -142,11 +174,73 @@ class AddGameDialog(QDialog):
         path, _ = QFileDialog.getOpenFileName(self, "Select ROM File")
         if path:
             self.rom_path = path
-            # Only set the title if the field is currently empty
-            if not self.title_input.text():
-                base_name = os.path.splitext(os.path.basename(path))[0]
-                self.title_input.setText(base_name)
+            self.rom_source = None
             self.rom_label.setText(os.path.basename(path))
+            # Listing a big archive or hashing a CD-sized ROM takes seconds; keep the dialog responsive
+            self.status_label.setText("Status: Identifying ROM..." if self.rom_index else "Status: Reading ROM...")
+            thread = RomIdentifyThread(path, self.rom_index)
+            thread.done.connect(self.on_rom_identified)
+            thread.finished.connect(lambda: AddGameDialog._identify_threads.discard(thread))
+            AddGameDialog._identify_threads.add(thread)
+            thread.start()
+
+    def on_rom_identified(self, rom_path, source, info, error):
+        if rom_path != self.rom_path:
+            return # The user picked another ROM meanwhile
+        self.rom_source = source
+        self.status_label.setText("Status: Ready")
+        if error:
+            # Unreadable archives shouldn't take the dialog down; the copy will report them again
+            self.status_label.setText(f"Status: Could not read ROM: {error}")
+        self.finish_rom_selection(rom_path, info)
+
+    def finish_rom_selection(self, path, info):
+        """Fills the form for a picked ROM once its identification (if any) is known."""
+        try:
+            self.fill_from_catalogs(path, info)
+            self.select_default_core(self.rom_source or path)
+        except (RuntimeError, OSError) as e:
+            self.status_label.setText(f"Status: Could not read ROM: {e}")
+        # Only set the title if the field is currently empty
+        if not self.title_input.text():
+            base_name = os.path.splitext(os.path.basename(path))[0]
+            self.title_input.setText(base_name)
+
+    def select_default_core(self, rom_source):
+        """Selects the installed core that runs this ROM's extension or platform, if there is one."""
+        core = core_registry.default_core(self.eversd_path, rom_source_name(rom_source), self.platform_input.text())
+        index = self.emulator_select.findText(core) if core else -1
+        if index >= 0:
+            self.emulator_select.setCurrentIndex(index)
+
+    def fill_from_catalogs(self, rom_path, info=None):
+        """
+        Fills the empty form fields for a ROM: first from its checksum match
+        (info, from identify_roms), then from the best title catalog match.
+        """
+        if not self.title_catalog and not info:
+            return
+        fields = {
+            "title": self.title_input,
+            "platform": self.platform_input,
+            "genre": self.genre_input,
+            "publisher": self.publisher_input,
+            "developer": self.developer_input,
+            "release_date": self.release_date_input,
+        }
+        data = {field: widget.text() for field, widget in fields.items()}
+        identified = fill_from_match(data, info)
+        # An identified ROM's title is exact, so match on it rather than the filename
+        name = data["title"] if identified else rom_path
+        score = self.title_catalog.fill(data, name=name) if self.title_catalog else 0.0
+        if identified:
+            score = 1.0
+        if not score:
+            self.status_label.setText("Status: No catalog match for this ROM.")
+            return
+        for field, widget in fields.items():
+            widget.setText(data[field])
+        self.status_label.setText(f"Status: Matched '{data['title']}' ({score:.0%}).")
 
     def select_boxart(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select Boxart Image", "", "Image Files (*.png *.jpg *.bmp)")
@@ -183,6 +277,7 @@ class AddGameDialog(QDialog):
             "release_date": self.release_date_input.text(),
             "emulator": self.emulator_select.currentText(),
             "rom_path": self.rom_path,
+            "rom_source": self.rom_source,
             "boxart_path": self.boxart_path,
             "banner_path": self.banner_path,
         }
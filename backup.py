@@ -0,0 +1,296 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from catalog import card_identity
+from cores import core_registry
+from integrity import is_ignored_file
+from utils import data_dir, IMAGE_SUFFIXES
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BLOCK_SIZE = 4 * 1024 * 1024 # Compressed independently, so workers can run in parallel
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def default_backup_dir(eversd_path):
+    """Returns a per-card backup folder under the XDG data directory."""
+    card_name = re.sub(r'[^A-Za-z0-9._-]+', '_', card_identity(eversd_path)).strip("_")
+    return data_dir("backups", card_name)
+
+
+def archive_extension():
+    """Returns the archive extension used for new backups: .tar.zst when zstandard is installed."""
+    return ".tar.zst" if zstandard else ".tar.gz"
+
+
+class ParallelCompressedWriter:
+    """
+    File-like sink that cuts a byte stream into blocks and compresses
+    them on worker threads, writing the results in order. Both gzip
+    members and zstd frames may be concatenated, so the output is one
+    ordinary .gz/.zst stream. zlib and zstd release the GIL while working.
+    """
+
+    def __init__(self, fileobj, use_zstd, workers=None, level=None):
+        self.fileobj = fileobj
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        if use_zstd:
+            # ZstdCompressor instances aren't thread-safe; give each block its own
+            self.compress = lambda block: zstandard.ZstdCompressor(level=level or 3).compress(block)
+        else:
+            self.compress = lambda block: gzip.compress(block, compresslevel=level or 6)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.pending = deque()
+        self.buffer = bytearray()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_in += len(data)
+        while len(self.buffer) >= BLOCK_SIZE:
+            self._submit(bytes(self.buffer[:BLOCK_SIZE]))
+            del self.buffer[:BLOCK_SIZE]
+        return len(data)
+
+    def _submit(self, block):
+        self.pending.append(self.executor.submit(self.compress, block))
+        # Bound memory: don't let the reader run far ahead of the compressors
+        while len(self.pending) > 2 * self.workers:
+            self._write_next()
+
+    def _write_next(self):
+        compressed = self.pending.popleft().result()
+        self.fileobj.write(compressed)
+        self.bytes_out += len(compressed)
+
+    def close(self):
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        while self.pending:
+            self._write_next()
+        self.executor.shutdown()
+
+
+def _open_archive_reader(archive_path):
+    """Opens a backup archive as a streaming tarfile."""
+    if archive_path.endswith(".zst"):
+        if not zstandard:
+            raise RuntimeError("Restoring a .tar.zst backup needs the 'zstandard' package.")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(archive_path, 'rb'), read_across_frames=True)
+        return tarfile.open(fileobj=stream, mode="r|")
+    # GzipFile reads across the concatenated members; tarfile's own "r|gz" stops after the first
+    return tarfile.open(fileobj=gzip.open(archive_path, 'rb'), mode="r|")
+
+
+def _game_of(file_name, rom_owners):
+    """Returns the base name a file in 'game' belongs to, or None."""
+    if file_name.endswith(".json"):
+        return file_name[:-len(".json")]
+    if file_name in rom_owners:
+        return rom_owners[file_name]
+    for suffix in IMAGE_SUFFIXES:
+        if file_name.endswith(suffix) and len(file_name) > len(suffix):
+            return file_name[:-len(suffix)]
+    return None
+
+
+def collect_card_files(eversd_path):
+    """
+    Lists what a backup covers: every file in 'game' and the .so cores in
+    the root. Returns {relative_path: {"size", "mtime", "game"}}.
+    """
+    files = {}
+    game_path = os.path.join(eversd_path, 'game')
+    if os.path.isdir(game_path):
+        stats = {}
+        with os.scandir(game_path) as it:
+            for entry in it:
+                # Journal staging and other temp files are never part of a backup
+                if entry.is_file() and not is_ignored_file(entry.name):
+                    stats[entry.name] = entry.stat()
+        rom_owners = {}
+        for name in stats:
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(game_path, name), 'r') as f:
+                        rom_owners[json.load(f).get("romFileName")] = name[:-len(".json")]
+                except (json.JSONDecodeError, IOError, AttributeError):
+                    pass
+        for name, st in stats.items():
+            files[f"game/{name}"] = {"size": st.st_size, "mtime": st.st_mtime, "game": _game_of(name, rom_owners)}
+    for core in core_registry.cores(eversd_path):
+        st = os.stat(os.path.join(eversd_path, core))
+        files[core] = {"size": st.st_size, "mtime": st.st_mtime, "game": None}
+    return files
+
+
+def latest_manifest(backup_dir):
+    """Returns the path of the newest manifest in backup_dir, or None."""
+    if not os.path.isdir(backup_dir):
+        return None
+    manifests = sorted(name for name in os.listdir(backup_dir) if name.endswith(MANIFEST_SUFFIX))
+    return os.path.join(backup_dir, manifests[-1]) if manifests else None
+
+
+def load_manifest(manifest_path):
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def _new_backup_stamp(backup_dir):
+    """Returns a timestamp for a new backup's file names, unique in backup_dir and sorting by time."""
+    now = time.time()
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+    candidate, counter = stamp, 0
+    while any(name.startswith(f"eversd-{candidate}.") for name in os.listdir(backup_dir)):
+        counter += 1
+        candidate = f"{stamp}-{counter}"
+    return candidate
+
+
+def backup_card(eversd_path, backup_dir, incremental=True, status_callback=None):
+    """
+    Streams the card's games and cores into a new archive in backup_dir.
+    Files are read one after another in a single pass while compression
+    runs on worker threads. With incremental, files whose size and mtime
+    match the previous manifest are not stored again; the new manifest
+    points at the archive that holds each one. Returns (manifest_path, stats).
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    previous_path = latest_manifest(backup_dir) if incremental else None
+    previous = load_manifest(previous_path)["files"] if previous_path else {}
+
+    stamp = _new_backup_stamp(backup_dir)
+    archive_name = f"eversd-{stamp}{archive_extension()}"
+    archive_path = os.path.join(backup_dir, archive_name)
+    files = collect_card_files(eversd_path)
+
+    to_store = []
+    for rel_path, info in sorted(files.items()):
+        old = previous.get(rel_path)
+        if old and (old["size"], old["mtime"]) == (info["size"], info["mtime"]) \
+                and os.path.exists(os.path.join(backup_dir, old["archive"])):
+            info["archive"] = old["archive"]
+        else:
+            info["archive"] = archive_name
+            to_store.append(rel_path)
+
+    stats = {"stored": len(to_store), "skipped": len(files) - len(to_store), "bytes_in": 0, "bytes_out": 0}
+    if to_store:
+        temp_path = f"{archive_path}.tmp"
+        try:
+            with open(temp_path, 'wb') as raw:
+                writer = ParallelCompressedWriter(raw, use_zstd=archive_name.endswith(".zst"))
+                try:
+                    with tarfile.open(fileobj=writer, mode="w|") as tar:
+                        for i, rel_path in enumerate(to_store, start=1):
+                            tar.add(os.path.join(eversd_path, rel_path), arcname=rel_path, recursive=False)
+                            if status_callback and (i % 50 == 0 or i == len(to_store)):
+                                status_callback(f"Backed up {i}/{len(to_store)} files...")
+                    writer.close()
+                finally:
+                    # Stops the compression workers if a file couldn't be read
+                    writer.executor.shutdown(cancel_futures=True)
+                stats["bytes_in"], stats["bytes_out"] = writer.bytes_in, writer.bytes_out
+            os.replace(temp_path, archive_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    manifest_path = os.path.join(backup_dir, f"eversd-{stamp}{MANIFEST_SUFFIX}")
+    manifest = {"created": time.time(), "source": os.path.realpath(eversd_path),
+                "archive": archive_name if to_store else None, "files": files}
+    with open(f"{manifest_path}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    if status_callback:
+        status_callback(f"Backup complete: {stats['stored']} file(s) stored, {stats['skipped']} unchanged.")
+    return manifest_path, stats
+
+
+def manifest_games(manifest):
+    """Returns the sorted base names of the games in a manifest."""
+    return sorted({info["game"] for info in manifest["files"].values() if info["game"]})
+
+
+def restore_backup(manifest_path, eversd_path, base_names=None, include_cores=None, status_callback=None):
+    """
+    Restores files recorded in a manifest onto a card. With base_names,
+    only those games' JSONs, ROMs and images are restored; cores are
+    restored on a full restore unless include_cores says otherwise. Each
+    archive involved is read once, front to back. Returns (restored, errors).
+    """
+    manifest = load_manifest(manifest_path)
+    backup_dir = os.path.dirname(manifest_path)
+    wanted_games = set(base_names) if base_names is not None else None
+    if include_cores is None:
+        include_cores = wanted_games is None
+
+    by_archive = {}
+    for rel_path, info in manifest["files"].items():
+        if info["game"] is None and "/" not in rel_path:
+            if not include_cores:
+                continue
+        elif wanted_games is not None and info["game"] not in wanted_games:
+            continue
+        by_archive.setdefault(info["archive"], {})[rel_path] = info
+
+    restored, errors = 0, []
+    for archive_name, wanted in sorted(by_archive.items()):
+        archive_path = os.path.join(backup_dir, archive_name)
+        try:
+            with _open_archive_reader(archive_path) as tar:
+                for member in tar:
+                    info = wanted.pop(member.name, None)
+                    if info is None or not member.isfile():
+                        continue
+                    dest = os.path.join(eversd_path, member.name)
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    with tar.extractfile(member) as src, open(f"{dest}.tmp", 'wb') as out:
+                        shutil.copyfileobj(src, out, 1024 * 1024)
+                    os.replace(f"{dest}.tmp", dest)
+                    # Keep the recorded mtime so the next incremental backup sees the file as unchanged
+                    os.utime(dest, (info["mtime"], info["mtime"]))
+                    restored += 1
+                    if status_callback:
+                        status_callback(f"Restored {member.name}")
+                    if not wanted:
+                        break
+        except (OSError, tarfile.TarError, RuntimeError) as e:
+            errors.append(f"{archive_name}: {e}")
+            continue
+        errors.extend(f"{rel_path}: not found in {archive_name}" for rel_path in wanted)
+    return restored, errors
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 4 or sys.argv[1] not in ("backup", "restore"):
+        print("Usage: python3 backup.py backup <eversd_path> <backup_dir> [--full]\n"
+              "       python3 backup.py restore <manifest> <eversd_path> [base_name ...]")
+        sys.exit(1)
+    start = time.perf_counter()
+    if sys.argv[1] == "backup":
+        manifest_path, stats = backup_card(sys.argv[2], sys.argv[3], "--full" not in sys.argv[4:], print)
+        print(f"{stats['bytes_in'] / (1024 * 1024):.1f} MB -> {stats['bytes_out'] / (1024 * 1024):.1f} MB, "
+              f"manifest {manifest_path}")
+    else:
+        restored, errors = restore_backup(sys.argv[2], sys.argv[3], sys.argv[4:] or None)
+        print(f"Restored {restored} file(s).")
+        for error in errors:
+            print(f"Error: {error}")
+    print(f"Done in {time.perf_counter() - start:.2f}s.")
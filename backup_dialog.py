@@ -0,0 +1,167 @@
+
+import os
+import sys
+from PyQt5.QtWidgets import (QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
+                             QPushButton, QListWidget, QAbstractItemView, QCheckBox, QFileDialog,
+                             QMessageBox)
+from PyQt5.QtCore import QThread, pyqtSignal
+from backup import (backup_card, restore_backup, latest_manifest, load_manifest, manifest_games,
+                    default_backup_dir)
+
+class BackupThread(QThread):
+    """Worker thread that backs up a card or restores games onto it."""
+    progress = pyqtSignal(str)
+    done = pyqtSignal(str, list)
+
+    def __init__(self, eversd_path, backup_dir, incremental=True, manifest_path=None, base_names=None):
+        super().__init__()
+        self.eversd_path = eversd_path
+        self.backup_dir = backup_dir
+        self.incremental = incremental
+        self.manifest_path = manifest_path # Set to restore instead of back up
+        self.base_names = base_names
+
+    def run(self):
+        try:
+            if self.manifest_path is None:
+                _, stats = backup_card(self.eversd_path, self.backup_dir, self.incremental, self.progress.emit)
+                message = (f"Backed up {stats['stored']} file(s) ({stats['bytes_out'] / (1024 * 1024):.1f} MB "
+                           f"compressed), {stats['skipped']} unchanged.")
+                self.done.emit(message, [])
+            else:
+                restored, errors = restore_backup(self.manifest_path, self.eversd_path, self.base_names,
+                                                  status_callback=self.progress.emit)
+                self.done.emit(f"Restored {restored} file(s).", errors)
+        except Exception as e:
+            print(f"Backup operation failed: {e}")
+            self.done.emit(f"Failed: {e}", [str(e)])
+
+
+class BackupDialog(QDialog):
+    def __init__(self, eversd_path, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Back Up and Restore")
+        self.setGeometry(150, 150, 600, 500)
+
+        self.eversd_path = eversd_path
+        self.worker = None
+
+        self.initUI()
+        self.connect_signals()
+        self.load_backup_games()
+
+    def initUI(self):
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+
+        folder_layout = QHBoxLayout()
+        main_layout.addLayout(folder_layout)
+        folder_layout.addWidget(QLabel("Backup folder:"))
+        self.folder_input = QLineEdit(default_backup_dir(self.eversd_path))
+        self.browse_button = QPushButton("Browse...")
+        folder_layout.addWidget(self.folder_input)
+        folder_layout.addWidget(self.browse_button)
+
+        self.incremental_checkbox = QCheckBox("Only store files changed since the last backup")
+        self.incremental_checkbox.setChecked(True)
+        main_layout.addWidget(self.incremental_checkbox)
+
+        self.backup_label = QLabel("No backup yet.")
+        main_layout.addWidget(self.backup_label)
+        self.game_list = QListWidget()
+        self.game_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        main_layout.addWidget(self.game_list)
+
+        action_layout = QHBoxLayout()
+        main_layout.addLayout(action_layout)
+        self.backup_button = QPushButton("Back Up Now")
+        self.restore_selected_button = QPushButton("Restore Selected")
+        self.restore_all_button = QPushButton("Restore All")
+        self.close_button = QPushButton("Close")
+        self.status_label = QLabel("Status: Ready")
+        action_layout.addWidget(self.backup_button)
+        action_layout.addWidget(self.restore_selected_button)
+        action_layout.addWidget(self.restore_all_button)
+        action_layout.addStretch()
+        action_layout.addWidget(self.close_button)
+        main_layout.addWidget(self.status_label)
+
+    def connect_signals(self):
+        self.browse_button.clicked.connect(self.select_folder)
+        self.folder_input.editingFinished.connect(self.load_backup_games)
+        self.backup_button.clicked.connect(self.start_backup)
+        self.restore_selected_button.clicked.connect(lambda: self.start_restore(selected_only=True))
+        self.restore_all_button.clicked.connect(lambda: self.start_restore(selected_only=False))
+        self.close_button.clicked.connect(self.reject)
+
+    def select_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Backup Folder", self.folder_input.text())
+        if folder:
+            self.folder_input.setText(folder)
+            self.load_backup_games()
+
+    def load_backup_games(self):
+        self.game_list.clear()
+        self.manifest_path = latest_manifest(self.folder_input.text())
+        if not self.manifest_path:
+            self.backup_label.setText("No backup yet.")
+        else:
+            try:
+                games = manifest_games(load_manifest(self.manifest_path))
+            except (OSError, ValueError) as e:
+                self.manifest_path = None
+                self.backup_label.setText(f"Could not read the latest backup: {e}")
+            else:
+                self.game_list.addItems(games)
+                self.backup_label.setText(f"Latest backup: {os.path.basename(self.manifest_path)} ({len(games)} games)")
+        self.set_busy(False)
+
+    def set_busy(self, busy, message=None):
+        self.backup_button.setEnabled(not busy)
+        self.restore_selected_button.setEnabled(not busy and bool(self.manifest_path))
+        self.restore_all_button.setEnabled(not busy and bool(self.manifest_path))
+        if message:
+            self.status_label.setText(f"Status: {message}")
+
+    def start_backup(self):
+        self.start_worker(BackupThread(self.eversd_path, self.folder_input.text(),
+                                       self.incremental_checkbox.isChecked()), "Backing up...")
+
+    def start_restore(self, selected_only):
+        base_names = [item.text() for item in self.game_list.selectedItems()] if selected_only else None
+        if selected_only and not base_names:
+            QMessageBox.warning(self, "No Selection", "Please select the games to restore.")
+            return
+        what = f"{len(base_names)} game(s)" if base_names else "every game and core"
+        reply = QMessageBox.question(self, 'Confirm Restore', f"Overwrite {what} on the card with the backed up files?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        self.start_worker(BackupThread(self.eversd_path, self.folder_input.text(), manifest_path=self.manifest_path,
+                                       base_names=base_names), "Restoring...")
+
+    def start_worker(self, worker, message):
+        self.set_busy(True, message)
+        self.worker = worker
+        self.worker.progress.connect(lambda text: self.status_label.setText(f"Status: {text}"))
+        self.worker.done.connect(self.on_done)
+        self.worker.start()
+
+    def on_done(self, message, errors):
+        if errors:
+            QMessageBox.warning(self, "Errors", "\n".join(errors[:20]))
+        self.load_backup_games()
+        self.status_label.setText(f"Status: {message}")
+
+    def reject(self):
+        # Don't abandon the card halfway through a restore
+        if self.worker and self.worker.isRunning():
+            QMessageBox.warning(self, "Operation Running", "Please wait for the current operation to finish.")
+            return
+        super().reject()
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    dialog = BackupDialog(sys.argv[1] if len(sys.argv) > 1 else ".")
+    dialog.exec_()
+    sys.exit()
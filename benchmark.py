@@ -0,0 +1,242 @@
+"""
+Headless benchmarks for the logic and image hot paths.
+
+Generates synthetic EverSD cards in a temporary directory, times the
+EverSDLogic operations and utils.resize_image against them, times
+resize_image on typical image-search result sizes, and writes the
+results as JSON so runs can be compared for regressions.
+
+    python3 benchmark.py --counts 100 1000 --output bench.json
+    python3 benchmark.py --counts 100 1000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from PIL import Image, ImageOps
+from logic import EverSDLogic
+from utils import resize_image, BOXART_SIZE, BANNER_SIZE, IMAGE_NAME_SUFFIXES
+
+DEFAULT_COUNTS = [100, 1000, 10000]
+
+# Typical sizes of images returned by a DuckDuckGo box art / banner search.
+SEARCH_IMAGE_SIZES = {
+    "boxart_small_jpg": ((300, 420), "jpg"),
+    "boxart_medium_jpg": ((640, 900), "jpg"),
+    "boxart_large_jpg": ((1500, 2100), "jpg"),
+    "boxart_exact_png": (BOXART_SIZE, "png"),
+    "banner_wide_jpg": ((1920, 1080), "jpg"),
+    "banner_large_jpg": ((3840, 1100), "jpg"),
+    "banner_exact_png": (BANNER_SIZE, "png"),
+}
+
+
+def make_source_image(path, size):
+    """Writes a gradient test image so the encoder has real data to work with."""
+    gradient = Image.linear_gradient("L").resize(size)
+    Image.merge("RGB", (gradient, ImageOps.flip(gradient), ImageOps.mirror(gradient))).save(path)
+    return path
+
+
+def generate_card(root, game_count, description_size=512, rom_size=16 * 1024, with_images=True):
+    """Creates a synthetic EverSD root with game_count games and returns its path."""
+    game_path = os.path.join(root, "game")
+    os.makedirs(game_path, exist_ok=True)
+    rom_data = os.urandom(rom_size)
+
+    boxart_template = banner_template = None
+    if with_images:
+        boxart_template = make_source_image(os.path.join(root, "boxart_template.png"), BOXART_SIZE)
+        banner_template = make_source_image(os.path.join(root, "banner_template.png"), BANNER_SIZE)
+
+    for i in range(game_count):
+        base_name = f"benchgame{i:05d}"
+        metadata = {
+            "romFileName": f"{base_name}.gb",
+            "romTitle": f"Bench Game {i}",
+            "romCore": "gambatte_libretro.so",
+            "romLaunchType": "NULL",
+            "romPlatform": "Game Boy",
+            "romGenre": "Action",
+            "romReleaseDate": "1990",
+            "romPlayers": 1,
+            "romDescription": "x" * description_size,
+            "romPublisher": "Bench",
+            "romDeveloper": "Bench",
+            "romMapping": {
+                "a": "NULL", "b": "NULL", "x": "NULL", "y": "NULL",
+                "dpad": "NULL", "select": "NULL", "start": "NULL",
+                "l1": "NULL", "l2": "NULL", "r1": "NULL", "r2": "NULL"
+            }
+        }
+        with open(os.path.join(game_path, f"{base_name}.json"), "w") as f:
+            json.dump(metadata, f, indent=4)
+        with open(os.path.join(game_path, f"{base_name}.gb"), "wb") as f:
+            f.write(rom_data)
+        if with_images:
+            templates = {"boxart": boxart_template, "banner": banner_template}
+            for kind, suffixes in IMAGE_NAME_SUFFIXES.items():
+                for suffix in suffixes:
+                    shutil.copy(templates[kind], os.path.join(game_path, f"{base_name}{suffix}"))
+    return root
+
+
+def time_runs(func, repeat):
+    """Calls func repeat times and returns timing stats in milliseconds."""
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": repeat,
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def bench_card(game_count, args, work_dir):
+    """Runs every benchmark against one synthetic card."""
+    root = generate_card(os.path.join(work_dir, f"card_{game_count}"), game_count,
+                         description_size=args.description_size, rom_size=args.rom_size,
+                         with_images=not args.no_images)
+    logic = EverSDLogic()
+    sources = os.path.join(work_dir, f"sources_{game_count}")
+    os.makedirs(sources, exist_ok=True)
+    rom_source = os.path.join(sources, "source.gb")
+    with open(rom_source, "wb") as f:
+        f.write(os.urandom(args.rom_size))
+    boxart_source = make_source_image(os.path.join(sources, "boxart.jpg"), tuple(args.source_image_size))
+    banner_source = make_source_image(os.path.join(sources, "banner.jpg"), tuple(args.source_image_size))
+
+    sample = [f"benchgame{i:05d}" for i in range(min(game_count, args.repeat))]
+    results = {}
+
+    results["scan_for_games"] = time_runs(lambda i: logic.scan_for_games(root), args.repeat)
+    results["get_game_details"] = time_runs(
+        lambda i: logic.get_game_details(root, sample[i % len(sample)]), args.repeat)
+
+    # A failed operation would time a no-op, so stop the run instead
+    def create(i):
+        success, _ = logic.create_game_entry({
+            "eversd_path": root, "title": f"Created Game {i}", "rom_path": rom_source,
+            "boxart_path": boxart_source, "banner_path": banner_source,
+        })
+        if not success:
+            raise RuntimeError(f"create_game_entry failed for 'Created Game {i}'")
+    results["create_game_entry"] = time_runs(create, args.repeat)
+
+    def update(i):
+        # Same title, so the game is rewritten in place rather than renamed
+        success, _ = logic.update_game_entry({
+            "eversd_path": root, "original_base_name": f"createdgame{i}", "title": f"Created Game {i}",
+            "description": f"Updated {i}",
+            "rom_path": rom_source, "boxart_path": boxart_source, "banner_path": banner_source,
+        })
+        if not success:
+            raise RuntimeError(f"update_game_entry failed for 'createdgame{i}'")
+    results["update_game_entry"] = time_runs(update, args.repeat)
+
+    def delete(i):
+        if not logic.delete_game(root, f"createdgame{i}"):
+            raise RuntimeError(f"delete_game failed for 'createdgame{i}'")
+    results["delete_game"] = time_runs(delete, args.repeat)
+
+    out = os.path.join(sources, "out.png")
+    results["resize_image_boxart"] = time_runs(lambda i: resize_image(boxart_source, out, BOXART_SIZE), args.repeat)
+    results["resize_image_banner"] = time_runs(lambda i: resize_image(banner_source, out, BANNER_SIZE), args.repeat)
+
+    shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def bench_resize(args, work_dir):
+    """Times resize_image on typical search-result images for both output sizes."""
+    sources = os.path.join(work_dir, "resize_sources")
+    os.makedirs(sources, exist_ok=True)
+    out = os.path.join(sources, "out.png")
+    results = {}
+    for label, (size, extension) in SEARCH_IMAGE_SIZES.items():
+        source = make_source_image(os.path.join(sources, f"{label}.{extension}"), size)
+        target = BOXART_SIZE if label.startswith("boxart") else BANNER_SIZE
+        results[label] = time_runs(lambda i: resize_image(source, out, target), args.repeat)
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    """Prints the median change against a baseline run and returns True if nothing regressed."""
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    # Baselines saved before the resize suite was added keep their results under "cards"
+    baseline_suites = baseline.get("suites") or baseline.get("cards") or {}
+    ok = True
+    for count, benches in results["suites"].items():
+        for name, stats in benches.items():
+            old = baseline_suites.get(count, {}).get(name)
+            if not old or not old["median_ms"]:
+                print(f"{count:>6} {name:<22} {stats['median_ms']:>10.3f} ms  (no baseline)")
+                continue
+            change = (stats["median_ms"] - old["median_ms"]) / old["median_ms"] * 100
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                ok = False
+            print(f"{count:>6} {name:<22} {stats['median_ms']:>10.3f} ms  {change:+7.1f}%{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EverSD Manager hot paths on synthetic cards.")
+    parser.add_argument("--counts", type=int, nargs="+", default=DEFAULT_COUNTS, help="Game counts per synthetic card.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark.")
+    parser.add_argument("--description-size", type=int, default=512, help="Characters of romDescription per JSON.")
+    parser.add_argument("--rom-size", type=int, default=16 * 1024, help="Bytes per synthetic ROM.")
+    parser.add_argument("--source-image-size", type=int, nargs=2, default=[1200, 1600], metavar=("W", "H"),
+                        help="Size of the source images fed to resize_image.")
+    parser.add_argument("--no-images", action="store_true", help="Don't generate image files on the synthetic cards.")
+    parser.add_argument("--skip-resize", action="store_true", help="Skip the search-result resize benchmarks.")
+    parser.add_argument("--work-dir", help="Where to build the synthetic cards (defaults to a temp dir).")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--compare", help="Compare against a previous JSON results file.")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown counted as a regression.")
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "suites": {},
+    }
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="eversd_bench_")
+    try:
+        for count in args.counts:
+            print(f"Benchmarking a card with {count} games...")
+            results["suites"][str(count)] = bench_card(count, args, work_dir)
+        if not args.skip_resize:
+            print("Benchmarking resize_image on search-sized images...")
+            results["suites"]["resize"] = bench_resize(args, work_dir)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Wrote results to {args.output}")
+
+    if args.compare:
+        return 0 if compare(results, args.compare, args.threshold) else 1
+
+    for count, benches in results["suites"].items():
+        for name, stats in benches.items():
+            print(f"{count:>6} {name:<22} {stats['median_ms']:>10.3f} ms")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
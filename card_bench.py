@@ -0,0 +1,214 @@
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from catalog import card_identity
+from utils import atomic_write, data_dir
+
+BENCH_DIR = ".eversd_bench" # Scratch folder in the card root, removed after each run
+
+BIG_FILE_SIZE = 32 * 1024 * 1024 # Stands in for a ROM
+CHUNK_SIZES = (64 * 1024, 1024 * 1024, 4 * 1024 * 1024) # Copy buffer sizes to choose between
+WORKER_COUNTS = (1, 2, 4) # Small-file write concurrency to choose between
+
+# One game's worth of small files, as this app writes them: JSON, two boxarts and a banner
+GAME_FILE_SIZES = (2 * 1024, 250 * 1024, 250 * 1024, 600 * 1024)
+SMALL_GAMES = 16
+
+# Used until a card has been benchmarked
+DEFAULT_SETTINGS = {"write_rate": None, "copy_chunk_size": 1024 * 1024, "small_file_workers": 4}
+
+_profiles = None
+_profiles_lock = threading.Lock()
+
+
+def default_profiles_path():
+    """Returns the card benchmark results file under the XDG data directory."""
+    return data_dir("card_profiles.json")
+
+
+def _load_profiles():
+    global _profiles
+    with _profiles_lock:
+        if _profiles is None:
+            try:
+                with open(default_profiles_path(), 'r') as f:
+                    _profiles = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                _profiles = {}
+        return _profiles
+
+
+def load_card_profile(eversd_path):
+    """Returns the stored benchmark results of the card at eversd_path, or None."""
+    return _load_profiles().get(card_identity(eversd_path))
+
+
+def save_card_profile(eversd_path, profile):
+    profiles = _load_profiles()
+    with _profiles_lock:
+        profiles[card_identity(eversd_path)] = profile
+        path = default_profiles_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, json.dumps(profiles, indent=1))
+
+
+def record_write_rate(eversd_path, write_rate):
+    """
+    Stores the write rate a real operation achieved on a card, so time
+    estimates on later runs use it until the card is benchmarked again.
+    """
+    profile = dict(load_card_profile(eversd_path) or {})
+    profile["write_rate"] = write_rate
+    profile["write_rate_observed"] = time.time()
+    try:
+        save_card_profile(eversd_path, profile)
+    except OSError as e:
+        print(f"Could not save card profile: {e}")
+
+
+def card_settings(eversd_path):
+    """
+    Returns the I/O settings to use for a card: write_rate (bytes/second,
+    or None if unmeasured), copy_chunk_size and small_file_workers.
+    """
+    profile = load_card_profile(eversd_path)
+    if not profile:
+        return dict(DEFAULT_SETTINGS)
+    return {key: profile.get(key, default) for key, default in DEFAULT_SETTINGS.items()}
+
+
+def _drop_cache(path):
+    """Evicts a written file from the page cache so reading it back actually hits the card."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def _write_file(path, size, chunk_size, block):
+    """Writes size bytes in chunk_size writes and fsyncs. Returns seconds spent in fsync."""
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            count = min(chunk_size, remaining)
+            f.write(block[:count])
+            remaining -= count
+        f.flush()
+        start = time.perf_counter()
+        os.fsync(f.fileno())
+        return time.perf_counter() - start
+
+
+def _read_file(path, chunk_size):
+    with open(path, 'rb', buffering=0) as f:
+        while f.read(chunk_size):
+            pass
+
+
+def _write_games(bench_path, workers, block):
+    """Writes SMALL_GAMES games' worth of small files with a number of workers. Returns (seconds, fsync_seconds)."""
+    jobs = [(os.path.join(bench_path, f"small{workers}_{game}_{i}.bin"), size)
+            for game in range(SMALL_GAMES) for i, size in enumerate(GAME_FILE_SIZES)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fsync_times = list(executor.map(lambda job: _write_file(job[0], job[1], len(block), block), jobs))
+    return time.perf_counter() - start, sum(fsync_times)
+
+
+def run_card_benchmark(eversd_path, status_callback=None):
+    """
+    Measures a card in a scratch folder on it: sequential write at each
+    CHUNK_SIZES buffer, sequential read, and writing and reading many
+    small files like the JSONs and PNGs of a game, at each WORKER_COUNTS
+    concurrency. Every write is fsynced and reads bypass the page cache.
+    Stores and returns the profile, including the settings it picked.
+    """
+    def status(message):
+        if status_callback:
+            status_callback(message)
+
+    bench_path = os.path.join(eversd_path, BENCH_DIR)
+    shutil.rmtree(bench_path, ignore_errors=True)
+    os.makedirs(bench_path)
+    block = os.urandom(max(CHUNK_SIZES))
+    mb = 1024 * 1024
+    profile = {"measured": time.time(), "sequential_write": {}, "small_write": {}}
+    try:
+        big_path = os.path.join(bench_path, "big.bin")
+        for chunk_size in CHUNK_SIZES:
+            status(f"Sequential write, {chunk_size // 1024} KB buffer...")
+            start = time.perf_counter()
+            _write_file(big_path, BIG_FILE_SIZE, chunk_size, block)
+            profile["sequential_write"][str(chunk_size)] = BIG_FILE_SIZE / (time.perf_counter() - start)
+
+        best_chunk = max(CHUNK_SIZES, key=lambda size: profile["sequential_write"][str(size)])
+        status("Sequential read...")
+        _drop_cache(big_path)
+        start = time.perf_counter()
+        _read_file(big_path, best_chunk)
+        profile["sequential_read"] = BIG_FILE_SIZE / (time.perf_counter() - start)
+
+        small_bytes = SMALL_GAMES * sum(GAME_FILE_SIZES)
+        small_files = SMALL_GAMES * len(GAME_FILE_SIZES)
+        for workers in WORKER_COUNTS:
+            status(f"Small files, {workers} writer(s)...")
+            elapsed, fsync_time = _write_games(bench_path, workers, block)
+            profile["small_write"][str(workers)] = small_bytes / elapsed
+            if workers == 1:
+                profile["fsync_ms"] = fsync_time / small_files * 1000
+
+        status("Small file read...")
+        small_paths = [os.path.join(bench_path, name) for name in os.listdir(bench_path) if name.startswith("small1_")]
+        for path in small_paths:
+            _drop_cache(path)
+        start = time.perf_counter()
+        for path in small_paths:
+            _read_file(path, best_chunk)
+        profile["small_read"] = small_bytes / (time.perf_counter() - start)
+    finally:
+        shutil.rmtree(bench_path, ignore_errors=True)
+
+    profile["write_rate"] = profile["sequential_write"][str(best_chunk)]
+    profile["copy_chunk_size"] = best_chunk
+    # More writers only if they're clearly faster; on most readers they just make the card seek
+    best_workers = 1
+    for workers in WORKER_COUNTS[1:]:
+        if profile["small_write"][str(workers)] > 1.1 * profile["small_write"][str(best_workers)]:
+            best_workers = workers
+    profile["small_file_workers"] = best_workers
+    profile["small_file_penalty"] = profile["write_rate"] / profile["small_write"]["1"]
+    save_card_profile(eversd_path, profile)
+    status(f"Card writes {profile['write_rate'] / mb:.1f} MB/s sequential, "
+           f"{profile['small_write'][str(best_workers)] / mb:.1f} MB/s as small files; "
+           f"reads {profile['sequential_read'] / mb:.1f} MB/s.")
+    return profile
+
+
+def format_profile(profile):
+    """Returns a multi-line summary of a card profile for display."""
+    mb = 1024 * 1024
+    lines = [f"Sequential write ({int(size) // 1024} KB buffer): {rate / mb:.1f} MB/s"
+             for size, rate in profile["sequential_write"].items()]
+    lines.append(f"Sequential read: {profile['sequential_read'] / mb:.1f} MB/s")
+    lines += [f"Small files, {workers} writer(s): {rate / mb:.1f} MB/s"
+              for workers, rate in profile["small_write"].items()]
+    lines.append(f"Small file read: {profile['small_read'] / mb:.1f} MB/s")
+    lines.append(f"fsync: {profile['fsync_ms']:.1f} ms per file")
+    lines.append(f"Small files cost {profile['small_file_penalty']:.1f}x a single large file.")
+    lines.append(f"Chosen: {profile['copy_chunk_size'] // 1024} KB copy buffer, "
+                 f"{profile['small_file_workers']} image writer(s).")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) != 2:
+        print("Usage: python3 card_bench.py <eversd_path>")
+        sys.exit(1)
+    print(format_profile(run_card_benchmark(sys.argv[1], print)))
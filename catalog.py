@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from sd_detect import parse_mountinfo
+from utils import data_dir, make_thumbnail, BOXART_SUFFIXES, BANNER_SUFFIX
+
+THUMBNAIL_SIZES = {
+    "boxart": (200, 280), # Matches the main window's preview labels
+    "banner": (384, 110),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    card_id TEXT PRIMARY KEY,
+    last_path TEXT,
+    last_seen REAL
+);
+CREATE TABLE IF NOT EXISTS games (
+    card_id TEXT NOT NULL,
+    base_name TEXT NOT NULL,
+    title TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    json_mtime REAL,
+    json_size INTEGER,
+    rom_name TEXT,
+    rom_size INTEGER,
+    boxart_name TEXT,
+    boxart_stat TEXT,
+    boxart_hash TEXT,
+    boxart_thumb BLOB,
+    banner_name TEXT,
+    banner_stat TEXT,
+    banner_hash TEXT,
+    banner_thumb BLOB,
+    PRIMARY KEY (card_id, base_name)
+);
+"""
+
+
+def default_catalog_path():
+    """Returns the catalog location under the XDG data directory."""
+    return data_dir("catalog.sqlite")
+
+
+def card_identity(eversd_path):
+    """
+    Returns a stable identity for the card mounted at eversd_path: the
+    filesystem UUID when it can be found, otherwise the resolved path.
+    Only reads kernel tables, never the card itself.
+    """
+    real_path = os.path.realpath(eversd_path)
+    source = None
+    best_match = ""
+    for mount in parse_mountinfo():
+        mount_point = mount["mount_point"]
+        if (real_path == mount_point or real_path.startswith(mount_point.rstrip("/") + "/")) \
+                and len(mount_point) > len(best_match):
+            best_match = mount_point
+            source = mount["source"]
+
+    if source and source.startswith("/dev/"):
+        device = os.path.realpath(source)
+        uuid_dir = "/dev/disk/by-uuid"
+        try:
+            for uuid in os.listdir(uuid_dir):
+                if os.path.realpath(os.path.join(uuid_dir, uuid)) == device:
+                    subdir = os.path.relpath(real_path, best_match)
+                    return f"uuid:{uuid}" if subdir == "." else f"uuid:{uuid}/{subdir}"
+        except OSError:
+            pass
+    return f"path:{real_path}"
+
+
+def file_hash(path):
+    """Returns the SHA1 of a file, read in 1 MB chunks."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LibraryCatalog:
+    """
+    Host-side SQLite record of every card seen and the games on it, so
+    the library can be shown before the card has been read.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_catalog_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.executescript(SCHEMA)
+            # Catalogs written by versions that didn't store image hashes and thumbnails
+            columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(games)")}
+            for column, kind in (("boxart_hash", "TEXT"), ("boxart_thumb", "BLOB"),
+                                 ("banner_hash", "TEXT"), ("banner_thumb", "BLOB")):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE games ADD COLUMN {column} {kind}")
+
+    def close(self):
+        self.conn.close()
+
+    def load_games(self, card_id):
+        """Returns the cached game list for a card in the same shape as scan_for_games."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT base_name, title FROM games WHERE card_id = ?", (card_id,)).fetchall()
+        return [{"base_name": row["base_name"], "title": row["title"]} for row in rows]
+
+    def load_metadata(self, card_id):
+        """Returns {base_name: metadata} for every cached game on a card."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT base_name, metadata FROM games WHERE card_id = ?", (card_id,)).fetchall()
+        return {row["base_name"]: json.loads(row["metadata"]) for row in rows}
+
+    def get_game(self, card_id, base_name):
+        """Returns the cached metadata and thumbnails for a game, or None."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT * FROM games WHERE card_id = ? AND base_name = ?", (card_id, base_name)).fetchone()
+        if not row:
+            return None
+        game = dict(row)
+        game["metadata"] = json.loads(game["metadata"])
+        return game
+
+    def reconcile(self, card_id, eversd_path):
+        """
+        Brings the catalog in line with the card and returns the fresh game
+        list. Only games whose files changed since the last visit are re-read.
+        """
+        game_path = os.path.join(eversd_path, 'game')
+        entries = {}
+        try:
+            with os.scandir(game_path) as it:
+                for entry in it:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries[entry.name] = (stat.st_mtime, stat.st_size)
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = {row["base_name"]: dict(row) for row in self.conn.execute(
+                "SELECT base_name, title, json_mtime, json_size, rom_name, rom_size, boxart_name, boxart_stat, "
+                "boxart_hash, banner_name, banner_stat, banner_hash FROM games WHERE card_id = ?", (card_id,))}
+
+        games = []
+        updates = []
+        for name, (mtime, size) in entries.items():
+            if not name.endswith(".json"):
+                continue
+            base_name = name[:-len(".json")]
+            old = cached.get(base_name)
+            row = self._build_row(card_id, game_path, base_name, (mtime, size), entries, old)
+            games.append({"base_name": base_name, "title": (row or old)["title"]})
+            if row:
+                updates.append(row)
+
+        removed = [base for base in cached if f"{base}.json" not in entries]
+        with self._lock, self.conn:
+            for row in updates:
+                columns = ", ".join(row)
+                placeholders = ", ".join("?" for _ in row)
+                self.conn.execute(f"INSERT OR REPLACE INTO games ({columns}) VALUES ({placeholders})",
+                                  tuple(row.values()))
+            self.conn.executemany("DELETE FROM games WHERE card_id = ? AND base_name = ?",
+                                  [(card_id, base) for base in removed])
+            self.conn.execute("INSERT OR REPLACE INTO cards (card_id, last_path, last_seen) VALUES (?, ?, ?)",
+                              (card_id, eversd_path, time.time()))
+        return games
+
+    def _build_row(self, card_id, game_path, base_name, json_stat, entries, old):
+        """Returns a full row for a game if anything about it changed, otherwise None."""
+        boxart_name = next((f"{base_name}{suffix}" for suffix in BOXART_SUFFIXES
+                            if f"{base_name}{suffix}" in entries), None)
+        banner_name = f"{base_name}{BANNER_SUFFIX}" if f"{base_name}{BANNER_SUFFIX}" in entries else None
+        boxart_stat = json.dumps(entries[boxart_name]) if boxart_name else None
+        banner_stat = json.dumps(entries[banner_name]) if banner_name else None
+
+        if old and (old["json_mtime"], old["json_size"]) == json_stat \
+                and (old["boxart_name"], old["boxart_stat"]) == (boxart_name, boxart_stat) \
+                and (old["banner_name"], old["banner_stat"]) == (banner_name, banner_stat) \
+                and old["rom_size"] == entries.get(old["rom_name"], (None, None))[1] \
+                and all(old[f"{kind}_hash"] or not old[f"{kind}_name"] for kind in ("boxart", "banner")):
+            return None
+
+        try:
+            with open(os.path.join(game_path, f"{base_name}.json"), "r") as f:
+                metadata = json.load(f)
+            title = metadata.get("romTitle", base_name)
+        except (json.JSONDecodeError, IOError):
+            metadata = {}
+            title = f"{base_name} [JSON ERROR]"
+
+        rom_name = metadata.get("romFileName")
+        rom_stat = entries.get(rom_name)
+        row = {
+            "card_id": card_id,
+            "base_name": base_name,
+            "title": title,
+            "metadata": json.dumps(metadata),
+            "json_mtime": json_stat[0],
+            "json_size": json_stat[1],
+            "rom_name": rom_name,
+            "rom_size": rom_stat[1] if rom_stat else None,
+        }
+        cached = None
+        for kind, name, stat in (("boxart", boxart_name, boxart_stat), ("banner", banner_name, banner_stat)):
+            row[f"{kind}_name"] = name
+            row[f"{kind}_stat"] = stat
+            row[f"{kind}_hash"] = row[f"{kind}_thumb"] = None
+            if not name:
+                continue
+            if old and old[f"{kind}_name"] == name and cached is None:
+                cached = self.get_game(card_id, base_name)
+            if cached and (old[f"{kind}_name"], old[f"{kind}_stat"]) == (name, stat) and cached[f"{kind}_thumb"]:
+                # Image unchanged; keep the stored hash and thumbnail
+                row[f"{kind}_hash"] = cached[f"{kind}_hash"]
+                row[f"{kind}_thumb"] = cached[f"{kind}_thumb"]
+                continue
+            image_path = os.path.join(game_path, name)
+            try:
+                row[f"{kind}_hash"] = file_hash(image_path)
+            except OSError:
+                continue
+            if cached and cached[f"{kind}_name"] == name and cached[f"{kind}_hash"] == row[f"{kind}_hash"] \
+                    and cached[f"{kind}_thumb"]:
+                # Rewritten with the same contents (a sync or restore); no need to decode it again
+                row[f"{kind}_thumb"] = cached[f"{kind}_thumb"]
+            else:
+                row[f"{kind}_thumb"] = make_thumbnail(image_path, THUMBNAIL_SIZES[kind])
+        return row
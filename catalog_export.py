@@ -0,0 +1,196 @@
+import gzip
+import json
+import lzma
+import os
+import time
+from catalog import card_identity, file_hash
+from rom_ident import identify_roms, DigestCache
+from utils import atomic_write, BOXART_SUFFIXES, BANNER_SUFFIX
+
+EXPORT_FORMAT = "eversd-catalog"
+EXPORT_VERSION = 1
+
+
+def open_stream(path, mode):
+    """Opens a catalog file for streaming text I/O, compressed by its extension (.gz or .xz)."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    if path.endswith(".xz"):
+        return lzma.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _list_game_dir(game_path):
+    """Returns {file_name: size} for the game directory in one pass."""
+    sizes = {}
+    with os.scandir(game_path) as it:
+        for entry in it:
+            if entry.is_file():
+                sizes[entry.name] = entry.stat().st_size
+    return sizes
+
+
+def _is_safe_base_name(base_name):
+    """True for a plain file name inside game/; anything that could point elsewhere on the card is unsafe."""
+    return (isinstance(base_name, str) and bool(base_name) and base_name not in (".", "..")
+            and "/" not in base_name and os.sep not in base_name and os.path.basename(base_name) == base_name)
+
+
+def _file_records(game_path, base_name, metadata, sizes, rom_digests):
+    """Returns the name, size and digests of a game's ROM and images."""
+    boxart_name = next((f"{base_name}{suffix}" for suffix in BOXART_SUFFIXES if f"{base_name}{suffix}" in sizes), None)
+    files = {}
+    for kind, name in (("rom", metadata.get("romFileName")), ("boxart", boxart_name),
+                       ("banner", f"{base_name}{BANNER_SUFFIX}")):
+        if name not in sizes:
+            continue
+        record = {"name": name, "size": sizes[name]}
+        if kind == "rom":
+            info = rom_digests.get(name)
+            if info:
+                record.update(crc32=info["crc32"], sha1=info["sha1"])
+        else:
+            record["sha1"] = file_hash(os.path.join(game_path, name))
+        files[kind] = record
+    return files
+
+
+def export_catalog(eversd_path, out_path, include_hashes=False, status_callback=None):
+    """
+    Streams every game's metadata (all rom* fields, romMapping included)
+    into one JSON Lines file: a header line, then one line per game. With
+    include_hashes, each line also carries the size and digests of the
+    game's ROM and images. Returns (games_exported, errors).
+    """
+    game_path = os.path.join(eversd_path, 'game')
+    sizes = _list_game_dir(game_path)
+    base_names = sorted(name[:-len(".json")] for name in sizes if name.endswith(".json"))
+    errors = []
+
+    rom_digests = {}
+    if include_hashes:
+        rom_paths = []
+        for base_name in base_names:
+            try:
+                with open(os.path.join(game_path, f"{base_name}.json"), 'r') as f:
+                    rom_name = json.load(f).get("romFileName")
+            except (json.JSONDecodeError, IOError, AttributeError):
+                continue
+            if rom_name in sizes:
+                rom_paths.append(os.path.join(game_path, rom_name))
+        if status_callback:
+            status_callback(f"Hashing {len(rom_paths)} ROM(s)...")
+        # ROM digests are headerless, matching the DAT hash index
+        for path, (info, error) in identify_roms(rom_paths, cache=DigestCache()).items():
+            if info:
+                rom_digests[os.path.basename(path)] = info
+
+    exported = 0
+    with open_stream(out_path, "wt") as out:
+        header = {"format": EXPORT_FORMAT, "version": EXPORT_VERSION, "card_id": card_identity(eversd_path),
+                  "exported": time.time(), "hashes": include_hashes}
+        out.write(json.dumps(header) + "\n")
+        for base_name in base_names:
+            try:
+                with open(os.path.join(game_path, f"{base_name}.json"), 'r') as f:
+                    metadata = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                errors.append(f"{base_name}.json: {e}")
+                continue
+            record = {"base_name": base_name, "metadata": metadata}
+            if include_hashes:
+                record["files"] = _file_records(game_path, base_name, metadata, sizes, rom_digests)
+            out.write(json.dumps(record, separators=(",", ":")) + "\n")
+            exported += 1
+    if status_callback:
+        status_callback(f"Exported {exported} game(s) to {os.path.basename(out_path)}.")
+    return exported, errors
+
+
+def import_catalog(eversd_path, in_path, dry_run=False, status_callback=None):
+    """
+    Applies an exported catalog to a card, rewriting (atomically) only the
+    game JSONs whose metadata differs. Games whose ROM isn't on the card
+    are skipped, and a game keeps its own romFileName when that file exists.
+    Returns a report dict: updated, unchanged, missing, rom_mismatch
+    (base names whose ROM size differs from the export's) and errors.
+    """
+    game_path = os.path.join(eversd_path, 'game')
+    sizes = _list_game_dir(game_path)
+    report = {"updated": [], "unchanged": 0, "missing": [], "rom_mismatch": [], "errors": []}
+
+    with open_stream(in_path, "rt") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != EXPORT_FORMAT or header.get("version", 0) > EXPORT_VERSION:
+            report["errors"].append(f"{os.path.basename(in_path)} is not a catalog export this version can read.")
+            return report
+
+        for line_number, line in enumerate(f, start=2):
+            try:
+                record = json.loads(line)
+                base_name = record["base_name"]
+                metadata = record["metadata"]
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                report["errors"].append(f"Line {line_number}: {e}")
+                continue
+            # The file is untrusted; anything but a plain base name could write outside the card
+            if not _is_safe_base_name(base_name):
+                report["errors"].append(f"Line {line_number}: invalid base name {base_name!r}")
+                continue
+            if not isinstance(metadata, dict):
+                report["errors"].append(f"Line {line_number}: metadata is not an object")
+                continue
+
+            json_name = f"{base_name}.json"
+            current = None
+            if json_name in sizes:
+                try:
+                    with open(os.path.join(game_path, json_name), 'r') as game_file:
+                        current = json.load(game_file)
+                except (json.JSONDecodeError, IOError):
+                    pass # Unreadable; the import replaces it
+            if current and current.get("romFileName") in sizes:
+                metadata = dict(metadata, romFileName=current["romFileName"])
+            rom_name = metadata.get("romFileName")
+            if rom_name not in sizes:
+                report["missing"].append(base_name)
+                continue
+
+            exported_rom = record.get("files", {}).get("rom")
+            if exported_rom and exported_rom.get("size") != sizes[rom_name]:
+                report["rom_mismatch"].append(base_name)
+            if current == metadata:
+                report["unchanged"] += 1
+                continue
+
+            if not dry_run:
+                try:
+                    atomic_write(os.path.join(game_path, json_name), json.dumps(metadata, indent=4))
+                except OSError as e:
+                    report["errors"].append(f"{json_name}: {e}")
+                    continue
+            report["updated"].append(base_name)
+            if status_callback:
+                status_callback(f"Updated {json_name}")
+    return report
+
+
+if __name__ == '__main__':
+    import sys
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) != 3 or args[0] not in ("export", "import"):
+        print("Usage: python3 catalog_export.py export <eversd_path> <file.jsonl[.gz|.xz]> [--hashes]\n"
+              "       python3 catalog_export.py import <eversd_path> <file.jsonl[.gz|.xz]> [--dry-run]")
+        sys.exit(1)
+    start = time.perf_counter()
+    if args[0] == "export":
+        exported, errors = export_catalog(args[1], args[2], "--hashes" in sys.argv, print)
+        for error in errors:
+            print(f"Error: {error}")
+    else:
+        report = import_catalog(args[1], args[2], "--dry-run" in sys.argv)
+        print(f"Updated {len(report['updated'])}, unchanged {report['unchanged']}, "
+              f"missing ROM {len(report['missing'])}, ROM size mismatch {len(report['rom_mismatch'])}.")
+        for error in report["errors"]:
+            print(f"Error: {error}")
+    print(f"Done in {time.perf_counter() - start:.2f}s.")
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+from utils import cache_dir
+
+# ROM extensions per platform. Platform names are matched by whole-word
+# keyword, so header names ("SNES") and DAT names ("Nintendo - Super
+# Nintendo Entertainment System") both resolve, but "nes" never matches
+# inside "Genesis".
+PLATFORM_EXTENSIONS = [
+    (("game boy advance", "gba"), ("gba",)),
+    (("game boy color", "gbc"), ("gbc", "gb")),
+    (("game boy", "gameboy"), ("gb", "gbc")),
+    (("super nintendo", "super famicom", "snes"), ("sfc", "smc")),
+    (("nintendo entertainment system", "famicom", "nes"), ("nes", "fds")),
+    (("mega drive", "genesis"), ("md", "gen", "smd", "bin")),
+    (("master system",), ("sms",)),
+    (("game gear",), ("gg",)),
+    (("pc engine", "turbografx"), ("pce",)),
+    (("playstation",), ("cue", "pbp", "chd")),
+    (("atari 2600", "atari - 2600"), ("a26",)),
+    (("lynx",), ("lnx",)),
+    (("neo geo pocket",), ("ngp", "ngc")),
+    (("wonderswan",), ("ws", "wsc")),
+    (("arcade", "mame", "neo geo", "fbneo"), ("zip",)),
+]
+
+_PLATFORM_PATTERNS = [(re.compile("|".join(rf"\b{re.escape(keyword)}\b" for keyword in keywords)), exts)
+                      for keywords, exts in PLATFORM_EXTENSIONS]
+
+KNOWN_ROM_EXTENSIONS = {ext for _, exts in PLATFORM_EXTENSIONS for ext in exts} | {"dmg", "sgb", "68k", "fig", "swc", "unf"}
+
+# Fallback when a core has neither an .info file nor a readable extension list
+KNOWN_CORE_EXTENSIONS = {
+    "gambatte": ("gb", "gbc", "dmg"),
+    "gearboy": ("gb", "gbc", "dmg"),
+    "mgba": ("gba", "gb", "gbc"),
+    "gpsp": ("gba",),
+    "vba_next": ("gba",),
+    "snes9x": ("sfc", "smc", "fig", "swc"),
+    "fceumm": ("nes", "fds", "unf"),
+    "nestopia": ("nes", "fds", "unf"),
+    "quicknes": ("nes",),
+    "genesis_plus_gx": ("md", "gen", "smd", "bin", "sms", "gg"),
+    "picodrive": ("md", "gen", "smd", "bin", "sms", "68k"),
+    "smsplus": ("sms", "gg"),
+    "mednafen_pce_fast": ("pce", "cue"),
+    "pcsx_rearmed": ("cue", "pbp", "chd", "bin"),
+    "stella": ("a26", "bin"),
+    "handy": ("lnx",),
+    "mednafen_ngp": ("ngp", "ngc"),
+    "mednafen_wswan": ("ws", "wsc"),
+    "fbneo": ("zip",),
+    "mame2003": ("zip",),
+}
+
+# When several installed cores take an extension, the first listed wins
+PREFERRED_CORES = ("gambatte", "mgba", "snes9x", "fceumm", "nestopia", "genesis_plus_gx", "picodrive",
+                   "pcsx_rearmed", "mednafen_pce_fast", "fbneo")
+
+_EXTENSION_LIST = re.compile(rb'\x00([a-z0-9]{1,5}(?:\|[a-z0-9]{1,5}){0,40})\x00')
+
+
+def core_key(core_name):
+    """Strips the libretro suffix: 'gambatte_libretro.so' -> 'gambatte'."""
+    name = os.path.splitext(core_name)[0]
+    return name[:-len("_libretro")] if name.endswith("_libretro") else name
+
+
+def platform_extensions(platform):
+    """Returns the ROM extensions of a platform name, or () if it isn't recognised."""
+    platform = platform.lower()
+    for pattern, exts in _PLATFORM_PATTERNS:
+        if pattern.search(platform):
+            return exts
+    return ()
+
+
+def read_info_extensions(info_path):
+    """Reads supported_extensions from a libretro .info file."""
+    with open(info_path, 'r', errors='ignore') as f:
+        for line in f:
+            key, _, value = line.partition("=")
+            if key.strip() == "supported_extensions":
+                return [ext for ext in value.strip().strip('"').lower().split("|") if ext]
+    return []
+
+
+def _elf_rodata(data):
+    """Returns the .rodata section of an ELF image, or the whole image if it can't be found."""
+    if data[:4] != b"\x7fELF":
+        return data
+    is_64 = data[4] == 2
+    endian = "<" if data[5] == 1 else ">"
+    try:
+        if is_64:
+            shoff, = struct.unpack_from(endian + "Q", data, 0x28)
+            shentsize, shnum, shstrndx = struct.unpack_from(endian + "HHH", data, 0x3A)
+            section = endian + "IIQQQQ"
+        else:
+            shoff, = struct.unpack_from(endian + "I", data, 0x20)
+            shentsize, shnum, shstrndx = struct.unpack_from(endian + "HHH", data, 0x2E)
+            section = endian + "IIIIII"
+        headers = [struct.unpack_from(section, data, shoff + i * shentsize) for i in range(shnum)]
+        names_offset = headers[shstrndx][4]
+        for name_index, _, _, _, offset, size in headers:
+            start = names_offset + name_index
+            if data[start:data.index(b"\x00", start)] == b".rodata":
+                return data[offset:offset + size]
+    except (struct.error, IndexError, ValueError):
+        pass
+    return data
+
+
+def read_elf_extensions(data):
+    """
+    Finds the pipe-separated valid_extensions string a libretro core keeps
+    in .rodata, picking the candidate with the most known ROM extensions.
+    """
+    best, best_known = [], 0
+    for match in _EXTENSION_LIST.finditer(_elf_rodata(data)):
+        exts = match.group(1).decode('ascii').split("|")
+        known = sum(1 for ext in exts if ext in KNOWN_ROM_EXTENSIONS)
+        if known > best_known:
+            best, best_known = exts, known
+    return best
+
+
+def default_core_cache_path():
+    """Returns the core extension cache location under the XDG cache directory."""
+    return cache_dir("cores.json")
+
+
+class CoreRegistry:
+    """
+    Knows which emulator cores each card has and which ROM extensions
+    each core takes. Core lists are re-read only when the card root's
+    mtime changes; a core's extensions are read once per distinct core
+    file (keyed by SHA1, so the same core on several cards is parsed once)
+    and persisted across sessions.
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path or default_core_cache_path()
+        self._lock = threading.Lock()
+        self._listings = {} # eversd_path -> (mtime_ns, [core names])
+        cache = self._load_cache()
+        self._stats = cache.get("stats", {}) # core path -> [mtime_ns, size, sha1]
+        self._extensions = cache.get("extensions", {}) # sha1 -> [extensions]
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({"stats": self._stats, "extensions": self._extensions}, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not save core cache: {e}")
+
+    def cores(self, eversd_path):
+        """Returns the sorted .so core names in a card root."""
+        try:
+            mtime = os.stat(eversd_path).st_mtime_ns
+        except OSError:
+            return []
+        with self._lock:
+            cached = self._listings.get(eversd_path)
+            if cached and cached[0] == mtime:
+                return list(cached[1])
+        names = sorted(f for f in os.listdir(eversd_path) if f.endswith('.so'))
+        with self._lock:
+            self._listings[eversd_path] = (mtime, names)
+        return list(names)
+
+    def core_extensions(self, eversd_path, core_name):
+        """Returns the ROM extensions a core supports, from its .info file, its binary, or the known-core table."""
+        core_path = os.path.join(eversd_path, core_name)
+        try:
+            st = os.stat(core_path)
+        except OSError:
+            return []
+        with self._lock:
+            cached = self._stats.get(core_path)
+            if cached and cached[:2] == [st.st_mtime_ns, st.st_size] and cached[2] in self._extensions:
+                return self._extensions[cached[2]]
+
+        with open(core_path, 'rb') as f:
+            data = f.read()
+        sha1 = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            self._stats[core_path] = [st.st_mtime_ns, st.st_size, sha1]
+            if sha1 in self._extensions:
+                self._save_cache()
+                return self._extensions[sha1]
+
+        base = os.path.splitext(core_name)[0]
+        exts = []
+        for info_path in (os.path.join(eversd_path, f"{base}.info"), os.path.join(eversd_path, "info", f"{base}.info")):
+            if os.path.isfile(info_path):
+                exts = read_info_extensions(info_path)
+                break
+        if not exts:
+            exts = read_elf_extensions(data)
+        if not exts:
+            exts = list(KNOWN_CORE_EXTENSIONS.get(core_key(core_name), ()))
+
+        with self._lock:
+            self._extensions[sha1] = exts
+            self._save_cache()
+        return exts
+
+    def extension_map(self, eversd_path):
+        """Maps each ROM extension to the installed core that should run it."""
+        def rank(core_name):
+            key = core_key(core_name)
+            return (PREFERRED_CORES.index(key) if key in PREFERRED_CORES else len(PREFERRED_CORES), core_name)
+
+        mapping = {}
+        for core_name in sorted(self.cores(eversd_path), key=rank):
+            for ext in self.core_extensions(eversd_path, core_name):
+                mapping.setdefault(ext, core_name)
+        return mapping
+
+    def default_core(self, eversd_path, rom_path=None, platform=None):
+        """Picks a core for a ROM by its extension, then by its platform. Returns None if nothing fits."""
+        mapping = self.extension_map(eversd_path)
+        if rom_path:
+            ext = os.path.splitext(rom_path)[1].lower().lstrip(".")
+            if ext in mapping:
+                return mapping[ext]
+        for ext in platform_extensions(platform or ""):
+            if ext in mapping:
+                return mapping[ext]
+        return None
+
+
+# Shared by every EverSDLogic so dialogs and workers reuse the same cache
+core_registry = CoreRegistry()
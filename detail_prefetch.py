@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from logic import EverSDLogic
+from profiling import perf
+
+
+def load_preview_image(image_path, size):
+    """Loads an image scaled to fit a preview label. QImage is safe to use off the GUI thread."""
+    if not image_path:
+        return None
+    image = QImage(image_path)
+    if image.isNull():
+        return None
+    return image.scaled(size[0], size[1], Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+def load_game_entry(logic, eversd_path, base_name, preview_sizes):
+    """Reads a game's details and preview images into a cache entry."""
+    details = logic.get_game_details(eversd_path, base_name)
+    entry = {"details": details, "boxart": None, "banner": None}
+    if not details.get("error"):
+        entry["boxart"] = load_preview_image(details.get("boxart_path"), preview_sizes["boxart"])
+        entry["banner"] = load_preview_image(details.get("banner_path"), preview_sizes["banner"])
+    return entry
+
+
+class DetailCache:
+    """
+    Bounded, thread-safe LRU cache of game detail entries keyed by
+    (eversd_path, base_name). Every clear() starts a new generation, and
+    a put() from a load that began in an older one is dropped, so a
+    worker that was mid-read during a clear can't bring back stale data.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        perf.record_cache("game_details", entry is not None)
+        return entry
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, entry, generation=None):
+        """Stores an entry, unless it was loaded before a clear() that has since happened."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+
+class DetailPrefetcher(QThread):
+    """
+    Background worker that warms the detail cache for the games around
+    the current selection. Each new request replaces the pending one, so
+    the worker always follows the latest position in the list.
+    """
+    loaded = pyqtSignal(str, str)
+
+    def __init__(self, cache, preview_sizes):
+        super().__init__()
+        self.cache = cache
+        self.preview_sizes = preview_sizes
+        self.logic = EverSDLogic()
+        self._condition = threading.Condition()
+        self._pending = []
+        self._stopping = False
+
+    def request(self, eversd_path, base_names):
+        """Queues games to load, most important first, replacing any earlier request."""
+        with self._condition:
+            self._pending = [(eversd_path, base_name) for base_name in base_names]
+            self._condition.notify()
+
+    def cancel(self):
+        """Drops everything still queued; a load already in progress finishes into the cache."""
+        with self._condition:
+            self._pending = []
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._pending = []
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                key = self._pending.pop(0)
+            if key in self.cache:
+                continue
+            generation = self.cache.generation
+            try:
+                with perf.operation("DetailPrefetcher.load"):
+                    entry = load_game_entry(self.logic, key[0], key[1], self.preview_sizes)
+            except Exception as e:
+                print(f"Prefetch failed for {key[1]}: {e}")
+                continue
+            if self.cache.put(key, entry, generation):
+                self.loaded.emit(*key)
+            else:
+                # The cache was cleared mid-load; read the files again
+                with self._condition:
+                    self._pending.insert(0, key)
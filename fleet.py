@@ -0,0 +1,263 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logic import EverSDLogic, make_safe_base_name
+from rom_ident import identify_roms, fill_from_match
+from rom_source import rom_source_name, rom_source_size, resolve_rom_source
+from space import WritePlan, raw_image_bytes
+from card_bench import card_settings, record_write_rate
+from journal import Journal
+from utils import IMAGE_NAME_SUFFIXES, IMAGE_SIZES
+
+# JSON metadata files are well under this; used before the JSON exists
+JSON_BYTES_BOUND = 16 * 1024
+
+
+# Two timestamps this close are the same on FAT, which stores mtimes in 2 second steps
+MTIME_TOLERANCE = 2.0
+
+
+def device_id(path):
+    """
+    Returns an identifier for the whole disk a path lives on, so that
+    partitions of the same card share one. The partition's st_dev is
+    resolved to its parent block device through sysfs; where that isn't
+    available (not Linux, or not a block device) st_dev itself is used.
+    """
+    try:
+        dev = os.stat(path).st_dev
+    except OSError:
+        return path
+    sys_path = os.path.realpath(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}")
+    if not os.path.isdir(sys_path):
+        return dev
+    if os.path.exists(os.path.join(sys_path, "partition")):
+        sys_path = os.path.dirname(sys_path)
+    return sys_path
+
+
+def same_file_contents(src, dest):
+    """Returns True when dest looks like an earlier copy of src: same size and (FAT-rounded) mtime."""
+    try:
+        src_stat, dest_stat = os.stat(src), os.stat(dest)
+    except OSError:
+        return False
+    return (src_stat.st_size == dest_stat.st_size
+            and abs(src_stat.st_mtime - dest_stat.st_mtime) <= MTIME_TOLERANCE)
+
+
+class CardFleet:
+    """
+    Runs the same operation against several EverSD roots at once.
+
+    Cards are grouped by the device they live on and each device gets
+    exactly one I/O worker, so a slow reader never holds up a fast one and
+    two partitions of the same card never compete for the same bus.
+    """
+
+    def __init__(self, card_paths, progress_callback=None):
+        self.card_paths = list(dict.fromkeys(card_paths)) # Drop duplicates, keep order
+        self.progress_callback = progress_callback
+        self._lock = threading.Lock()
+        self.reports = {path: self._new_report(path) for path in self.card_paths}
+        self._started = {} # path -> perf_counter() when its running operation began
+
+    def _new_report(self, path):
+        return {
+            "path": path,
+            "state": "Idle",
+            "message": "",
+            "games": 0,
+            "bytes_written": 0,
+            "elapsed": 0.0,
+            "errors": [],
+        }
+
+    def _update_report(self, path, **changes):
+        with self._lock:
+            if path in self._started:
+                # Keeps the throughput live while the operation runs
+                changes.setdefault("elapsed", time.perf_counter() - self._started[path])
+            self.reports[path].update(changes)
+            report = dict(self.reports[path], errors=list(self.reports[path]["errors"]))
+        if self.progress_callback:
+            self.progress_callback(report)
+        return report
+
+    def _add_error(self, path, message):
+        with self._lock:
+            errors = self.reports[path]["errors"] + [message]
+        self._update_report(path, errors=errors)
+
+    def throughput(self, path):
+        """Returns the bytes/second written to a card during the last operation."""
+        report = self.reports[path]
+        if report["elapsed"] <= 0:
+            return 0.0
+        return report["bytes_written"] / report["elapsed"]
+
+    def _run(self, operation):
+        """Runs operation(path, logic) for every card, one worker per device."""
+        devices = {}
+        for path in self.card_paths:
+            devices.setdefault(device_id(path), []).append(path)
+
+        def run_device(paths):
+            for path in paths:
+                logic = EverSDLogic(status_callback=lambda msg, p=path: self._update_report(p, message=msg))
+                self._update_report(path, state="Running", message="", bytes_written=0, elapsed=0.0, errors=[])
+                with self._lock:
+                    self._started[path] = time.perf_counter()
+                try:
+                    operation(path, logic)
+                except Exception as e:
+                    self._add_error(path, str(e))
+                report = self._update_report(path)
+                with self._lock:
+                    del self._started[path]
+                self._update_report(path, state="Failed" if report["errors"] else "Done")
+                if report["bytes_written"] >= 1024 * 1024:
+                    # Kept in the card's profile, so later space checks estimate from it
+                    record_write_rate(path, self.throughput(path))
+
+        if not devices:
+            return self.reports
+        with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+            # list() re-raises anything that escaped run_device
+            list(executor.map(run_device, devices.values()))
+        return self.reports
+
+    def _add_bytes(self, path, count):
+        with self._lock:
+            bytes_written = self.reports[path]["bytes_written"] + count
+        self._update_report(path, bytes_written=bytes_written)
+
+    def _check_space(self, path, plan):
+        """Records a refusal and returns False when a plan won't fit on a card, before anything is written."""
+        fits, message = plan.check(card_settings(path)["write_rate"])
+        if not fits:
+            self._add_error(path, message)
+        self._update_report(path, message=message)
+        return fits
+
+    def scan(self):
+        """Scans every card and records its game count."""
+        results = {}
+
+        def scan_card(path, logic):
+            games = logic.scan_for_games(path)
+            results[path] = games
+            self._update_report(path, games=len(games), message=f"Found {len(games)} games.")
+
+        self._run(scan_card)
+        return results
+
+    def batch_import(self, game_entries, title_catalog=None, rom_index=None):
+        """
+        Creates the same set of games on every card. Each entry is the data
+        dict AddGameDialog.get_data() produces, minus the eversd_path. With
+        a rom_index ((HashIndex, DigestCache)), ROMs are first identified by
+        checksum on a process pool; with a title_catalog, remaining empty
+        metadata fields are filled from the best title match. A title still
+        empty after that comes from the ROM's file name.
+        """
+        game_entries = [dict(entry) for entry in game_entries]
+        identified = set()
+        if rom_index:
+            index, cache = rom_index
+            results = identify_roms([entry["rom_path"] for entry in game_entries], index, cache)
+            for i, entry in enumerate(game_entries):
+                info, _ = results[entry["rom_path"]]
+                if fill_from_match(entry, info):
+                    identified.add(i)
+        if title_catalog:
+            for i, entry in enumerate(game_entries):
+                # An identified ROM's title is exact, so match on it rather than the filename
+                title_catalog.fill(entry, name=entry["title"] if i in identified else None)
+        for entry in game_entries:
+            if not entry.get("title"):
+                entry["title"] = os.path.splitext(os.path.basename(entry["rom_path"]))[0]
+            try:
+                # Listed once here rather than per card for the plan and again for the copy
+                entry["rom_source"] = resolve_rom_source(entry["rom_path"])
+            except RuntimeError:
+                pass # A .7z without py7zr; each card reports it
+
+        def import_card(path, logic):
+            # Images aren't encoded yet, so they're counted at their uncompressed upper bound
+            plan = WritePlan(path)
+            game_path = os.path.join(path, 'game')
+            for entry in game_entries:
+                base_name = make_safe_base_name(entry.get("title", ""))
+                rom_source = entry.get("rom_source") or entry["rom_path"]
+                rom_name = f"{base_name}{os.path.splitext(rom_source_name(rom_source))[1]}"
+                plan.add_file(os.path.join(game_path, rom_name), rom_source_size(rom_source))
+                for kind, suffixes in IMAGE_NAME_SUFFIXES.items():
+                    if entry.get(f"{kind}_path"):
+                        for suffix in suffixes:
+                            plan.add_file(os.path.join(game_path, f"{base_name}{suffix}"),
+                                          raw_image_bytes(IMAGE_SIZES[kind]))
+                plan.add_file(os.path.join(game_path, f"{base_name}.json"), JSON_BYTES_BOUND)
+            if not self._check_space(path, plan):
+                return
+            for entry in game_entries:
+                success, base_name = logic.create_game_entry(dict(entry, eversd_path=path))
+                if not success:
+                    self._add_error(path, f"Failed to import '{entry.get('title', '')}'")
+                    continue
+                written = sum(os.path.getsize(f) for f in logic.find_game_files(path, base_name))
+                self._add_bytes(path, written)
+            self._update_report(path, games=len(logic.scan_for_games(path)))
+
+        return self._run(import_card)
+
+    def sync_from(self, source_path, game_base_names=None):
+        """
+        Copies games from a source card to every other card in the fleet.
+        Files that already exist with the same size and modification time
+        are skipped; copies keep the source's mtime so they match next time.
+        Each game's files are staged and swapped in as one journaled
+        operation, so a pulled card keeps the old version of a game.
+        """
+        source_logic = EverSDLogic()
+        if game_base_names is None:
+            game_base_names = [g["base_name"] for g in source_logic.scan_for_games(source_path)]
+        source_files = {base: source_logic.find_game_files(source_path, base) for base in game_base_names}
+
+        def sync_card(path, logic):
+            if os.path.realpath(path) == os.path.realpath(source_path):
+                self._update_report(path, message="Source card, skipped.")
+                return
+            game_path = os.path.join(path, 'game')
+            os.makedirs(game_path, exist_ok=True)
+            copies = {}
+            plan = WritePlan(path)
+            for base_name, files in source_files.items():
+                copies[base_name] = []
+                for src in files:
+                    dest = os.path.join(game_path, os.path.basename(src))
+                    if same_file_contents(src, dest):
+                        continue
+                    src_size = os.path.getsize(src)
+                    copies[base_name].append((src, dest, src_size))
+                    plan.add_file(dest, src_size)
+            if not self._check_space(path, plan):
+                return
+            journal = Journal(path)
+            for base_name, files in copies.items():
+                if not files:
+                    continue
+                try:
+                    with journal.begin("sync_game", base_name) as txn:
+                        for src, dest, src_size in files:
+                            shutil.copy2(src, txn.stage(dest))
+                except OSError as e:
+                    self._add_error(path, f"Failed to sync '{base_name}': {e}")
+                    continue
+                self._add_bytes(path, sum(src_size for _, _, src_size in files))
+                self._update_report(path, message=f"Synced {base_name}")
+            self._update_report(path, games=len(logic.scan_for_games(path)))
+
+        return self._run(sync_card)
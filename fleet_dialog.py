@@ -0,0 +1,164 @@
+
+import sys
+from PyQt5.QtWidgets import (QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QMessageBox, QFileDialog)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from fleet import CardFleet
+
+class FleetWorkerThread(QThread):
+    """Worker thread that runs a fleet operation without freezing the GUI."""
+    progress = pyqtSignal(dict)
+
+    def __init__(self, card_paths, operation, source_path=None, game_entries=None, title_catalog=None, rom_index=None):
+        super().__init__()
+        self.card_paths = card_paths
+        self.operation = operation
+        self.source_path = source_path
+        self.game_entries = game_entries or []
+        self.title_catalog = title_catalog
+        self.rom_index = rom_index
+
+    def run(self):
+        fleet = CardFleet(self.card_paths, progress_callback=self.progress.emit)
+        try:
+            if self.operation == "scan":
+                fleet.scan()
+            elif self.operation == "sync":
+                fleet.sync_from(self.source_path)
+            elif self.operation == "import":
+                fleet.batch_import(self.game_entries, self.title_catalog, self.rom_index)
+        except Exception as e:
+            print(f"Fleet operation failed: {e}")
+
+
+class FleetDialog(QDialog):
+    COLUMNS = ["Card", "Status", "Games", "Written", "Throughput", "Message"]
+
+    def __init__(self, card_paths, current_path=None, parent=None, title_catalog=None, rom_index=None):
+        super().__init__(parent)
+        self.setWindowTitle("Card Fleet")
+        self.setGeometry(150, 150, 900, 400)
+
+        self.card_paths = card_paths
+        self.current_path = current_path
+        self.title_catalog = title_catalog # Optional TitleCatalog for filling imported games' metadata
+        self.rom_index = rom_index # Optional (HashIndex, DigestCache) for identifying imported ROMs
+        self.game_entries = []
+        self.worker = None
+
+        self.initUI()
+        self.connect_signals()
+
+    def initUI(self):
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+
+        self.card_table = QTableWidget(len(self.card_paths), len(self.COLUMNS))
+        self.card_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.card_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.card_table.horizontalHeader().setStretchLastSection(True)
+        self.card_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.card_table.setSelectionBehavior(QTableWidget.SelectRows)
+        for row, path in enumerate(self.card_paths):
+            item = QTableWidgetItem(path)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+            self.card_table.setItem(row, 0, item)
+            self.card_table.setItem(row, 1, QTableWidgetItem("Idle"))
+        main_layout.addWidget(self.card_table)
+
+        action_layout = QHBoxLayout()
+        main_layout.addLayout(action_layout)
+        self.scan_button = QPushButton("Scan Selected Cards")
+        self.sync_button = QPushButton("Sync Current Card to Selected")
+        self.import_button = QPushButton("Import ROMs to Selected...")
+        self.close_button = QPushButton("Close")
+        self.status_label = QLabel("Status: Ready")
+        action_layout.addWidget(self.scan_button)
+        action_layout.addWidget(self.sync_button)
+        action_layout.addWidget(self.import_button)
+        action_layout.addStretch()
+        action_layout.addWidget(self.status_label)
+        action_layout.addWidget(self.close_button)
+
+        self.sync_button.setEnabled(bool(self.current_path))
+
+    def connect_signals(self):
+        self.scan_button.clicked.connect(lambda: self.start_operation("scan"))
+        self.sync_button.clicked.connect(lambda: self.start_operation("sync"))
+        self.import_button.clicked.connect(self.select_import)
+        self.close_button.clicked.connect(self.reject)
+
+    def checked_paths(self):
+        return [self.card_table.item(row, 0).text()
+                for row in range(self.card_table.rowCount())
+                if self.card_table.item(row, 0).checkState() == Qt.Checked]
+
+    def select_import(self):
+        """Picks ROM files and imports them as new games on every selected card."""
+        rom_paths, _ = QFileDialog.getOpenFileNames(self, "Select ROM Files")
+        if not rom_paths:
+            return
+        # Titles, platforms and cores are filled in per ROM by the fleet
+        self.game_entries = [{"rom_path": path} for path in rom_paths]
+        self.start_operation("import")
+
+    def start_operation(self, operation):
+        paths = self.checked_paths()
+        if not paths:
+            QMessageBox.warning(self, "No Cards Selected", "Please select at least one card.")
+            return
+        if operation == "sync":
+            reply = QMessageBox.question(self, 'Confirm Sync',
+                                         f"Copy all games from '{self.current_path}' to {len(paths)} card(s)?",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+        elif operation == "import":
+            reply = QMessageBox.question(self, 'Confirm Import',
+                                         f"Import {len(self.game_entries)} ROM(s) to {len(paths)} card(s)?",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+
+        self.scan_button.setEnabled(False)
+        self.sync_button.setEnabled(False)
+        self.import_button.setEnabled(False)
+        self.status_label.setText(f"Status: Running {operation} on {len(paths)} card(s)...")
+        self.worker = FleetWorkerThread(paths, operation, self.current_path, self.game_entries,
+                                        self.title_catalog, self.rom_index)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.finished.connect(self.on_finished)
+        self.worker.start()
+
+    def on_progress(self, report):
+        row = self.card_paths.index(report["path"])
+        elapsed = report["elapsed"]
+        written_mb = report["bytes_written"] / (1024 * 1024)
+        throughput = f"{written_mb / elapsed:.1f} MB/s" if elapsed > 0 else ""
+        status = report["state"]
+        if report["errors"]:
+            status += f" ({len(report['errors'])} errors)"
+        values = [status, str(report["games"]), f"{written_mb:.1f} MB", throughput, report["message"]]
+        for column, value in enumerate(values, start=1):
+            self.card_table.setItem(row, column, QTableWidgetItem(value))
+
+    def on_finished(self):
+        self.scan_button.setEnabled(True)
+        self.sync_button.setEnabled(bool(self.current_path))
+        self.import_button.setEnabled(True)
+        self.status_label.setText("Status: Done")
+
+    def reject(self):
+        # Don't abandon a card halfway through a copy
+        if self.worker and self.worker.isRunning():
+            QMessageBox.warning(self, "Operation Running", "Please wait for the current operation to finish.")
+            return
+        super().reject()
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    dialog = FleetDialog(sys.argv[1:])
+    dialog.exec_()
+    sys.exit()
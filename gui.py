@@ -26,6 +26,8 @@ class EverSDManagerWindow(QWidget):
         self.browse_button = QPushButton("Browse...")
         self.add_game_button = QPushButton("Add New Game...")
         self.refresh_button = QPushButton("Refresh List")
+        self.fleet_button = QPushButton("Card Fleet...")
+        self.perf_button = QPushButton("Performance")
 
         top_controls_layout.addWidget(path_label)
         top_controls_layout.addWidget(self.path_select)
@@ -33,6 +35,8 @@ class EverSDManagerWindow(QWidget):
         top_controls_layout.addStretch()
         top_controls_layout.addWidget(self.add_game_button)
         top_controls_layout.addWidget(self.refresh_button)
+        top_controls_layout.addWidget(self.fleet_button)
+        top_controls_layout.addWidget(self.perf_button)
 
         # -- Main Content Area (Splitter) --
         main_splitter = QSplitter(Qt.Horizontal)
@@ -54,6 +58,26 @@ class EverSDManagerWindow(QWidget):
         button_layout.addWidget(self.edit_button)
         button_layout.addWidget(self.delete_button)
         left_layout.addLayout(button_layout)
+
+        maintenance_layout = QHBoxLayout()
+        self.audit_button = QPushButton("Audit Images...")
+        self.integrity_button = QPushButton("Check Integrity...")
+        maintenance_layout.addWidget(self.audit_button)
+        maintenance_layout.addWidget(self.integrity_button)
+        self.rename_button = QPushButton("Fix File Names...")
+        maintenance_layout.addWidget(self.rename_button)
+        self.benchmark_button = QPushButton("Benchmark Card...")
+        maintenance_layout.addWidget(self.benchmark_button)
+        left_layout.addLayout(maintenance_layout)
+
+        transfer_layout = QHBoxLayout()
+        self.export_catalog_button = QPushButton("Export Catalog...")
+        self.import_catalog_button = QPushButton("Import Catalog...")
+        transfer_layout.addWidget(self.export_catalog_button)
+        transfer_layout.addWidget(self.import_catalog_button)
+        self.backup_button = QPushButton("Back Up / Restore...")
+        transfer_layout.addWidget(self.backup_button)
+        left_layout.addLayout(transfer_layout)
         
         main_splitter.addWidget(left_widget)
 
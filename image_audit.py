@@ -0,0 +1,159 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from utils import load_image, fit_image, encode_png, IMAGE_NAME_SUFFIXES, IMAGE_SIZES
+from space import WritePlan, raw_image_bytes
+from journal import Journal
+
+# Every image variant the Evercade expects for a game: (kind, filename suffix, size).
+IMAGE_VARIANTS = [(kind, suffix, IMAGE_SIZES[kind])
+                  for kind, suffixes in IMAGE_NAME_SUFFIXES.items() for suffix in suffixes]
+
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+
+
+def check_image(path, expected_size):
+    """Returns a dict describing one image file: whether it exists, its size and whether it decodes."""
+    result = {"path": path, "exists": os.path.exists(path), "size": None, "decodes": False, "problem": None}
+    if not result["exists"]:
+        result["problem"] = "missing"
+        return result
+    try:
+        with Image.open(path) as img:
+            result["size"] = img.size
+            img.verify() # Checks the chunk structure and CRCs, but not the pixel data
+        # verify() leaves the image unusable, so decode the pixels from a fresh open
+        with Image.open(path) as img:
+            img.load()
+        result["decodes"] = True
+    except Exception:
+        result["problem"] = "corrupt"
+        return result
+    if result["size"] != expected_size:
+        result["problem"] = f"wrong size {result['size'][0]}x{result['size'][1]}"
+    return result
+
+
+def audit_game(game_path, base_name):
+    """Checks every image variant of a game and returns a report dict."""
+    images = {}
+    for kind, suffix, size in IMAGE_VARIANTS:
+        images[f"{base_name}{suffix}"] = dict(check_image(os.path.join(game_path, f"{base_name}{suffix}"), size),
+                                              kind=kind, expected_size=size)
+    problems = {name: info["problem"] for name, info in images.items() if info["problem"]}
+    # A game without any banner or any boxart just wasn't given one; only half a pair is a problem.
+    for kind in ("boxart", "banner"):
+        variants = [name for name, info in images.items() if info["kind"] == kind]
+        if all(images[name]["problem"] == "missing" for name in variants):
+            for name in variants:
+                problems.pop(name, None)
+    return {"base_name": base_name, "images": images, "problems": problems}
+
+
+def audit_card(eversd_path, max_workers=DEFAULT_WORKERS):
+    """Audits the images of every game on the card in parallel. Returns reports for games with problems."""
+    game_path = os.path.join(eversd_path, 'game')
+    try:
+        base_names = sorted(name[:-len(".json")] for name in os.listdir(game_path) if name.endswith(".json"))
+    except OSError:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        reports = list(executor.map(lambda base: audit_game(game_path, base), base_names))
+    return [report for report in reports if report["problems"]]
+
+
+def _best_source(report, kind):
+    """Returns the path of the best surviving image of a kind: correctly sized first, then the largest."""
+    candidates = [info for info in report["images"].values() if info["kind"] == kind and info["decodes"]]
+    if not candidates:
+        return None
+    candidates.sort(key=lambda info: (info["size"] == info["expected_size"], info["size"][0] * info["size"][1]),
+                    reverse=True)
+    return candidates[0]["path"]
+
+
+def regenerate_game(report, png_options=None):
+    """
+    Rewrites the broken, missing or wrongly sized variants of one game from
+    its best remaining image, in one journaled operation so a pulled card
+    never leaves a truncated PNG. Returns (fixed_names, errors).
+    """
+    errors = []
+    encoded = {}
+    outputs = {} # name -> (path, png bytes)
+    for name, problem in report["problems"].items():
+        info = report["images"][name]
+        source = _best_source(report, info["kind"])
+        if not source:
+            errors.append(f"{name}: no usable source image")
+            continue
+        try:
+            key = (source, info["expected_size"])
+            if key not in encoded:
+                source_info = next(i for i in report["images"].values() if i["path"] == source)
+                if source_info["size"] == info["expected_size"]:
+                    with open(source, "rb") as f:
+                        encoded[key] = f.read() # Already right; a straight copy will do
+                else:
+                    img, error = load_image(source, info["expected_size"])
+                    if error:
+                        raise ValueError(error)
+                    encoded[key] = encode_png(fit_image(img, info["expected_size"]), png_options)
+            outputs[name] = (info["path"], encoded[key])
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    if not outputs:
+        return [], errors
+    eversd_path = os.path.dirname(os.path.dirname(next(iter(outputs.values()))[0]))
+    try:
+        with Journal(eversd_path).begin("regenerate_images", report["base_name"]) as txn:
+            for path, data in outputs.values():
+                txn.write(path, data)
+    except OSError as e:
+        return [], errors + [f"{report['base_name']}: {e}"]
+    return list(outputs), errors
+
+
+def plan_regeneration(reports):
+    """Returns the WritePlan for regenerating the audited images, or None if there's nothing to write."""
+    plan = None
+    for report in reports:
+        for name in report["problems"]:
+            info = report["images"][name]
+            if plan is None:
+                plan = WritePlan(os.path.dirname(os.path.dirname(info["path"])))
+            # Not encoded yet, so counted at the uncompressed upper bound
+            plan.add_file(info["path"], raw_image_bytes(info["expected_size"]))
+    return plan
+
+
+def regenerate_images(reports, max_workers=DEFAULT_WORKERS, png_options=None):
+    """
+    Regenerates images for all audited games in parallel. Refuses to start
+    if they might not fit on the card. Returns (fixed_count, errors).
+    """
+    plan = plan_regeneration(reports)
+    if plan:
+        fits, message = plan.check()
+        if not fits:
+            return 0, [message]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda report: regenerate_game(report, png_options), reports))
+    fixed = sum(len(names) for names, _ in results)
+    errors = [error for _, game_errors in results for error in game_errors]
+    return fixed, errors
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python3 image_audit.py <eversd_path> [--fix]")
+        sys.exit(1)
+    reports = audit_card(sys.argv[1])
+    print(json.dumps([{"base_name": r["base_name"], "problems": r["problems"]} for r in reports], indent=4))
+    if "--fix" in sys.argv[2:]:
+        fixed, errors = regenerate_images(reports)
+        print(f"Regenerated {fixed} image(s).")
+        for error in errors:
+            print(f"Error: {error}")
@@ -0,0 +1,134 @@
+
+import sys
+from PyQt5.QtWidgets import (QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QMessageBox)
+from PyQt5.QtCore import QThread, pyqtSignal
+from image_audit import audit_card, regenerate_images
+from card_bench import card_settings
+
+class ImageAuditThread(QThread):
+    """Worker thread that audits (and optionally repairs) a card's images."""
+    audited = pyqtSignal(list)
+    regenerated = pyqtSignal(int, list)
+
+    def __init__(self, eversd_path, reports=None, png_options=None):
+        super().__init__()
+        self.eversd_path = eversd_path
+        self.reports = reports
+        self.png_options = png_options
+
+    def run(self):
+        try:
+            if self.reports is None:
+                self.audited.emit(audit_card(self.eversd_path))
+            else:
+                workers = card_settings(self.eversd_path)["small_file_workers"]
+                fixed, errors = regenerate_images(self.reports, max_workers=workers, png_options=self.png_options)
+                self.regenerated.emit(fixed, errors)
+        except Exception as e:
+            print(f"Image audit failed: {e}")
+            if self.reports is None:
+                self.audited.emit([])
+            else:
+                self.regenerated.emit(0, [str(e)])
+
+
+class ImageAuditDialog(QDialog):
+    COLUMNS = ["Game", "File", "Problem"]
+
+    def __init__(self, eversd_path, png_options=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Image Audit")
+        self.setGeometry(150, 150, 800, 500)
+
+        self.eversd_path = eversd_path
+        self.png_options = png_options
+        self.reports = []
+        self.worker = None
+
+        self.initUI()
+        self.connect_signals()
+        self.start_audit()
+
+    def initUI(self):
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+
+        self.problem_table = QTableWidget(0, len(self.COLUMNS))
+        self.problem_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.problem_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.problem_table.horizontalHeader().setStretchLastSection(True)
+        self.problem_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        main_layout.addWidget(self.problem_table)
+
+        action_layout = QHBoxLayout()
+        main_layout.addLayout(action_layout)
+        self.audit_button = QPushButton("Re-run Audit")
+        self.regenerate_button = QPushButton("Regenerate Images")
+        self.close_button = QPushButton("Close")
+        self.status_label = QLabel("Status: Ready")
+        action_layout.addWidget(self.audit_button)
+        action_layout.addWidget(self.regenerate_button)
+        action_layout.addStretch()
+        action_layout.addWidget(self.status_label)
+        action_layout.addWidget(self.close_button)
+
+    def connect_signals(self):
+        self.audit_button.clicked.connect(self.start_audit)
+        self.regenerate_button.clicked.connect(self.start_regenerate)
+        self.close_button.clicked.connect(self.reject)
+
+    def set_busy(self, busy, message):
+        self.audit_button.setEnabled(not busy)
+        self.regenerate_button.setEnabled(not busy and bool(self.reports))
+        self.status_label.setText(f"Status: {message}")
+
+    def start_audit(self):
+        self.set_busy(True, "Auditing images...")
+        self.worker = ImageAuditThread(self.eversd_path)
+        self.worker.audited.connect(self.on_audited)
+        self.worker.start()
+
+    def on_audited(self, reports):
+        self.reports = reports
+        rows = [(report["base_name"], name, problem)
+                for report in reports for name, problem in sorted(report["problems"].items())]
+        self.problem_table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.problem_table.setItem(row, column, QTableWidgetItem(value))
+        if rows:
+            self.set_busy(False, f"Found {len(rows)} problem(s) in {len(reports)} game(s).")
+        else:
+            self.set_busy(False, "All images look good.")
+
+    def start_regenerate(self):
+        reply = QMessageBox.question(self, 'Confirm Regeneration',
+                                     f"Rewrite the problem images of {len(self.reports)} game(s) from their best remaining image?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        self.set_busy(True, "Regenerating images...")
+        self.worker = ImageAuditThread(self.eversd_path, self.reports, self.png_options)
+        self.worker.regenerated.connect(self.on_regenerated)
+        self.worker.start()
+
+    def on_regenerated(self, fixed, errors):
+        if errors:
+            QMessageBox.warning(self, "Regeneration Errors", "\n".join(errors[:20]))
+        self.status_label.setText(f"Status: Regenerated {fixed} image(s).")
+        self.start_audit()
+
+    def reject(self):
+        # Don't abandon the card halfway through a write
+        if self.worker and self.worker.isRunning():
+            QMessageBox.warning(self, "Operation Running", "Please wait for the current operation to finish.")
+            return
+        super().reject()
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    dialog = ImageAuditDialog(sys.argv[1] if len(sys.argv) > 1 else ".")
+    dialog.exec_()
+    sys.exit()
@@ -4,31 +4,93 @@ import requests
 from PyQt5.QtWidgets import (QApplication, QDialog, QVBoxLayout, QListWidget, 
                              QListWidgetItem, QPushButton, QMessageBox)
 from PyQt5.QtGui import QIcon, QPixmap
-from PyQt5.QtCore import QSize, Qt, QThread, pyqtSignal
-from duckduckgo_search import DDGS
+from PyQt5.QtCore import QSize, Qt, QThread, QTimer, pyqtSignal
+from providers import get_registry
+from profiling import perf
+
+# Results whose shape is further than this from the target are dropped (1.0 is an exact aspect match)
+MIN_ASPECT_FIT = 0.75
+# ...and so are ones smaller than this fraction of the target in either dimension
+MIN_RESOLUTION_FIT = 0.25
+
+PAGE_SIZE = 30 # Search results requested per page
+MAX_RESULTS = 300 # Stop paging after this many
+MAX_DOWNLOADS = 6 # Thumbnails downloading at once
+SCROLL_SETTLE_DELAY = 50 # ms to wait after a scroll before working out what's visible
+
+
+def image_fit(width, height, target_size):
+    """
+    Scores how well an image of width x height would fill target_size,
+    before it's downloaded. Returns (score, aspect_fit, resolution_fit),
+    each 0..1: aspect_fit compares the shapes, resolution_fit how much
+    the image would have to be upscaled.
+    """
+    target_width, target_height = target_size
+    aspect = width / height
+    target_aspect = target_width / target_height
+    aspect_fit = min(aspect, target_aspect) / max(aspect, target_aspect)
+    resolution_fit = min(1.0, width / target_width, height / target_height)
+    # A wrong shape means cropping or bars, which matters more than some softness
+    return aspect_fit * aspect_fit * (0.5 + 0.5 * resolution_fit), aspect_fit, resolution_fit
+
+
+def rank_images(results, target_size):
+    """
+    Orders artwork results by image_fit, best first, dropping poor fits.
+    Results without dimensions go after the scored ones. If nothing
+    passes the filter, everything is kept so the user still has a choice.
+    """
+    scored, unknown = [], []
+    for result in results:
+        try:
+            width, height = int(result.get("width")), int(result.get("height"))
+        except (TypeError, ValueError):
+            unknown.append(result)
+            continue
+        if width <= 0 or height <= 0:
+            unknown.append(result)
+            continue
+        score, aspect_fit, resolution_fit = image_fit(width, height, target_size)
+        scored.append((score, aspect_fit >= MIN_ASPECT_FIT and resolution_fit >= MIN_RESOLUTION_FIT, result))
+    scored.sort(key=lambda entry: entry[0], reverse=True) # Stable, so ties keep the provider's order
+    kept = [result for _, fits, result in scored if fits]
+    if not kept:
+        return [result for _, _, result in scored] + unknown
+    return kept + unknown
+
 
 class ImageUrlSearchThread(QThread):
-    """Worker thread to search for image URLs without freezing the GUI."""
-    finished = pyqtSignal(list)
+    """
+    Worker thread to search for images without freezing the GUI. Fetches
+    up to limit results and emits the ones not in seen, best fit first,
+    the URLs of every new result (including any ranking dropped), and
+    whether the search came back with everything it was asked for.
+    """
+    finished = pyqtSignal(list, list, bool)
 
-    def __init__(self, query):
+    def __init__(self, query, target_size=None, limit=PAGE_SIZE, seen=()):
         super().__init__()
         self.query = query
+        self.target_size = target_size
+        self.limit = limit
+        self.seen = set(seen)
 
     def run(self):
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-            }
-            with DDGS(headers=headers) as ddgs:
-                results = ddgs.images(keywords=self.query, max_results=30)
-                if results:
-                    self.finished.emit([res['image'] for res in results])
-                else:
-                    self.finished.emit([])
-        except Exception as e:
-            print(f"Image URL search failed: {e}")
-            self.finished.emit([])
+        with perf.operation("ImageUrlSearchThread.run"):
+            self.search()
+
+    def search(self):
+        results, error = get_registry().lookup("artwork", self.query, mode="merge", limit=self.limit)
+        if error:
+            print(f"Image URL search failed: {error}")
+        results = results or []
+        more = len(results) >= self.limit
+        results = [res for res in results if res["image"] not in self.seen]
+        new_urls = [res["image"] for res in results]
+        if self.target_size:
+            results = rank_images(results, self.target_size)
+        self.finished.emit(results, new_urls, more)
 
 class ImageDownloaderThread(QThread):
     """Worker thread to download a single image."""
@@ -41,6 +103,10 @@ class ImageDownloaderThread(QThread):
         self.headers = headers
 
     def run(self):
+        with perf.operation("ImageDownloaderThread.run"):
+            self.download()
+
+    def download(self):
         try:
             headers = self.headers.copy()
             headers['Referer'] = 'https://duckduckgo.com/'
@@ -57,13 +123,25 @@ class ImageDownloaderThread(QThread):
 
 
 class ImageSearchDialog(QDialog):
-    def __init__(self, query, parent_controller=None):
+    def __init__(self, query, parent_controller=None, target_size=None):
         super().__init__(parent_controller.window if parent_controller else None)
         self.setWindowTitle(f"Image Search: '{query}'")
         self.setGeometry(150, 150, 800, 600)
         self.selected_image_url = None
         self.controller = parent_controller
+        self.query = query
+        self.target_size = target_size
         self.downloader_threads = [] # Keep track of threads
+        self.active_downloads = 0
+        self.requested_rows = set() # Rows whose thumbnail download has started
+        self.seen_urls = set() # Every image the search has returned, shown or filtered out
+        self.requested_results = 0
+        self.more_results = True
+        self.searching = False
+        self.search_threads = [] # Kept until finished, like the downloaders
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+        }
 
         self.layout = QVBoxLayout()
         self.setLayout(self.layout)
@@ -80,40 +158,100 @@ class ImageSearchDialog(QDialog):
         self.select_button.clicked.connect(self.accept)
         self.layout.addWidget(self.select_button)
 
-        self.url_search_thread = ImageUrlSearchThread(query)
-        self.url_search_thread.finished.connect(self.populate_placeholders)
-        self.url_search_thread.start()
+        # Scrolling and resizing only schedule a visibility pass, so a fling doesn't start downloads on the way past
+        self.scroll_timer = QTimer(self)
+        self.scroll_timer.setSingleShot(True)
+        self.scroll_timer.setInterval(SCROLL_SETTLE_DELAY)
+        self.scroll_timer.timeout.connect(self.on_view_settled)
+        self.image_list.verticalScrollBar().valueChanged.connect(lambda _: self.scroll_timer.start())
+        self.image_list.verticalScrollBar().rangeChanged.connect(lambda *_: self.scroll_timer.start())
+
+        self.request_more_results()
+
+    def request_more_results(self):
+        """Asks for the next page of search results, unless a search is running or the last one ran dry."""
+        if self.searching or not self.more_results or self.requested_results >= MAX_RESULTS:
+            return
+        self.searching = True
+        self.requested_results += PAGE_SIZE
+        search_thread = ImageUrlSearchThread(self.query, self.target_size, self.requested_results, self.seen_urls)
+        search_thread.finished.connect(self.populate_placeholders)
+        self.search_threads = [t for t in self.search_threads if not t.isFinished()] + [search_thread]
+        search_thread.start()
         if self.controller:
-            self.controller.update_status(f"Searching for '{query}'...")
+            self.controller.update_status(f"Searching for '{self.query}'...")
 
-    def populate_placeholders(self, image_urls):
+    def populate_placeholders(self, results, new_urls, more):
+        self.searching = False
+        self.more_results = more
+        self.seen_urls.update(new_urls)
+        first_page = self.image_list.count() == 0
         if self.controller:
             self.controller.update_status("Search complete. Loading thumbnails...")
-        if not image_urls:
+        if not results and first_page:
             QMessageBox.warning(self, "No Results", "Could not find any images for that query.")
             self.reject()
             return
 
         placeholder_icon = QIcon.fromTheme("image-loading")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-        }
-        for url in image_urls:
+        for result in results:
             item = QListWidgetItem(placeholder_icon, "")
-            item.setData(Qt.UserRole, url)
+            item.setData(Qt.UserRole, result["image"])
+            # The small preview DDG already made is plenty for a 150px icon
+            item.setData(Qt.UserRole + 1, result.get("thumbnail") or result["image"])
+            if result.get("width") and result.get("height"):
+                item.setToolTip(f"{result['width']} x {result['height']}")
             self.image_list.addItem(item)
-            # Start downloader for this item
-            downloader = ImageDownloaderThread(url, item, headers)
+        if not results:
+            # Everything new was already shown or filtered out; nothing will change the view, so ask again
+            self.request_more_results()
+            return
+        # Let the list lay out the new items before working out which are visible
+        self.scroll_timer.start()
+
+    def visible_rows(self):
+        """Returns the rows in or within a screen of the viewport, visible ones first, in reading order."""
+        viewport = self.image_list.viewport().rect()
+        near = viewport.adjusted(0, -viewport.height() // 2, 0, viewport.height())
+        rows = []
+        for row in range(self.image_list.count()):
+            rect = self.image_list.visualItemRect(self.image_list.item(row))
+            if rect.intersects(near):
+                rows.append((not rect.intersects(viewport), rect.top(), rect.left(), row))
+        return [row for *_, row in sorted(rows)]
+
+    def on_view_settled(self):
+        self.fetch_visible_thumbnails()
+        scroll_bar = self.image_list.verticalScrollBar()
+        # Page in more results once the end is in sight, or while the list doesn't fill the view
+        if scroll_bar.value() >= scroll_bar.maximum() - scroll_bar.pageStep():
+            self.request_more_results()
+
+    def fetch_visible_thumbnails(self):
+        """Starts downloads for the most visible thumbnails not yet requested, up to MAX_DOWNLOADS at a time."""
+        self.downloader_threads = [t for t in self.downloader_threads if not t.isFinished()]
+        slots = MAX_DOWNLOADS - self.active_downloads
+        for row in self.visible_rows():
+            if slots <= 0:
+                break
+            if row in self.requested_rows:
+                continue
+            self.requested_rows.add(row)
+            item = self.image_list.item(row)
+            downloader = ImageDownloaderThread(item.data(Qt.UserRole + 1), item, self.headers)
             downloader.finished.connect(self.on_image_downloaded)
             self.downloader_threads.append(downloader)
             downloader.start()
+            self.active_downloads += 1
+            slots -= 1
 
     def on_image_downloaded(self, icon, item):
         if not icon.isNull():
             item.setIcon(icon)
-        # Clean up finished threads
-        self.downloader_threads = [t for t in self.downloader_threads if not t.isFinished()]
-        if not self.downloader_threads and self.controller:
+        # A slot is free; hand it to whatever is most visible now
+        self.active_downloads -= 1
+        self.fetch_visible_thumbnails()
+        if not self.active_downloads and self.controller:
              self.controller.update_status("Image search ready.")
 
     def accept(self):
@@ -130,7 +268,7 @@ class ImageSearchDialog(QDialog):
 
     def closeEvent(self, event):
         # Ensure all downloader threads are terminated when dialog is closed
-        for thread in self.downloader_threads:
+        for thread in self.downloader_threads + self.search_threads:
             thread.quit()
             thread.wait()
         super().closeEvent(event)
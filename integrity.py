@@ -0,0 +1,129 @@
+import os
+import json
+from cores import KNOWN_ROM_EXTENSIONS
+from utils import IMAGE_SUFFIXES
+
+# Only files with one of these extensions are treated as (deletable) orphan ROMs
+ROM_EXTENSIONS = KNOWN_ROM_EXTENSIONS | {"7z"}
+
+
+def is_ignored_file(file_name):
+    """Dotfiles and temp files (atomic writes, journal staging) are never reported or deleted."""
+    return file_name.startswith(".") or file_name.endswith(".tmp")
+
+
+def _image_base_name(file_name):
+    """Returns the base name an image file would belong to, or None if it isn't a game image."""
+    for suffix in IMAGE_SUFFIXES:
+        if file_name.endswith(suffix) and len(file_name) > len(suffix):
+            return file_name[:-len(suffix)]
+    return None
+
+
+def scan_integrity(eversd_path):
+    """
+    Cross-checks every file in 'game' against the game JSONs in a single
+    directory pass. Returns a report dict:
+
+        orphan_roms:   [(file_name, size)] files no JSON's romFileName points to
+        orphan_images: [(file_name, size)] images whose game has no JSON
+        unknown:       [(file_name, size)] other files; reported, never deleted
+        missing_roms:  [(json_name, rom_file_name)] JSONs whose ROM is gone
+        bad_json:      [(json_name, size)] JSONs that can't be read
+        orphan_bytes:  total size of the orphaned files
+    """
+    game_path = os.path.join(eversd_path, 'game')
+    report = {"orphan_roms": [], "orphan_images": [], "unknown": [], "missing_roms": [], "bad_json": [],
+              "orphan_bytes": 0}
+
+    sizes = {}
+    with os.scandir(game_path) as it:
+        for entry in it:
+            if entry.is_file() and not is_ignored_file(entry.name):
+                sizes[entry.name] = entry.stat().st_size
+
+    base_names = set()
+    rom_names = set()
+    for name in sizes:
+        if not name.endswith(".json"):
+            continue
+        base_name = name[:-len(".json")]
+        base_names.add(base_name)
+        try:
+            with open(os.path.join(game_path, name), 'r') as f:
+                rom_file_name = json.load(f).get("romFileName")
+        except (json.JSONDecodeError, IOError, AttributeError):
+            report["bad_json"].append((name, sizes[name]))
+            continue
+        if not rom_file_name:
+            report["missing_roms"].append((name, ""))
+        elif rom_file_name not in sizes:
+            report["missing_roms"].append((name, rom_file_name))
+        else:
+            rom_names.add(rom_file_name)
+
+    for name, size in sorted(sizes.items()):
+        if name.endswith(".json") or name in rom_names:
+            continue
+        image_base = _image_base_name(name)
+        if image_base is not None:
+            if image_base in base_names:
+                continue
+            report["orphan_images"].append((name, size))
+        elif os.path.splitext(name)[1].lower().lstrip(".") in ROM_EXTENSIONS:
+            # Covers ROMs with no JSON and stale ROMs left behind when a game's ROM was replaced
+            report["orphan_roms"].append((name, size))
+        else:
+            report["unknown"].append((name, size))
+            continue
+        report["orphan_bytes"] += size
+
+    report["bad_json"].sort()
+    report["missing_roms"].sort()
+    return report
+
+
+def clean_up(eversd_path, report, remove_broken_games=False, status_callback=None):
+    """
+    Deletes the orphans found by scan_integrity. With remove_broken_games,
+    also deletes JSONs (and their images) whose ROM is missing or that
+    can't be read. Returns (files_removed, bytes_freed, errors).
+    """
+    game_path = os.path.join(eversd_path, 'game')
+    targets = [name for name, _ in report["orphan_roms"] + report["orphan_images"]]
+    if remove_broken_games:
+        for json_name, _ in report["missing_roms"] + report["bad_json"]:
+            base_name = json_name[:-len(".json")]
+            targets.append(json_name)
+            targets.extend(f"{base_name}{suffix}" for suffix in IMAGE_SUFFIXES)
+
+    removed, freed, errors = 0, 0, []
+    for name in targets:
+        path = os.path.join(game_path, name)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            errors.append(f"{name}: {e}")
+            continue
+        removed += 1
+        freed += size
+        if status_callback:
+            status_callback(f"Deleted {name}")
+    return removed, freed, errors
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python3 integrity.py <eversd_path> [--clean] [--remove-broken]")
+        sys.exit(1)
+    report = scan_integrity(sys.argv[1])
+    print(json.dumps(report, indent=4))
+    if "--clean" in sys.argv[2:]:
+        removed, freed, errors = clean_up(sys.argv[1], report, "--remove-broken" in sys.argv[2:], print)
+        print(f"Removed {removed} file(s), freed {freed / (1024 * 1024):.1f} MB.")
+        for error in errors:
+            print(f"Error: {error}")
@@ -0,0 +1,156 @@
+
+import sys
+from PyQt5.QtWidgets import (QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QMessageBox, QCheckBox)
+from PyQt5.QtCore import QThread, pyqtSignal
+from integrity import scan_integrity, clean_up
+
+class IntegrityThread(QThread):
+    """Worker thread that scans (or cleans up) a card's game directory."""
+    scanned = pyqtSignal(dict)
+    cleaned = pyqtSignal(int, int, list)
+
+    def __init__(self, eversd_path, report=None, remove_broken_games=False):
+        super().__init__()
+        self.eversd_path = eversd_path
+        self.report = report
+        self.remove_broken_games = remove_broken_games
+
+    def run(self):
+        try:
+            if self.report is None:
+                self.scanned.emit(scan_integrity(self.eversd_path))
+            else:
+                self.cleaned.emit(*clean_up(self.eversd_path, self.report, self.remove_broken_games))
+        except Exception as e:
+            print(f"Integrity scan failed: {e}")
+            if self.report is None:
+                self.scanned.emit({})
+            else:
+                self.cleaned.emit(0, 0, [str(e)])
+
+
+class IntegrityDialog(QDialog):
+    COLUMNS = ["Problem", "File", "Size"]
+    PROBLEM_LABELS = [
+        ("orphan_roms", "ROM without game"),
+        ("orphan_images", "Image without game"),
+        ("unknown", "Unknown file (kept)"),
+        ("missing_roms", "Game without ROM"),
+        ("bad_json", "Unreadable JSON"),
+    ]
+
+    def __init__(self, eversd_path, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Game Directory Integrity")
+        self.setGeometry(150, 150, 800, 500)
+
+        self.eversd_path = eversd_path
+        self.report = {}
+        self.worker = None
+
+        self.initUI()
+        self.connect_signals()
+        self.start_scan()
+
+    def initUI(self):
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+
+        self.problem_table = QTableWidget(0, len(self.COLUMNS))
+        self.problem_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.problem_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.problem_table.horizontalHeader().setStretchLastSection(True)
+        self.problem_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        main_layout.addWidget(self.problem_table)
+
+        self.remove_broken_checkbox = QCheckBox("Also remove games whose ROM is missing or whose JSON is unreadable")
+        main_layout.addWidget(self.remove_broken_checkbox)
+
+        action_layout = QHBoxLayout()
+        main_layout.addLayout(action_layout)
+        self.scan_button = QPushButton("Re-scan")
+        self.clean_button = QPushButton("Clean Up")
+        self.close_button = QPushButton("Close")
+        self.status_label = QLabel("Status: Ready")
+        action_layout.addWidget(self.scan_button)
+        action_layout.addWidget(self.clean_button)
+        action_layout.addStretch()
+        action_layout.addWidget(self.status_label)
+        action_layout.addWidget(self.close_button)
+
+    def connect_signals(self):
+        self.scan_button.clicked.connect(self.start_scan)
+        self.clean_button.clicked.connect(self.start_clean_up)
+        self.close_button.clicked.connect(self.reject)
+
+    def problem_count(self):
+        return sum(len(self.report.get(key, [])) for key, _ in self.PROBLEM_LABELS)
+
+    def set_busy(self, busy, message):
+        self.scan_button.setEnabled(not busy)
+        self.clean_button.setEnabled(not busy and self.problem_count() > 0)
+        self.status_label.setText(f"Status: {message}")
+
+    def start_scan(self):
+        self.set_busy(True, "Scanning game directory...")
+        self.worker = IntegrityThread(self.eversd_path)
+        self.worker.scanned.connect(self.on_scanned)
+        self.worker.start()
+
+    def on_scanned(self, report):
+        self.report = report
+        rows = []
+        for key, label in self.PROBLEM_LABELS:
+            for name, detail in report.get(key, []):
+                if key == "missing_roms":
+                    rows.append((label, name, detail or "(no romFileName)"))
+                else:
+                    rows.append((label, name, f"{detail / 1024:.1f} KB"))
+        self.problem_table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.problem_table.setItem(row, column, QTableWidgetItem(value))
+
+        if not report:
+            self.set_busy(False, "Could not read the game directory.")
+        elif rows:
+            orphan_mb = report["orphan_bytes"] / (1024 * 1024)
+            self.set_busy(False, f"Found {len(rows)} problem(s); {orphan_mb:.1f} MB in orphaned files.")
+        else:
+            self.set_busy(False, "No problems found.")
+
+    def start_clean_up(self):
+        remove_broken = self.remove_broken_checkbox.isChecked()
+        message = "Permanently delete all orphaned files"
+        if remove_broken:
+            message += " and all broken games"
+        reply = QMessageBox.question(self, 'Confirm Clean Up', f"{message}?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        self.set_busy(True, "Cleaning up...")
+        self.worker = IntegrityThread(self.eversd_path, self.report, remove_broken)
+        self.worker.cleaned.connect(self.on_cleaned)
+        self.worker.start()
+
+    def on_cleaned(self, removed, freed, errors):
+        if errors:
+            QMessageBox.warning(self, "Clean Up Errors", "\n".join(errors[:20]))
+        QMessageBox.information(self, "Clean Up Complete",
+                                f"Removed {removed} file(s), freed {freed / (1024 * 1024):.1f} MB.")
+        self.start_scan()
+
+    def reject(self):
+        # Don't abandon the card halfway through a clean up
+        if self.worker and self.worker.isRunning():
+            QMessageBox.warning(self, "Operation Running", "Please wait for the current operation to finish.")
+            return
+        super().reject()
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    dialog = IntegrityDialog(sys.argv[1] if len(sys.argv) > 1 else ".")
+    dialog.exec_()
+    sys.exit()
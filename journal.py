@@ -0,0 +1,224 @@
+import itertools
+import json
+import os
+import threading
+import time
+from utils import atomic_write
+
+JOURNAL_DIR = ".eversd_journal"
+
+_op_counter = itertools.count()
+_op_lock = threading.Lock()
+_live_ops = set() # op ids of this process's transactions that haven't committed or aborted yet
+
+
+def _new_op_id():
+    with _op_lock:
+        count = next(_op_counter)
+    return f"{time.time_ns():x}-{os.getpid()}-{count}"
+
+
+def _is_live(op_id):
+    with _op_lock:
+        return op_id in _live_ops
+
+
+def _staging_marker(op_id):
+    """The part every staged file of an operation has in its name, including atomic_write's own .tmp."""
+    return f".{op_id}.tmp"
+
+
+class Transaction:
+    """
+    One multi-file operation on a card. New files are written to staging
+    files next to their targets, and renames and removals are only
+    recorded, so nothing visible changes until commit(). The commit point
+    is a single atomic rewrite of the journal record; after it, the steps
+    are applied and the record deleted. A crash before the commit point
+    rolls back to the old files, a crash after it rolls forward.
+    Use as a context manager to commit on success and abort on error.
+
+    Until the commit, the record on the card only lists the folders files
+    are staged in, saved the first time each one is used. Staged names all
+    carry the op id, so a rollback finds them by name, and a game costs
+    two record fsyncs rather than one per step.
+    """
+
+    def __init__(self, journal, op, description):
+        self.journal = journal
+        self.op_id = _new_op_id()
+        self.record_path = os.path.join(journal.journal_path, f"{self.op_id}.json")
+        self.record = {"id": self.op_id, "op": op, "description": description, "state": "pending",
+                       "started": time.time(), "dirs": [], "steps": []}
+        self.done = False
+        with _op_lock:
+            _live_ops.add(self.op_id)
+
+    def _save(self):
+        atomic_write(self.record_path, json.dumps(self.record))
+
+    def _finish(self):
+        self.done = True
+        with _op_lock:
+            _live_ops.discard(self.op_id)
+
+    def stage(self, target_path):
+        """Returns the path to write a new target_path's contents to."""
+        staged = f"{target_path}{_staging_marker(self.op_id)}"
+        staged_dir = self.journal.rel(os.path.dirname(staged))
+        if staged_dir not in self.record["dirs"]:
+            # Saved before the staged file exists, so a rollback knows where to look
+            self.record["dirs"].append(staged_dir)
+            self._save()
+        self.record["steps"].append({"action": "write", "target": self.journal.rel(target_path),
+                                     "staged": self.journal.rel(staged)})
+        return staged
+
+    def write(self, target_path, data):
+        """Stages bytes or text to replace target_path on commit."""
+        atomic_write(self.stage(target_path), data)
+
+    def rename(self, source_path, target_path):
+        """Moves source_path to target_path on commit, with no data copied."""
+        self.record["steps"].append({"action": "rename", "source": self.journal.rel(source_path),
+                                     "target": self.journal.rel(target_path)})
+
+    def remove(self, target_path):
+        """Deletes target_path on commit."""
+        self.record["steps"].append({"action": "remove", "target": self.journal.rel(target_path)})
+
+    def commit(self):
+        """Flips the record to committed, then applies the steps."""
+        for step in self.record["steps"]:
+            if step["action"] == "write":
+                with open(self.journal.abs(step["staged"]), 'rb') as f:
+                    os.fsync(f.fileno())
+        self.record["state"] = "committed"
+        self._save()
+        self.journal.apply(self.record)
+        os.remove(self.record_path)
+        self._finish()
+
+    def abort(self):
+        """Discards the staged files; the card is left as it was."""
+        try:
+            self.journal.discard(self.record)
+            if os.path.exists(self.record_path):
+                os.remove(self.record_path)
+        finally:
+            self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.done:
+            return False
+        if exc_type is None:
+            self.commit()
+        else:
+            try:
+                self.abort()
+            except OSError as e:
+                print(f"Could not abort journaled operation {self.op_id}: {e}")
+        return False
+
+
+class Journal:
+    """
+    Write-ahead journal kept on the card in a hidden folder in its root,
+    so an interrupted operation can be finished from whichever computer
+    the card is plugged into next. Each operation has its own record file,
+    so parallel and batched writers never contend for the journal.
+    """
+
+    def __init__(self, eversd_path):
+        self.eversd_path = eversd_path
+        self.journal_path = os.path.join(eversd_path, JOURNAL_DIR)
+
+    def rel(self, path):
+        return os.path.relpath(path, self.eversd_path)
+
+    def abs(self, rel_path):
+        return os.path.join(self.eversd_path, rel_path)
+
+    def begin(self, op, description=""):
+        """Starts a Transaction."""
+        os.makedirs(self.journal_path, exist_ok=True)
+        return Transaction(self, op, description)
+
+    def apply(self, record):
+        """Applies a committed record's steps. Safe to repeat after a crash part way through."""
+        for step in record["steps"]:
+            target = self.abs(step["target"])
+            if step["action"] == "write":
+                staged = self.abs(step["staged"])
+                if os.path.exists(staged):
+                    os.replace(staged, target)
+            elif step["action"] == "rename":
+                source = self.abs(step["source"])
+                if os.path.exists(source):
+                    os.replace(source, target)
+            elif step["action"] == "remove":
+                if os.path.exists(target):
+                    os.remove(target)
+
+    def discard(self, record):
+        """
+        Deletes the staged files of an uncommitted record, found by the op
+        id in their names, along with any temp file a crash left mid-write.
+        """
+        marker = _staging_marker(record["id"])
+        dirs = set(record.get("dirs", []))
+        dirs.update(os.path.dirname(step["staged"]) for step in record["steps"] if step["action"] == "write")
+        for rel_dir in dirs:
+            staging_dir = self.abs(rel_dir)
+            if not os.path.isdir(staging_dir):
+                continue
+            for name in os.listdir(staging_dir):
+                if marker in name:
+                    os.remove(os.path.join(staging_dir, name))
+
+    def pending(self):
+        """
+        Returns the paths of journal records left behind by unfinished
+        operations. Transactions still running in this process (on a fleet
+        or backup worker, say) are left out.
+        """
+        if not os.path.isdir(self.journal_path):
+            return []
+        return sorted(os.path.join(self.journal_path, name) for name in os.listdir(self.journal_path)
+                      if name.endswith(".json") and not _is_live(name[:-len(".json")]))
+
+    def recover(self, status_callback=None):
+        """
+        Finishes or undoes every operation an earlier run left behind:
+        committed ones roll forward, the rest roll back. Operations still
+        running in this process are never touched. Returns (rolled_forward,
+        rolled_back, errors).
+        """
+        rolled_forward, rolled_back, errors = 0, 0, []
+        if os.path.isdir(self.journal_path):
+            # A record whose own first save was interrupted; nothing was staged yet
+            for name in os.listdir(self.journal_path):
+                if name.endswith(".json.tmp"):
+                    os.remove(os.path.join(self.journal_path, name))
+        for record_path in self.pending():
+            try:
+                with open(record_path, 'r') as f:
+                    record = json.load(f)
+                record.setdefault("id", os.path.basename(record_path)[:-len(".json")])
+                if record.get("state") == "committed":
+                    self.apply(record)
+                    rolled_forward += 1
+                    action = "Finished"
+                else:
+                    self.discard(record)
+                    rolled_back += 1
+                    action = "Rolled back"
+                os.remove(record_path)
+                if status_callback:
+                    status_callback(f"{action} interrupted {record.get('op')} of '{record.get('description')}'")
+            except (OSError, json.JSONDecodeError, KeyError) as e:
+                errors.append(f"{os.path.basename(record_path)}: {e}")
+        return rolled_forward, rolled_back, errors
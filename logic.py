@@ -1,24 +1,40 @@
 import os
 import json
-import shutil
 import glob
 import re # Import regular expressions
-from utils import resize_image
+import time
+from utils import load_image, fit_image, optimize_png, IMAGE_NAME_SUFFIXES, IMAGE_SIZES, BOXART_SUFFIXES, BANNER_SUFFIX
+from profiling import instrumented
+from cores import core_registry
+from rom_source import rom_source_name, rom_source_size, copy_rom, resolve_rom_source
+from journal import Journal
+from space import WritePlan
+from card_bench import card_settings
+
+def make_safe_base_name(title):
+    """Sanitizes a game title into the base filename used for all of its files."""
+    return re.sub(r'[^a-z0-9]', '', title.lower())
 
 class EverSDLogic:
-    def __init__(self, status_callback=None):
+    def __init__(self, status_callback=None, png_options=None, digest_cache=None):
         self.status_callback = status_callback
+        self.digest_cache = digest_cache # Optional rom_ident.DigestCache, fed by ROM copies
+        self.png_options = png_options # See utils.DEFAULT_PNG_OPTIONS
+        self.png_bytes_saved = 0 # Running total for this session
+        self.write_rates = {} # eversd_path -> bytes/second measured on the last large write
 
     def _update_status(self, message):
         if self.status_callback:
             self.status_callback(message)
 
+    @instrumented()
     def find_emulator_files(self, eversd_path):
-        """Finds all .so emulator files in the EverSD root."""
+        """Finds all .so emulator files in the EverSD root. Cached until the root changes."""
         if not os.path.isdir(eversd_path):
             return []
-        return [f for f in os.listdir(eversd_path) if f.endswith('.so')]
+        return core_registry.cores(eversd_path)
 
+    @instrumented()
     def scan_for_games(self, eversd_path):
         """Scans the 'game' directory and returns a list of game info dicts."""
         game_path = os.path.join(eversd_path, 'game')
@@ -44,19 +60,27 @@ class EverSDLogic:
             self._update_status("PermissionError: Cannot read SD card.")
             return []
 
+    def find_game_files(self, eversd_path, game_base_name):
+        """Returns the paths of all files that belong to a game, by filename convention."""
+        game_path = os.path.join(eversd_path, 'game')
+        game_files = glob.glob(os.path.join(game_path, f"{glob.escape(game_base_name)}.*"))
+        game_files.extend(glob.glob(os.path.join(game_path, f"{glob.escape(game_base_name)}0*.*")))
+        game_files.extend(glob.glob(os.path.join(game_path, f"{glob.escape(game_base_name)}_*.*")))
+        return sorted(set(game_files)) # Use set to avoid duplicates
+
+    @instrumented()
     def delete_game(self, eversd_path, game_base_name):
         """Deletes a game and all its associated files."""
-        game_path = os.path.join(eversd_path, 'game')
-        files_to_delete = glob.glob(os.path.join(game_path, f"{game_base_name}.*"))
-        files_to_delete.extend(glob.glob(os.path.join(game_path, f"{game_base_name}0*.*")))
-        files_to_delete.extend(glob.glob(os.path.join(game_path, f"{game_base_name}_*.*")))
+        files_to_delete = self.find_game_files(eversd_path, game_base_name)
 
         if not files_to_delete:
             self._update_status(f"Error: No files found for game '{game_base_name}'.")
             return False
         try:
-            for f in set(files_to_delete): # Use set to avoid duplicates
-                os.remove(f)
+            with Journal(eversd_path).begin("delete_game", game_base_name) as txn:
+                for f in files_to_delete:
+                    txn.remove(f)
+            for f in files_to_delete:
                 self._update_status(f"Deleted {os.path.basename(f)}")
             self._update_status(f"Successfully deleted all files for '{game_base_name}'.")
             return True
@@ -64,6 +88,7 @@ class EverSDLogic:
             self._update_status(f"Error deleting game files: {e}")
             return False
 
+    @instrumented()
     def get_game_details(self, eversd_path, game_base_name):
         """Retrieves all details for a specific game."""
         game_path = os.path.join(eversd_path, 'game')
@@ -90,22 +115,108 @@ class EverSDLogic:
 
         # --- Find Image Files by Convention ---
         # Boxart (e.g., game0.png or game0_1080.png)
-        boxart_files = glob.glob(os.path.join(game_path, f"{game_base_name}0*.png"))
-        if boxart_files:
-            # Prioritize the higher resolution one if available
-            hires_boxart = os.path.join(game_path, f"{game_base_name}0_1080.png")
-            if hires_boxart in boxart_files:
-                details["boxart_path"] = hires_boxart
-            else:
-                details["boxart_path"] = boxart_files[0]
+        # Prioritize the higher resolution one if available
+        for boxart_name in (f"{game_base_name}{suffix}" for suffix in BOXART_SUFFIXES):
+            boxart_file = os.path.join(game_path, boxart_name)
+            if os.path.exists(boxart_file):
+                details["boxart_path"] = boxart_file
+                break
 
         # Banner (e.g., game_gamebanner.png)
-        banner_file = os.path.join(game_path, f"{game_base_name}_gamebanner.png")
+        banner_file = os.path.join(game_path, f"{game_base_name}{BANNER_SUFFIX}")
         if os.path.exists(banner_file):
             details["banner_path"] = banner_file
             
         return details
 
+    def _prepare_images(self, data, game_path, safe_base_name):
+        """
+        Validates, normalizes and resizes the selected boxart and banner in
+        memory, before anything is written to the card. Returns (images, error)
+        where images maps 'boxart'/'banner' to (png_bytes, bytes_saved).
+        """
+        images = {}
+        for kind, size in IMAGE_SIZES.items():
+            source_path = data.get(f'{kind}_path')
+            if not source_path:
+                continue
+            dest_name = f"{safe_base_name}{IMAGE_NAME_SUFFIXES[kind][0]}"
+            # The edit dialog passes the card's own image back when it wasn't changed
+            if os.path.abspath(source_path) == os.path.abspath(os.path.join(game_path, dest_name)):
+                continue
+            img, error = load_image(source_path, size)
+            if error:
+                return None, f"Invalid {kind} image: {error}"
+            images[kind] = optimize_png(fit_image(img, size), self.png_options)
+        return images, None
+
+    def _image_targets(self, images, safe_base_name):
+        """Returns [(kind, file_name)] for every image file the prepared images are written to."""
+        targets = []
+        for kind, suffixes in IMAGE_NAME_SUFFIXES.items():
+            if images.get(kind):
+                # The Evercade finds images by filename convention; boxart in both variants.
+                targets.extend((kind, f"{safe_base_name}{suffix}") for suffix in suffixes)
+        return targets
+
+    def _write_images(self, images, game_path, safe_base_name, txn):
+        """Stages the prepared images in a journal transaction by filename convention."""
+        written = []
+        targets = self._image_targets(images, safe_base_name)
+
+        total_written = total_saved = 0
+        for kind, name in targets:
+            png_bytes, saved = images[kind]
+            txn.write(os.path.join(game_path, name), png_bytes)
+            total_written += len(png_bytes)
+            written.append(name)
+            if saved is None:
+                self._update_status(f"Wrote {name} ({len(png_bytes) / 1024:.1f} KB)")
+                continue
+            total_saved += saved
+            self._update_status(f"Wrote {name} ({len(png_bytes) / 1024:.1f} KB, saved {saved / 1024:.1f} KB)")
+
+        if targets and not (self.png_options or {}).get("report_savings"):
+            self._update_status(f"Images: {total_written / 1024:.1f} KB written.")
+        elif targets:
+            self.png_bytes_saved += total_saved
+            self._update_status(f"Images: {total_written / 1024:.1f} KB written, {total_saved / 1024:.1f} KB saved "
+                                f"({self.png_bytes_saved / 1024:.1f} KB saved this session).")
+        return written
+
+    def _copy_rom(self, source_path, dest_rom_path, txn):
+        """Stages a copy (or unpack) of a ROM source in a journal transaction. Returns its digests."""
+        chunk_size = card_settings(txn.journal.eversd_path)["copy_chunk_size"]
+        return copy_rom(source_path, txn.stage(dest_rom_path), chunk_size)
+
+    def _plan_writes(self, eversd_path, game_path, safe_base_name, images, json_text, rom_source=None, dest_rom_path=None):
+        """Returns the WritePlan of one game's ROM, images and JSON, from their exact sizes."""
+        plan = WritePlan(eversd_path)
+        if rom_source:
+            plan.add_file(dest_rom_path, rom_source_size(rom_source))
+        for kind, name in self._image_targets(images, safe_base_name):
+            plan.add_file(os.path.join(game_path, name), len(images[kind][0]))
+        plan.add_file(os.path.join(game_path, f"{safe_base_name}.json"), len(json_text.encode("utf-8")))
+        return plan
+
+    def _check_space(self, plan):
+        """Reports the plan and returns False, before any I/O starts, if it won't fit on the card."""
+        write_rate = self.write_rates.get(plan.eversd_path) or card_settings(plan.eversd_path)["write_rate"]
+        fits, message = plan.check(write_rate)
+        self._update_status(message)
+        return fits
+
+    def _record_write_rate(self, plan, elapsed):
+        """Remembers the card's write speed from a finished operation, if it was big enough to tell."""
+        if plan.data_bytes >= 1024 * 1024 and elapsed > 0:
+            self.write_rates[plan.eversd_path] = plan.data_bytes / elapsed
+
+    def _remember_digests(self, rom_path, info):
+        """Caches the digests computed while copying, once the ROM is in place."""
+        if self.digest_cache and info:
+            self.digest_cache.put(rom_path, os.stat(rom_path), info)
+
+    @instrumented()
     def update_game_entry(self, data):
         """Updates an existing game's files."""
         try:
@@ -113,17 +224,29 @@ class EverSDLogic:
             game_path = os.path.join(eversd_path, 'game')
             original_base_name = data['original_base_name']
 
-            # For simplicity, we'll keep the base filename the same.
-            # A more complex implementation could handle renaming all files.
-            safe_base_name = original_base_name
-
             # --- Path Definitions ---
-            json_path = os.path.join(game_path, f"{safe_base_name}.json")
+            original_json_path = os.path.join(game_path, f"{original_base_name}.json")
+
+            # --- Check images before touching the card ---
+            # Compared against the current names, so unchanged card images aren't re-encoded
+            images, error = self._prepare_images(data, game_path, original_base_name)
+            if error:
+                self._update_status(error)
+                return False, None
 
             # --- Read existing metadata to preserve what's not editable in the form ---
-            with open(json_path, 'r') as f:
+            with open(original_json_path, 'r') as f:
                 metadata = json.load(f)
 
+            # --- Follow a changed title with the base name, if the new one is free ---
+            safe_base_name = make_safe_base_name(data.get('title', '')) or original_base_name
+            if safe_base_name != original_base_name:
+                conflict = self.rename_conflict(game_path, metadata, safe_base_name)
+                if conflict:
+                    self._update_status(f"Keeping file names '{original_base_name}': {conflict}")
+                    safe_base_name = original_base_name
+            json_path = os.path.join(game_path, f"{safe_base_name}.json")
+
             # --- Update Metadata ---
             metadata.update({
                 "romTitle": data.get('title', ''),
@@ -137,40 +260,52 @@ class EverSDLogic:
                 "romDeveloper": data.get('developer', metadata.get('romDeveloper', '')),
             })
 
-            # --- File Operations ---
-            # Only replace the ROM if a new one was selected
+            # --- Check the card has room ---
+            rom_info = dest_rom_path = rom_source = None
             if data.get('rom_path'):
-                rom_extension = os.path.splitext(data['rom_path'])[1]
+                # Looked up once; archive sources aren't re-listed for the plan and the copy
+                rom_source = resolve_rom_source(data.get('rom_source') or data['rom_path'])
+                rom_extension = os.path.splitext(rom_source_name(rom_source))[1]
                 rom_filename = f"{safe_base_name}{rom_extension}"
                 dest_rom_path = os.path.join(game_path, rom_filename)
-                
-                # Remove old rom if extension is different
-                if metadata["romFileName"] != rom_filename:
-                    old_rom_path = os.path.join(game_path, metadata["romFileName"])
-                    if os.path.exists(old_rom_path):
-                        os.remove(old_rom_path)
-
-                shutil.copy(data['rom_path'], dest_rom_path)
-                metadata["romFileName"] = rom_filename
-                self._update_status(f"Replaced ROM with {rom_filename}")
-
-            # Process Boxart
-            if data.get('boxart_path'):
-                dest_boxart_path_1080 = os.path.join(game_path, f"{safe_base_name}0_1080.png")
-                dest_boxart_path_0 = os.path.join(game_path, f"{safe_base_name}0.png")
-                resize_image(data['boxart_path'], dest_boxart_path_1080, (474, 666))
-                shutil.copy(dest_boxart_path_1080, dest_boxart_path_0)
-                self._update_status("Updated boxart.")
+            plan = self._plan_writes(eversd_path, game_path, safe_base_name, images, json.dumps(metadata, indent=4),
+                                     rom_source, dest_rom_path)
+            if not self._check_space(plan):
+                return False, None
 
-            # Process Banner
-            if data.get('banner_path'):
-                dest_banner_path = os.path.join(game_path, f"{safe_base_name}_gamebanner.png")
-                resize_image(data['banner_path'], dest_banner_path, (1920, 551))
+            # --- File Operations ---
+            # Everything is staged first and only goes live when the journal commits
+            start = time.perf_counter()
+            with Journal(eversd_path).begin("update_game", safe_base_name) as txn:
+                # Only replace the ROM if a new one was selected
+                if rom_source:
+                    rom_info = self._copy_rom(rom_source, dest_rom_path, txn)
+                    # Remove old rom if extension is different, but only once the new one is in place
+                    if metadata["romFileName"] != rom_filename:
+                        txn.remove(os.path.join(game_path, metadata["romFileName"]))
+                    metadata["romFileName"] = rom_filename
+
+                # Move the files that weren't replaced over to the new base name
+                if safe_base_name != original_base_name:
+                    replaced = set(images) | ({"rom"} if data.get('rom_path') else set())
+                    self._stage_rename(txn, game_path, metadata, original_base_name, safe_base_name, replaced)
+
+                # Process Boxart and Banner
+                self._write_images(images, game_path, safe_base_name, txn)
+
+                # --- Write Updated JSON ---
+                txn.write(json_path, json.dumps(metadata, indent=4))
+            self._record_write_rate(plan, time.perf_counter() - start)
+
+            if safe_base_name != original_base_name:
+                self._update_status(f"Renamed files from '{original_base_name}' to '{safe_base_name}'.")
+            if dest_rom_path:
+                self._remember_digests(dest_rom_path, rom_info)
+                self._update_status(f"Replaced ROM with {metadata['romFileName']}")
+            if images.get('boxart'):
+                self._update_status("Updated boxart.")
+            if images.get('banner'):
                 self._update_status("Updated banner.")
-
-            # --- Write Updated JSON ---
-            with open(json_path, 'w') as f:
-                json.dump(metadata, f, indent=4)
             self._update_status("Updated metadata file.")
 
             self._update_status("Successfully updated game entry!")
@@ -180,6 +315,112 @@ class EverSDLogic:
             self._update_status(f"An unexpected error occurred during update: {e}")
             return False, None
 
+    def rename_conflict(self, game_path, metadata, new_base_name):
+        """Returns why a game can't take new_base_name (a file it would move onto already exists), or None."""
+        targets = [f"{new_base_name}.json"]
+        targets += [f"{new_base_name}{suffix}" for suffixes in IMAGE_NAME_SUFFIXES.values() for suffix in suffixes]
+        rom_name = metadata.get("romFileName") or ""
+        new_rom_name = f"{new_base_name}{os.path.splitext(rom_name)[1]}"
+        if new_rom_name != rom_name:
+            targets.append(new_rom_name)
+        for name in targets:
+            if os.path.exists(os.path.join(game_path, name)):
+                return f"{name} already exists"
+        return None
+
+    def _stage_rename(self, txn, game_path, metadata, old_base_name, new_base_name, replaced=()):
+        """
+        Records in-place renames of a game's ROM and images to a new base
+        name, so no data is copied, and points romFileName at the new ROM
+        name. Kinds in replaced ('rom', 'boxart', 'banner') are being
+        written fresh under the new name, so their old files are removed
+        instead. The old JSON is removed; the caller writes the new one.
+        """
+        for kind, suffixes in IMAGE_NAME_SUFFIXES.items():
+            for suffix in suffixes:
+                old_path = os.path.join(game_path, f"{old_base_name}{suffix}")
+                if not os.path.exists(old_path):
+                    continue
+                if kind in replaced:
+                    txn.remove(old_path)
+                else:
+                    txn.rename(old_path, os.path.join(game_path, f"{new_base_name}{suffix}"))
+
+        rom_name = metadata.get("romFileName")
+        if "rom" not in replaced and rom_name and os.path.exists(os.path.join(game_path, rom_name)):
+            new_rom_name = f"{new_base_name}{os.path.splitext(rom_name)[1]}"
+            txn.rename(os.path.join(game_path, rom_name), os.path.join(game_path, new_rom_name))
+            metadata["romFileName"] = new_rom_name
+        txn.remove(os.path.join(game_path, f"{old_base_name}.json"))
+
+    @instrumented()
+    def rename_game(self, eversd_path, old_base_name, new_base_name):
+        """
+        Re-keys a game: its ROM, images and JSON move to new_base_name with
+        os.rename, as one journaled operation. Returns (success, base_name).
+        """
+        game_path = os.path.join(eversd_path, 'game')
+        try:
+            with open(os.path.join(game_path, f"{old_base_name}.json"), 'r') as f:
+                metadata = json.load(f)
+            if new_base_name == old_base_name:
+                return True, old_base_name
+            conflict = self.rename_conflict(game_path, metadata, new_base_name)
+            if conflict:
+                self._update_status(f"Cannot rename '{old_base_name}' to '{new_base_name}': {conflict}")
+                return False, None
+
+            with Journal(eversd_path).begin("rename_game", f"{old_base_name} -> {new_base_name}") as txn:
+                self._stage_rename(txn, game_path, metadata, old_base_name, new_base_name)
+                txn.write(os.path.join(game_path, f"{new_base_name}.json"), json.dumps(metadata, indent=4))
+            self._update_status(f"Renamed '{old_base_name}' to '{new_base_name}'.")
+            return True, new_base_name
+        except Exception as e:
+            self._update_status(f"Error renaming '{old_base_name}': {e}")
+            return False, None
+
+    def plan_renames(self, eversd_path):
+        """
+        Works out which games' base names no longer match their titles.
+        Returns (plan, conflicts): plan is [(old_base_name, new_base_name)]
+        and conflicts lists the games skipped because their new name is taken.
+        Names freed by this plan are only reused on the next run.
+        """
+        game_path = os.path.join(eversd_path, 'game')
+        existing = sorted(game["base_name"] for game in self.scan_for_games(eversd_path))
+        plan, conflicts, claimed = [], [], set()
+        for old_base_name in existing:
+            try:
+                with open(os.path.join(game_path, f"{old_base_name}.json"), 'r') as f:
+                    metadata = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                continue
+            new_base_name = make_safe_base_name(metadata.get("romTitle") or "")
+            if not new_base_name or new_base_name == old_base_name:
+                continue
+            if new_base_name in claimed or os.path.exists(os.path.join(game_path, f"{new_base_name}.json")):
+                conflicts.append(f"{old_base_name}: '{new_base_name}' is already used")
+                continue
+            conflict = self.rename_conflict(game_path, metadata, new_base_name)
+            if conflict:
+                conflicts.append(f"{old_base_name}: {conflict}")
+                continue
+            claimed.add(new_base_name)
+            plan.append((old_base_name, new_base_name))
+        return plan, conflicts
+
+    def rename_games(self, eversd_path, plan):
+        """Applies a rename plan, one journaled operation per game. Returns (renamed, errors)."""
+        renamed, errors = 0, []
+        for old_base_name, new_base_name in plan:
+            success, _ = self.rename_game(eversd_path, old_base_name, new_base_name)
+            if success:
+                renamed += 1
+            else:
+                errors.append(f"{old_base_name} -> {new_base_name}")
+        return renamed, errors
+
+    @instrumented()
     def create_game_entry(self, data):
         """Creates the game files in the 'game' directory."""
         try:
@@ -193,8 +434,10 @@ class EverSDLogic:
 
             # --- File Naming ---
             # Sanitize the title to create a safe base filename
-            safe_base_name = re.sub(r'[^a-z0-9]', '', data['title'].lower())
-            rom_extension = os.path.splitext(data['rom_path'])[1]
+            safe_base_name = make_safe_base_name(data['title'])
+            # Looked up once; archive sources aren't re-listed for the plan and the copy
+            rom_source = resolve_rom_source(data.get('rom_source') or data['rom_path'])
+            rom_extension = os.path.splitext(rom_source_name(rom_source))[1]
             rom_filename = f"{safe_base_name}{rom_extension}"
 
             # --- Path Definitions ---
@@ -205,7 +448,7 @@ class EverSDLogic:
             metadata = {
                 "romFileName": rom_filename,
                 "romTitle": data.get('title', ''),
-                "romCore": data.get('emulator', 'NULL'),
+                "romCore": data.get('emulator') or core_registry.default_core(eversd_path, rom_filename, data.get('platform')) or 'NULL',
                 "romLaunchType": "NULL",
                 "romPlatform": data.get('platform', 'Unknown'), 
                 "romGenre": data.get('genre', ''),
@@ -221,27 +464,33 @@ class EverSDLogic:
                 }
             }
 
+            # --- Check images before touching the card ---
+            images, error = self._prepare_images(data, game_path, safe_base_name)
+            if error:
+                self._update_status(error)
+                return False, None
+
+            # --- Check the card has room ---
+            plan = self._plan_writes(eversd_path, game_path, safe_base_name, images, json.dumps(metadata, indent=4),
+                                     rom_source, dest_rom_path)
+            if not self._check_space(plan):
+                return False, None
+
             # --- File Operations ---
-            shutil.copy(data['rom_path'], dest_rom_path)
-            self._update_status(f"Copied ROM to {dest_rom_path}")
+            # Everything is staged first and only goes live when the journal commits
+            start = time.perf_counter()
+            with Journal(eversd_path).begin("create_game", safe_base_name) as txn:
+                rom_info = self._copy_rom(rom_source, dest_rom_path, txn)
 
-            # Process Boxart if provided. The Evercade finds this by filename convention.
-            if data.get('boxart_path'):
-                dest_boxart_path_1080 = os.path.join(game_path, f"{safe_base_name}0_1080.png")
-                dest_boxart_path_0 = os.path.join(game_path, f"{safe_base_name}0.png")
-                resize_image(data['boxart_path'], dest_boxart_path_1080, (474, 666))
-                shutil.copy(dest_boxart_path_1080, dest_boxart_path_0)
-                self._update_status(f"Created boxart at {dest_boxart_path_1080} and {dest_boxart_path_0}")
-
-            # Process Banner if provided. The Evercade finds this by filename convention.
-            if data.get('banner_path'):
-                dest_banner_path = os.path.join(game_path, f"{safe_base_name}_gamebanner.png")
-                resize_image(data['banner_path'], dest_banner_path, (1920, 551))
-                self._update_status(f"Created banner at {dest_banner_path}")
-
-            # --- JSON Metadata Generation ---
-            with open(json_path, 'w') as f:
-                json.dump(metadata, f, indent=4)
+                # Process Boxart and Banner if provided
+                self._write_images(images, game_path, safe_base_name, txn)
+
+                # --- JSON Metadata Generation ---
+                txn.write(json_path, json.dumps(metadata, indent=4))
+            self._record_write_rate(plan, time.perf_counter() - start)
+
+            self._remember_digests(dest_rom_path, rom_info)
+            self._update_status(f"Copied ROM to {dest_rom_path}")
             self._update_status(f"Generated metadata at {json_path}")
 
             self._update_status("Successfully created game entry!")
@@ -1,24 +1,162 @@
 import sys
 import os
+import argparse
 import webbrowser
 import requests
 import tempfile
 from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox, QDialog, QListWidgetItem
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPixmap, QImage
+from PyQt5.QtCore import Qt, QSocketNotifier, QThread, QTimer, pyqtSignal
 from gui import EverSDManagerWindow
 from logic import EverSDLogic
+from catalog import LibraryCatalog, card_identity
+from catalog_export import export_catalog, import_catalog
 from image_search import ImageSearchDialog
-from vimm_scraper import get_vimm_info
+from providers import get_registry
+from title_match import TitleCatalog
+from rom_ident import load_default_index, DigestCache
 from add_game_dialog import AddGameDialog
 from edit_game_dialog import EditGameDialog
+from fleet_dialog import FleetDialog
+from image_audit_dialog import ImageAuditDialog
+from integrity_dialog import IntegrityDialog
+from backup_dialog import BackupDialog
+from journal import Journal
+from card_bench import run_card_benchmark, format_profile
+from detail_prefetch import DetailCache, DetailPrefetcher
+from performance_dialog import PerformanceDialog
+from profiling import perf, instrumented
+from utils import load_image, sniff_image_format, DEFAULT_PNG_OPTIONS, ZLIB_STRATEGIES, BOXART_SIZE, BANNER_SIZE
+from sd_detect import detect_eversd_cards, MOUNTINFO_PATH
+
+# How many games either side of the selection to keep loaded
+PREFETCH_RADIUS = 5
+
+# How long the selection has to stay put before images are loaded (ms)
+DETAIL_SETTLE_DELAY = 150
+
+class CatalogReconcileThread(QThread):
+    """Worker thread that brings the catalog in line with the card."""
+    reconciled = pyqtSignal(str, object)
+
+    def __init__(self, catalog, card_id, eversd_path):
+        super().__init__()
+        self.catalog = catalog
+        self.card_id = card_id
+        self.eversd_path = eversd_path
+
+    def run(self):
+        try:
+            games = self.catalog.reconcile(self.card_id, self.eversd_path)
+        except Exception as e:
+            print(f"Catalog reconcile failed: {e}")
+            games = None
+        self.reconciled.emit(self.eversd_path, games)
+
+class TitleCatalogLoadThread(QThread):
+    """Worker thread that loads the local title catalogs at startup."""
+    loaded = pyqtSignal(object)
+
+    def run(self):
+        try:
+            with perf.operation("TitleCatalog.load_dir"):
+                catalog = TitleCatalog.load_dir()
+        except Exception as e:
+            print(f"Loading title catalogs failed: {e}")
+            catalog = TitleCatalog()
+        self.loaded.emit(catalog)
+
+class RomIndexLoadThread(QThread):
+    """Worker thread that opens the DAT checksum index at startup, rebuilding it if the DATs changed."""
+    loaded = pyqtSignal(object)
+
+    def run(self):
+        try:
+            with perf.operation("load_default_index"):
+                index = load_default_index()
+        except Exception as e:
+            print(f"Loading the ROM hash index failed: {e}")
+            index = None
+        self.loaded.emit(index)
+
+class CardBenchmarkThread(QThread):
+    """Worker thread that measures a card's read and write throughput."""
+    progress = pyqtSignal(str)
+    done = pyqtSignal(object, str)
+
+    def __init__(self, eversd_path):
+        super().__init__()
+        self.eversd_path = eversd_path
+
+    def run(self):
+        try:
+            profile = run_card_benchmark(self.eversd_path, self.progress.emit)
+            self.done.emit(profile, "")
+        except Exception as e:
+            self.done.emit(None, f"Benchmark failed: {e}")
+
+class CatalogTransferThread(QThread):
+    """Worker thread that exports a card's catalog to a file or imports one onto it."""
+    done = pyqtSignal(str, bool)
+
+    def __init__(self, eversd_path, file_path, importing, include_hashes=False):
+        super().__init__()
+        self.eversd_path = eversd_path
+        self.file_path = file_path
+        self.importing = importing
+        self.include_hashes = include_hashes
+
+    def run(self):
+        try:
+            if self.importing:
+                report = import_catalog(self.eversd_path, self.file_path)
+                message = (f"Imported catalog: {len(report['updated'])} updated, {report['unchanged']} unchanged, "
+                           f"{len(report['missing'])} without a ROM on this card.")
+                if report["rom_mismatch"]:
+                    message += (f" {len(report['rom_mismatch'])} ROM(s) differ in size from the export: "
+                                f"{', '.join(report['rom_mismatch'][:5])}")
+                errors = report["errors"]
+            else:
+                exported, errors = export_catalog(self.eversd_path, self.file_path, self.include_hashes)
+                message = f"Exported {exported} game(s) to {os.path.basename(self.file_path)}."
+            if errors:
+                message += f" {len(errors)} error(s), first: {errors[0]}"
+        except Exception as e:
+            message = f"Catalog transfer failed: {e}"
+        self.done.emit(message, self.importing)
 
 class AppController:
-    def __init__(self, window, logic):
+    def __init__(self, window, logic, catalog=None):
         self.window = window
         self.logic = logic
+        self.catalog = catalog
+        self.current_card_id = None
+        self.pending_selection = None
+        self.reconcile_threads = [] # Keep track of threads
+        self.library = {} # base_name -> metadata for the current card, from the catalog
+        self.title_catalog = None # Loaded in the background at startup
+        self.catalog_transfer = None
+        self.card_benchmark = None
+        self.recovered_paths = set() # Cards whose journal has been checked this session
+        self.rom_index = None # (HashIndex, DigestCache), loaded in the background at startup
+        self.rom_index_loading = True
+        self.detail_cache = DetailCache()
+        self.prefetcher = DetailPrefetcher(self.detail_cache, self.preview_sizes())
+        self.prefetcher.loaded.connect(self.on_details_loaded)
+        self.prefetcher.start()
+        self.title_catalog_thread = TitleCatalogLoadThread()
+        self.title_catalog_thread.loaded.connect(self.on_title_catalog_loaded)
+        self.title_catalog_thread.start()
+        self.rom_index_thread = RomIndexLoadThread()
+        self.rom_index_thread.loaded.connect(self.on_rom_index_loaded)
+        self.rom_index_thread.start()
+        self.detail_timer = QTimer()
+        self.detail_timer.setSingleShot(True)
+        self.detail_timer.setInterval(DETAIL_SETTLE_DELAY)
+        self.detail_timer.timeout.connect(self.on_selection_settled)
         self.connect_signals()
         self.auto_detect_sd_cards()
+        self.watch_mounts()
 
     def connect_signals(self):
         self.window.browse_button.clicked.connect(self.select_eversd_path)
@@ -27,28 +165,59 @@ class AppController:
         self.window.add_game_button.clicked.connect(self.open_add_game_dialog)
         self.window.edit_button.clicked.connect(self.open_edit_game_dialog)
         self.window.delete_button.clicked.connect(self.delete_selected_game)
+        self.window.fleet_button.clicked.connect(self.open_fleet_dialog)
+        self.window.perf_button.clicked.connect(self.open_performance_dialog)
+        self.window.audit_button.clicked.connect(self.open_image_audit_dialog)
+        self.window.integrity_button.clicked.connect(self.open_integrity_dialog)
+        self.window.benchmark_button.clicked.connect(self.benchmark_card)
+        self.window.rename_button.clicked.connect(self.rename_games_to_titles)
+        self.window.backup_button.clicked.connect(self.open_backup_dialog)
+        self.window.export_catalog_button.clicked.connect(self.export_card_catalog)
+        self.window.import_catalog_button.clicked.connect(self.import_card_catalog)
         self.window.game_list.currentItemChanged.connect(self.display_game_details)
 
     def auto_detect_sd_cards(self):
-        """Auto-detects SD cards on Arch Linux."""
+        """Auto-detects mounted EverSD cards from the kernel's mount table."""
+        current_path = self.window.path_select.currentText()
+        mounted_dirs = detect_eversd_cards(self.logic)
+
+        # Keep a manually browsed path selected across re-detection
+        if current_path and current_path not in mounted_dirs and os.path.isdir(current_path):
+            mounted_dirs.append(current_path)
+
+        self.window.path_select.blockSignals(True)
         self.window.path_select.clear()
-        
-        # Simple check for Arch Linux
-        if os.path.exists("/etc/arch-release"):
-            user = os.getlogin()
-            media_path = f"/run/media/{user}"
-            if os.path.isdir(media_path):
-                try:
-                    # Construct the full path for each detected directory
-                    mounted_dirs = [os.path.join(media_path, d) for d in os.listdir(media_path) if os.path.isdir(os.path.join(media_path, d))]
-                    if mounted_dirs:
-                        self.window.path_select.addItems(mounted_dirs)
-                        self.update_status(f"Auto-detected {len(mounted_dirs)} potential SD card(s).")
-                        return
-                except OSError as e:
-                    self.update_status(f"Error reading media path: {e}")
-
-        self.update_status("No SD cards auto-detected. Please browse manually.")
+        self.window.path_select.addItems(mounted_dirs)
+        if current_path in mounted_dirs:
+            self.window.path_select.setCurrentText(current_path)
+        self.window.path_select.blockSignals(False)
+
+        if self.window.path_select.currentText() != current_path:
+            self.refresh_game_list()
+
+        if mounted_dirs:
+            self.update_status(f"Auto-detected {len(mounted_dirs)} EverSD card(s).")
+        else:
+            self.update_status("No SD cards auto-detected. Please browse manually.")
+
+    def watch_mounts(self):
+        """Re-runs detection whenever the kernel reports a mount or unmount."""
+        # The kernel flags mountinfo with POLLPRI on every mount table change,
+        # which QSocketNotifier surfaces as an 'Exception' event.
+        try:
+            self.mountinfo_file = open(MOUNTINFO_PATH, "r")
+        except OSError:
+            self.mountinfo_file = None
+            return
+        self.mountinfo_file.read()
+        self.mount_notifier = QSocketNotifier(self.mountinfo_file.fileno(), QSocketNotifier.Exception)
+        self.mount_notifier.activated.connect(self.on_mounts_changed)
+
+    def on_mounts_changed(self):
+        # Re-read the file so the kernel re-arms the notification
+        self.mountinfo_file.seek(0)
+        self.mountinfo_file.read()
+        self.auto_detect_sd_cards()
 
     def update_status(self, message):
         self.window.status_label.setText(f"Status: {message}")
@@ -61,14 +230,80 @@ class AppController:
             # The currentIndexChanged signal will trigger the refresh
 
     def refresh_game_list(self):
+        self.detail_cache.clear() # Files may have changed on the card
         self.window.game_list.clear()
         self.clear_details()
         eversd_path = self.window.path_select.currentText()
         if not eversd_path or not os.path.isdir(eversd_path):
             self.update_status("Set a valid EverSD path to see games.")
             return
-        
-        games = self.logic.scan_for_games(eversd_path)
+
+        self.recover_interrupted_operations(eversd_path)
+        self.library = {}
+        if not self.catalog:
+            games = self.logic.scan_for_games(eversd_path)
+            self.populate_game_list(games)
+            return
+
+        # Show what we knew about this card last time, then check the card in the background
+        self.current_card_id = card_identity(eversd_path)
+        cached_games = self.catalog.load_games(self.current_card_id)
+        self.library = self.catalog.load_metadata(self.current_card_id)
+        if cached_games:
+            self.populate_game_list(cached_games)
+            self.update_status(f"Loaded {len(cached_games)} games from catalog. Checking card...")
+        else:
+            # First visit: list the card directly rather than waiting for the catalog to fill
+            self.populate_game_list(self.logic.scan_for_games(eversd_path))
+
+        thread = CatalogReconcileThread(self.catalog, self.current_card_id, eversd_path)
+        thread.reconciled.connect(self.on_catalog_reconciled)
+        self.reconcile_threads.append(thread)
+        thread.start()
+
+    def recover_interrupted_operations(self, eversd_path):
+        """Finishes or rolls back operations a previous session left half done, once per card per session."""
+        if eversd_path in self.recovered_paths:
+            return
+        self.recovered_paths.add(eversd_path)
+        journal = Journal(eversd_path)
+        if not journal.pending():
+            return
+        rolled_forward, rolled_back, errors = journal.recover(self.update_status)
+        message = f"Recovered interrupted operations: {rolled_forward} finished, {rolled_back} rolled back."
+        if errors:
+            message += f" {len(errors)} could not be recovered: {errors[0]}"
+        self.update_status(message)
+
+    def on_catalog_reconciled(self, eversd_path, games):
+        self.reconcile_threads = [t for t in self.reconcile_threads if not t.isFinished()]
+        if eversd_path != self.window.path_select.currentText():
+            return # The user switched cards while we were scanning
+
+        if games is None:
+            self.update_status("Error: 'game' directory not found.")
+            self.window.game_list.clear()
+            self.clear_details()
+            return
+
+        self.library = self.catalog.load_metadata(self.current_card_id)
+        shown = {(item.data(Qt.UserRole), item.text()) for item in
+                 (self.window.game_list.item(i) for i in range(self.window.game_list.count()))}
+        if shown != {(g['base_name'], g['title']) for g in games}:
+            self.detail_cache.clear()
+            self.populate_game_list(games)
+        elif games:
+            self.update_status(f"Found {len(games)} games.")
+
+        if self.pending_selection:
+            self.select_game_by_base_name(self.pending_selection)
+
+    def populate_game_list(self, games):
+        """Fills the game list, keeping the current selection where possible."""
+        current_item = self.window.game_list.currentItem()
+        current_base_name = current_item.data(Qt.UserRole) if current_item else None
+        self.window.game_list.clear()
+
         if games:
             # Sort games by title
             sorted_games = sorted(games, key=lambda g: g['title'])
@@ -78,30 +313,84 @@ class AppController:
                 self.window.game_list.addItem(item)
 
             self.update_status(f"Found {len(games)} games.")
-            if self.window.game_list.count() > 0:
+            current_item = self.find_game_item(current_base_name)
+            if current_item:
+                self.window.game_list.setCurrentItem(current_item)
+            else:
                 self.window.game_list.setCurrentRow(0)
 
         elif "Error" not in self.window.status_label.text():
+            self.clear_details()
             self.update_status("No games found. Add a new one!")
 
     def display_game_details(self, current_item, previous_item):
         """Triggered when the selection in the game list changes."""
+        # Whatever was queued for the previous selection is no longer wanted
+        self.prefetcher.cancel()
         if not current_item:
+            self.detail_timer.stop()
             self.clear_details()
             return
 
         game_base_name = current_item.data(Qt.UserRole) # Retrieve base_name
         eversd_path = self.window.path_select.currentText()
-        self.update_status(f"Loading details for {current_item.text()}...")
-        
-        details = self.logic.get_game_details(eversd_path, game_base_name)
 
+        entry = self.detail_cache.get((eversd_path, game_base_name))
+        if entry is not None:
+            self.render_details(entry, current_item.text())
+        else:
+            # Text and thumbnails now from the catalog; full-size images once the selection settles
+            meta = self.library.get(game_base_name, {"romTitle": current_item.text()})
+            self.render_text(meta)
+            thumbnails = self.catalog_thumbnails(game_base_name)
+            self.set_preview_image(self.window.boxart_preview, thumbnails.get("boxart"), "Loading...")
+            self.window.boxart_preview.parent().setVisible(True)
+            self.set_preview_image(self.window.banner_preview, thumbnails.get("banner"), "Loading...")
+            self.window.banner_preview.parent().setVisible(True)
+            self.update_status(f"Loading details for {current_item.text()}...")
+
+        self.detail_timer.start() # Restarts the countdown if it is already running
+
+    def on_selection_settled(self):
+        """Loads the current game (if needed) and its neighbours once the user stops scrolling."""
+        current_item = self.window.game_list.currentItem()
+        if not current_item:
+            return
+        eversd_path = self.window.path_select.currentText()
+        base_names = [] if (eversd_path, current_item.data(Qt.UserRole)) in self.detail_cache \
+            else [current_item.data(Qt.UserRole)]
+        base_names.extend(self.neighbor_base_names(current_item))
+        self.prefetcher.request(eversd_path, base_names)
+
+    def on_details_loaded(self, eversd_path, base_name):
+        current_item = self.window.game_list.currentItem()
+        if not current_item or current_item.data(Qt.UserRole) != base_name \
+                or eversd_path != self.window.path_select.currentText():
+            return # A neighbour, or a load that the selection has since moved away from
+        entry = self.detail_cache.get((eversd_path, base_name))
+        if entry is not None:
+            self.render_details(entry, current_item.text())
+
+    def render_details(self, entry, title):
+        """Fills the detail view from a cache entry."""
+        details = entry["details"]
         if details.get("error"):
             self.update_status(f"Error: {details['error']}")
             self.clear_details()
             return
 
-        meta = details.get("metadata", {})
+        self.render_text(details.get("metadata", {}))
+
+        # Update images and their visibility
+        self.set_preview_image(self.window.boxart_preview, entry["boxart"])
+        self.window.boxart_preview.parent().setVisible(bool(details.get("boxart_path")))
+
+        self.set_preview_image(self.window.banner_preview, entry["banner"])
+        self.window.banner_preview.parent().setVisible(bool(details.get("banner_path")))
+
+        self.update_status(f"Displayed details for {title}.")
+
+    def render_text(self, meta):
         self.window.title_label.setText(meta.get("romTitle", "N/A"))
         self.window.platform_label.setText(meta.get("romPlatform", "N/A"))
         self.window.genre_label.setText(meta.get("romGenre", "N/A"))
@@ -110,17 +399,48 @@ class AppController:
         self.window.release_date_label.setText(meta.get("romReleaseDate", "N/A"))
         self.window.description_label.setText(meta.get("romDescription", "N/A"))
 
-        # Update images and their visibility
-        boxart_path = details.get("boxart_path")
-        banner_path = details.get("banner_path")
-        
-        self.update_image_preview(self.window.boxart_preview, boxart_path)
-        self.window.boxart_preview.parent().setVisible(bool(boxart_path))
+    def catalog_thumbnails(self, base_name):
+        """Returns {kind: QImage} of a game's thumbnails stored in the catalog, scaled to the preview labels."""
+        if not self.catalog or not self.current_card_id:
+            return {}
+        game = self.catalog.get_game(self.current_card_id, base_name)
+        if not game:
+            return {}
+        thumbnails = {}
+        for kind, (width, height) in self.preview_sizes().items():
+            image = QImage.fromData(game[f"{kind}_thumb"]) if game[f"{kind}_thumb"] else QImage()
+            if not image.isNull():
+                thumbnails[kind] = image.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        return thumbnails
+
+    def preview_sizes(self):
+        return {
+            "boxart": (self.window.boxart_preview.width(), self.window.boxart_preview.height()),
+            "banner": (self.window.banner_preview.width(), self.window.banner_preview.height()),
+        }
+
+    def neighbor_base_names(self, current_item):
+        """Returns the base names of the games either side of the selection, nearest first."""
+        row = self.window.game_list.row(current_item)
+        rows = []
+        for offset in range(1, PREFETCH_RADIUS + 1):
+            rows.extend([row + offset, row - offset])
+        return [self.window.game_list.item(r).data(Qt.UserRole)
+                for r in rows if 0 <= r < self.window.game_list.count()]
+
+    def set_preview_image(self, label, image, placeholder="Image not found"):
+        """Shows a pre-scaled QImage in a preview label."""
+        if image is not None:
+            label.setPixmap(QPixmap.fromImage(image))
+        else:
+            label.setPixmap(QPixmap()) # Clear existing pixmap
+            label.setText(placeholder)
 
-        self.update_image_preview(self.window.banner_preview, banner_path)
-        self.window.banner_preview.parent().setVisible(bool(banner_path))
-        
-        self.update_status(f"Displayed details for {current_item.text()}.")
+    def shutdown(self):
+        self.detail_timer.stop()
+        self.prefetcher.stop()
+        self.title_catalog_thread.wait()
+        self.rom_index_thread.wait()
 
     def clear_details(self):
         """Clears the game detail view."""
@@ -132,24 +452,12 @@ class AppController:
         self.window.release_date_label.setText("N/A")
         self.window.description_label.setText("N/A")
         
-        self.update_image_preview(self.window.boxart_preview, None)
+        self.set_preview_image(self.window.boxart_preview, None)
         self.window.boxart_preview.parent().setVisible(False)
         
-        self.update_image_preview(self.window.banner_preview, None)
+        self.set_preview_image(self.window.banner_preview, None)
         self.window.banner_preview.parent().setVisible(False)
 
-    def update_image_preview(self, label, image_path):
-        """Updates a QLabel with a scaled pixmap."""
-        if image_path and os.path.exists(image_path):
-            pixmap = QPixmap(image_path)
-            scaled_pixmap = pixmap.scaled(label.size(), 
-                                          Qt.KeepAspectRatio, 
-                                          Qt.SmoothTransformation)
-            label.setPixmap(scaled_pixmap)
-        else:
-            label.setText("Image not found")
-            label.setPixmap(QPixmap()) # Clear existing pixmap
-
     def delete_selected_game(self):
         selected_item = self.window.game_list.currentItem()
         if not selected_item:
@@ -179,7 +487,8 @@ class AppController:
             QMessageBox.warning(self.window, "Invalid Path", "Please set a valid EverSD path before adding a game.")
             return
 
-        dialog = AddGameDialog(self.logic, eversd_path, self.window)
+        dialog = AddGameDialog(self.logic, eversd_path, self.window, title_catalog=self.get_title_catalog(),
+                               rom_index=self.get_rom_index())
         
         dialog.find_boxart_button.clicked.connect(lambda: self.find_boxart_for_dialog(dialog))
         dialog.find_banner_button.clicked.connect(lambda: self.find_banner_for_dialog(dialog))
@@ -188,6 +497,170 @@ class AppController:
         if dialog.exec_() == QDialog.Accepted:
             self.create_game_entry(dialog.get_data())
 
+    def get_title_catalog(self):
+        """Returns the local title catalogs, or None while they are still loading in the background."""
+        if self.title_catalog is None:
+            self.update_status("Known titles are still loading; matching is off until they are ready.")
+        return self.title_catalog
+
+    def on_title_catalog_loaded(self, title_catalog):
+        # Loaded once per session; the catalogs only change when the user drops in new files
+        self.title_catalog = title_catalog
+        if len(self.title_catalog):
+            self.update_status(f"Loaded {len(self.title_catalog)} known titles for matching.")
+
+    def get_rom_index(self):
+        """Returns the DAT checksum index, or None without DATs or while it is still being built."""
+        if self.rom_index_loading:
+            self.update_status("The ROM checksum index is still loading; identification is off until it is ready.")
+        return self.rom_index
+
+    def on_rom_index_loaded(self, index):
+        self.rom_index_loading = False
+        if index is not None:
+            self.rom_index = (index, self.logic.digest_cache)
+
+    def open_fleet_dialog(self):
+        card_paths = [self.window.path_select.itemText(i) for i in range(self.window.path_select.count())]
+        card_paths = [p for p in card_paths if os.path.isdir(p)]
+        if not card_paths:
+            QMessageBox.warning(self.window, "No Cards", "No EverSD cards detected. Insert or browse for a card first.")
+            return
+
+        current_path = self.window.path_select.currentText()
+        dialog = FleetDialog(card_paths, current_path if current_path in card_paths else None, self.window,
+                             title_catalog=self.get_title_catalog(), rom_index=self.get_rom_index())
+        dialog.exec_()
+        self.refresh_game_list()
+
+    def open_image_audit_dialog(self):
+        eversd_path = self.window.path_select.currentText()
+        if not eversd_path or not os.path.isdir(eversd_path):
+            QMessageBox.warning(self.window, "Invalid Path", "Please set a valid EverSD path before auditing images.")
+            return
+
+        dialog = ImageAuditDialog(eversd_path, self.logic.png_options, self.window)
+        dialog.exec_()
+        self.refresh_game_list()
+
+    def open_integrity_dialog(self):
+        eversd_path = self.window.path_select.currentText()
+        if not eversd_path or not os.path.isdir(os.path.join(eversd_path, 'game')):
+            QMessageBox.warning(self.window, "Invalid Path", "Please set a valid EverSD path with a 'game' directory first.")
+            return
+
+        dialog = IntegrityDialog(eversd_path, self.window)
+        dialog.exec_()
+        self.refresh_game_list()
+
+    def rename_games_to_titles(self):
+        """Re-keys every game whose file names no longer match its title, after confirming the plan."""
+        eversd_path = self.window.path_select.currentText()
+        if not eversd_path or not os.path.isdir(os.path.join(eversd_path, 'game')):
+            QMessageBox.warning(self.window, "Invalid Path", "Please set a valid EverSD path with a 'game' directory first.")
+            return
+
+        plan, conflicts = self.logic.plan_renames(eversd_path)
+        if not plan:
+            message = "All file names already match their titles."
+            if conflicts:
+                message += f"\n\n{len(conflicts)} game(s) can't be renamed:\n" + "\n".join(conflicts[:10])
+            QMessageBox.information(self.window, "Fix File Names", message)
+            return
+
+        lines = [f"{old} -> {new}" for old, new in plan[:15]]
+        if len(plan) > 15:
+            lines.append(f"...and {len(plan) - 15} more")
+        message = f"Rename the files of {len(plan)} game(s) to match their titles?\n\n" + "\n".join(lines)
+        if conflicts:
+            message += f"\n\n{len(conflicts)} game(s) will be skipped because the name is taken."
+        reply = QMessageBox.question(self.window, "Fix File Names", message,
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+
+        renamed, errors = self.logic.rename_games(eversd_path, plan)
+        self.refresh_game_list()
+        self.update_status(f"Renamed {renamed} game(s)." + (f" {len(errors)} failed." if errors else ""))
+
+    def benchmark_card(self):
+        eversd_path = self.window.path_select.currentText()
+        if not eversd_path or not os.path.isdir(eversd_path):
+            QMessageBox.warning(self.window, "Invalid Path", "Please set a valid EverSD path first.")
+            return
+        reply = QMessageBox.question(self.window, "Benchmark Card",
+                                     "Measure this card's speed? This writes and reads about 150 MB of "
+                                     "scratch data and takes up to a minute on a slow card.",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if reply != QMessageBox.Yes:
+            return
+        self.window.benchmark_button.setEnabled(False)
+        self.card_benchmark = CardBenchmarkThread(eversd_path)
+        self.card_benchmark.progress.connect(self.update_status)
+        self.card_benchmark.done.connect(self.on_card_benchmark_done)
+        self.card_benchmark.start()
+
+    def on_card_benchmark_done(self, profile, error):
+        self.window.benchmark_button.setEnabled(True)
+        if error:
+            self.update_status(error)
+            QMessageBox.critical(self.window, "Benchmark Card", error)
+            return
+        QMessageBox.information(self.window, "Benchmark Card", format_profile(profile))
+
+    def open_backup_dialog(self):
+        eversd_path = self.window.path_select.currentText()
+        if not eversd_path or not os.path.isdir(eversd_path):
+            QMessageBox.warning(self.window, "Invalid Path", "Please set a valid EverSD path first.")
+            return
+
+        dialog = BackupDialog(eversd_path, self.window)
+        dialog.exec_()
+        self.refresh_game_list()
+
+    def export_card_catalog(self):
+        eversd_path = self.window.path_select.currentText()
+        if not eversd_path or not os.path.isdir(os.path.join(eversd_path, 'game')):
+            QMessageBox.warning(self.window, "Invalid Path", "Please set a valid EverSD path with a 'game' directory first.")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self.window, "Export Catalog", "catalog.jsonl.gz",
+                                                   "Catalog Files (*.jsonl.gz *.jsonl.xz *.jsonl)")
+        if not file_path:
+            return
+        reply = QMessageBox.question(self.window, "Include Hashes",
+                                     "Include ROM and image checksums? This reads every file on the card.",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        self.start_catalog_transfer(eversd_path, file_path, False, reply == QMessageBox.Yes)
+
+    def import_card_catalog(self):
+        eversd_path = self.window.path_select.currentText()
+        if not eversd_path or not os.path.isdir(os.path.join(eversd_path, 'game')):
+            QMessageBox.warning(self.window, "Invalid Path", "Please set a valid EverSD path with a 'game' directory first.")
+            return
+        file_path, _ = QFileDialog.getOpenFileName(self.window, "Import Catalog", "",
+                                                   "Catalog Files (*.jsonl.gz *.jsonl.xz *.jsonl)")
+        if file_path:
+            self.start_catalog_transfer(eversd_path, file_path, True)
+
+    def start_catalog_transfer(self, eversd_path, file_path, importing, include_hashes=False):
+        self.window.export_catalog_button.setEnabled(False)
+        self.window.import_catalog_button.setEnabled(False)
+        self.update_status("Importing catalog..." if importing else "Exporting catalog...")
+        self.catalog_transfer = CatalogTransferThread(eversd_path, file_path, importing, include_hashes)
+        self.catalog_transfer.done.connect(self.on_catalog_transfer_done)
+        self.catalog_transfer.start()
+
+    def on_catalog_transfer_done(self, message, imported):
+        self.window.export_catalog_button.setEnabled(True)
+        self.window.import_catalog_button.setEnabled(True)
+        self.update_status(message)
+        if imported:
+            self.refresh_game_list()
+
+    def open_performance_dialog(self):
+        dialog = PerformanceDialog(self.window)
+        dialog.exec_()
+
     def open_edit_game_dialog(self):
         selected_item = self.window.game_list.currentItem()
         if not selected_item:
@@ -218,7 +691,8 @@ class AppController:
             QMessageBox.warning(dialog, "Missing Title", "Please enter a Game Title first.")
             return
 
-        search_dialog = ImageSearchDialog(f"{game_title} box art", parent_controller=self)
+        search_dialog = ImageSearchDialog(f"{game_title} box art", parent_controller=self,
+                                          target_size=BOXART_SIZE)
         if search_dialog.exec_() == QDialog.Accepted and search_dialog.selected_image_url:
             self.download_and_set_boxart(search_dialog.selected_image_url, dialog)
 
@@ -228,7 +702,8 @@ class AppController:
             QMessageBox.warning(dialog, "Missing Title", "Please enter a Game Title first.")
             return
 
-        search_dialog = ImageSearchDialog(f"{game_title} banner", parent_controller=self)
+        search_dialog = ImageSearchDialog(f"{game_title} banner", parent_controller=self,
+                                          target_size=BANNER_SIZE)
         if search_dialog.exec_() == QDialog.Accepted and search_dialog.selected_image_url:
             self.download_and_set_banner(search_dialog.selected_image_url, dialog)
 
@@ -238,9 +713,9 @@ class AppController:
             QMessageBox.warning(dialog, "Missing URL", "Please enter a Vimm.net URL.")
             return
 
-        self.update_status("Fetching info from Vimm.net...")
+        self.update_status("Fetching game info...")
         QApplication.processEvents()
-        info, error = get_vimm_info(url)
+        info, error = get_registry().lookup("metadata", url, mode="merge")
 
         if error:
             self.update_status(f"Error: {error}")
@@ -254,18 +729,27 @@ class AppController:
         dialog.release_date_input.setText(info.get('release_date', ''))
         self.update_status("Successfully fetched and populated game info.")
 
+    @instrumented()
     def download_and_set_boxart(self, url, dialog):
         try:
             self.update_status(f"Downloading image from {url}...")
             response = requests.get(url, timeout=10, verify=False)
             response.raise_for_status()
+
+            # Trust the bytes, not the URL, for the file type
+            image_format = sniff_image_format(response.content[:16])
+            if not image_format:
+                raise ValueError("The downloaded file is not a supported image.")
             temp_dir = tempfile.gettempdir()
-            extension = os.path.splitext(url.split("?")[0])[-1] or ".png"
-            temp_path = os.path.join(temp_dir, f"downloaded_boxart{extension}")
-            
+            temp_path = os.path.join(temp_dir, f"downloaded_boxart.{image_format}")
+
             with open(temp_path, 'wb') as f:
                 f.write(response.content)
 
+            _, error = load_image(temp_path)
+            if error:
+                raise ValueError(error)
+
             dialog.boxart_path = temp_path
             dialog.boxart_label.setText(f"Downloaded: {os.path.basename(temp_path)}")
             dialog.update_image_preview(temp_path)
@@ -276,18 +760,27 @@ class AppController:
             self.update_status(error_msg)
             QMessageBox.critical(dialog, "Download Error", error_msg)
 
+    @instrumented()
     def download_and_set_banner(self, url, dialog):
         try:
             self.update_status(f"Downloading image from {url}...")
             response = requests.get(url, timeout=10, verify=False)
             response.raise_for_status()
+
+            # Trust the bytes, not the URL, for the file type
+            image_format = sniff_image_format(response.content[:16])
+            if not image_format:
+                raise ValueError("The downloaded file is not a supported image.")
             temp_dir = tempfile.gettempdir()
-            extension = os.path.splitext(url.split("?")[0])[-1] or ".png"
-            temp_path = os.path.join(temp_dir, f"downloaded_banner{extension}")
-            
+            temp_path = os.path.join(temp_dir, f"downloaded_banner.{image_format}")
+
             with open(temp_path, 'wb') as f:
                 f.write(response.content)
 
+            _, error = load_image(temp_path)
+            if error:
+                raise ValueError(error)
+
             dialog.banner_path = temp_path
             dialog.banner_label.setText(f"Downloaded: {os.path.basename(temp_path)}")
             self.update_status("Successfully downloaded and set banner.")
@@ -328,21 +821,72 @@ class AppController:
         else:
             QMessageBox.critical(self.window, "Error", "Failed to update game entry. Check status for details.")
 
-    def select_game_by_base_name(self, base_name):
-        """Finds and selects an item in the game list by its base_name."""
+    def find_game_item(self, base_name):
+        """Returns the game list item for a base_name, or None."""
         for index in range(self.window.game_list.count()):
             item = self.window.game_list.item(index)
             if item.data(Qt.UserRole) == base_name:
-                self.window.game_list.setCurrentItem(item)
-                break
+                return item
+        return None
+
+    def select_game_by_base_name(self, base_name):
+        """Finds and selects an item in the game list by its base_name."""
+        item = self.find_game_item(base_name)
+        if item:
+            self.window.game_list.setCurrentItem(item)
+            self.pending_selection = None
+        else:
+            # The game may not be listed until the background scan finishes
+            self.pending_selection = base_name
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="EverSD Game Manager")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record timing and I/O stats for each operation (same as EVERSD_PROFILE=1).")
+    parser.add_argument("--profile-log", metavar="PATH", help="Append one JSON line per operation to PATH.")
+    parser.add_argument("--cprofile", metavar="PATH", help="Capture a cProfile of the session and write it to PATH on exit.")
+    parser.add_argument("--png-quantize", action="store_true",
+                        help="Reduce boxart and banners to a 256-colour palette (lossy, much smaller).")
+    parser.add_argument("--png-level", type=int, choices=range(10), default=DEFAULT_PNG_OPTIONS["compress_level"],
+                        metavar="0-9", help="zlib compression level for images written to the card.")
+    parser.add_argument("--png-optimize", action="store_true", help="Run Pillow's extra PNG optimize pass (slower).")
+    parser.add_argument("--png-strategy", choices=sorted(ZLIB_STRATEGIES), default="default",
+                        help="zlib strategy for images written to the card.")
+    parser.add_argument("--png-report-savings", action="store_true",
+                        help="Also encode a plain PNG of each image to report the bytes saved (doubles encode time).")
+    # Leave anything else (e.g. Qt's own options) for QApplication
+    return parser.parse_known_args(argv[1:])
 
 def main():
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv)
+    if args.profile or args.profile_log or args.cprofile:
+        # The command line log wins; otherwise keep the one EVERSD_PROFILE_LOG set up
+        perf.enable(log_path=args.profile_log or perf.log_path, cprofile=bool(args.cprofile))
+
+    app = QApplication(sys.argv[:1] + qt_args)
     window = EverSDManagerWindow()
-    logic = EverSDLogic(status_callback=lambda msg: window.status_label.setText(f"Status: {msg}"))
-    controller = AppController(window, logic)
+    window.perf_button.setVisible(perf.enabled)
+    png_options = {"quantize": args.png_quantize, "compress_level": args.png_level, "optimize": args.png_optimize,
+                   "zlib_strategy": ZLIB_STRATEGIES[args.png_strategy], "report_savings": args.png_report_savings}
+    try:
+        digest_cache = DigestCache()
+    except Exception as e:
+        print(f"Could not open ROM digest cache: {e}")
+        digest_cache = None
+    logic = EverSDLogic(status_callback=lambda msg: window.status_label.setText(f"Status: {msg}"),
+                        png_options=png_options, digest_cache=digest_cache)
+    try:
+        catalog = LibraryCatalog()
+    except Exception as e:
+        print(f"Could not open library catalog, reading cards directly: {e}")
+        catalog = None
+    controller = AppController(window, logic, catalog)
+    app.aboutToQuit.connect(controller.shutdown)
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    if args.cprofile:
+        perf.dump_cprofile(args.cprofile)
+    sys.exit(exit_code)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
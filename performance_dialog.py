@@ -0,0 +1,115 @@
+
+import sys
+from PyQt5.QtWidgets import (QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QFileDialog)
+from PyQt5.QtCore import QTimer
+from profiling import perf
+
+class PerformanceDialog(QDialog):
+    """Live view of the instrumentation collected by profiling.perf."""
+    OPERATION_COLUMNS = ["Operation", "Calls", "Total (s)", "Mean (ms)", "Max (ms)", "Read", "Written", "Files"]
+    CACHE_COLUMNS = ["Cache", "Hits", "Misses", "Hit Rate"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Performance")
+        self.setGeometry(150, 150, 900, 500)
+
+        self.initUI()
+        self.connect_signals()
+        self.refresh()
+
+        # Keep the numbers live while the dialog is open
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(1000)
+
+    def initUI(self):
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+
+        main_layout.addWidget(QLabel("Operations:"))
+        self.operation_table = self.create_table(self.OPERATION_COLUMNS)
+        main_layout.addWidget(self.operation_table, 3)
+
+        main_layout.addWidget(QLabel("Caches:"))
+        self.cache_table = self.create_table(self.CACHE_COLUMNS)
+        main_layout.addWidget(self.cache_table, 1)
+
+        action_layout = QHBoxLayout()
+        main_layout.addLayout(action_layout)
+        self.reset_button = QPushButton("Reset")
+        self.save_button = QPushButton("Save Stats...")
+        self.save_profile_button = QPushButton("Save cProfile...")
+        self.close_button = QPushButton("Close")
+        action_layout.addWidget(self.reset_button)
+        action_layout.addWidget(self.save_button)
+        action_layout.addWidget(self.save_profile_button)
+        action_layout.addStretch()
+        action_layout.addWidget(self.close_button)
+
+        self.save_profile_button.setEnabled(perf.profiler is not None)
+
+    def create_table(self, columns):
+        table = QTableWidget(0, len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        return table
+
+    def connect_signals(self):
+        self.reset_button.clicked.connect(self.reset)
+        self.save_button.clicked.connect(self.save_stats)
+        self.save_profile_button.clicked.connect(self.save_cprofile)
+        self.close_button.clicked.connect(self.accept)
+
+    def refresh(self):
+        snapshot = perf.snapshot()
+        operations = sorted(snapshot["operations"].items(), key=lambda kv: kv[1]["total_s"], reverse=True)
+        self.fill_table(self.operation_table, [
+            [name, stats["calls"], f"{stats['total_s']:.3f}", f"{stats['mean_s'] * 1000:.1f}",
+             f"{stats['max_s'] * 1000:.1f}", self.format_bytes(stats["bytes_read"]),
+             self.format_bytes(stats["bytes_written"]), stats["files_touched"]]
+            for name, stats in operations
+        ])
+        self.fill_table(self.cache_table, [
+            [name, stats["hits"], stats["misses"], f"{stats['hit_rate'] * 100:.1f}%"]
+            for name, stats in sorted(snapshot["caches"].items())
+        ])
+
+    def fill_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(str(value)))
+
+    def format_bytes(self, count):
+        for unit in ("B", "KB", "MB"):
+            if abs(count) < 1024:
+                return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+            count /= 1024
+        return f"{count:.1f} GB"
+
+    def reset(self):
+        perf.reset()
+        self.refresh()
+
+    def save_stats(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Performance Stats", "eversd_perf.json", "JSON Files (*.json)")
+        if path:
+            perf.dump(path)
+
+    def save_cprofile(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save cProfile Capture", "eversd.prof", "Profile Files (*.prof)")
+        if path:
+            perf.dump_cprofile(path)
+            self.save_profile_button.setEnabled(False)
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    perf.enable()
+    dialog = PerformanceDialog()
+    dialog.exec_()
+    sys.exit()
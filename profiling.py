@@ -0,0 +1,184 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Set to 1 (or pass --profile) to turn instrumentation on.
+PROFILE_ENV_VAR = "EVERSD_PROFILE"
+PROFILE_LOG_ENV_VAR = f"{PROFILE_ENV_VAR}_LOG"
+
+# Audit events that count as touching a file on disk.
+_FILE_EVENTS = {"open", "os.remove", "os.rename", "os.unlink", "shutil.copyfile"}
+
+
+def _read_io_counters():
+    """Returns (bytes_read, bytes_written) for this process from /proc/self/io, if available."""
+    try:
+        with open("/proc/self/io", "rb") as f:
+            fields = dict(line.split(b":") for line in f.read().splitlines())
+        return int(fields[b"rchar"]), int(fields[b"wchar"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+class Instrumentation:
+    """
+    Collects per-operation timing and I/O statistics.
+
+    Wall time and files touched are tracked per thread. Bytes read and
+    written come from the process-wide kernel counters, so operations
+    running concurrently on other threads show up in each other's totals.
+    Everything is a no-op until enable() is called.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.log_path = None
+        self.profiler = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._audit_hook_installed = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.operations = {}
+            self.caches = {}
+
+    def enable(self, log_path=None, cprofile=False):
+        """Turns instrumentation on, optionally appending a JSON line per operation to log_path."""
+        self.enabled = True
+        self.log_path = log_path
+        if not self._audit_hook_installed:
+            sys.addaudithook(self._audit_hook)
+            self._audit_hook_installed = True
+        if cprofile and not self.profiler:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def enable_from_env(self):
+        """Turns instrumentation on if EVERSD_PROFILE is set, or EVERSD_PROFILE_LOG names a log."""
+        log_path = os.environ.get(PROFILE_LOG_ENV_VAR) or None
+        if os.environ.get(PROFILE_ENV_VAR, "") not in ("", "0") or log_path:
+            self.enable(log_path=log_path)
+
+    def _frames(self):
+        if not hasattr(self._local, "frames"):
+            self._local.frames = []
+        return self._local.frames
+
+    def _audit_hook(self, event, args):
+        if not self.enabled or event not in _FILE_EVENTS:
+            return
+        frames = getattr(self._local, "frames", None)
+        if not frames:
+            return
+        if event == "open":
+            if not isinstance(args[0], (str, bytes, os.PathLike)):
+                return # Re-opening an existing file descriptor
+            if args[0] in ("/proc/self/io", self.log_path):
+                return # Our own bookkeeping
+        for frame in frames:
+            frame["files"] += 1
+
+    @contextmanager
+    def operation(self, name):
+        """Times the enclosed block and records it under name."""
+        if not self.enabled:
+            yield
+            return
+        frame = {"files": 0}
+        frames = self._frames()
+        frames.append(frame)
+        read_before, written_before = _read_io_counters()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            read_after, written_after = _read_io_counters()
+            frames.pop()
+            self._record(name, elapsed, read_after - read_before, written_after - written_before, frame["files"])
+
+    def _record(self, name, elapsed, bytes_read, bytes_written, files):
+        with self._lock:
+            stats = self.operations.setdefault(name, {
+                "calls": 0, "total_s": 0.0, "max_s": 0.0,
+                "bytes_read": 0, "bytes_written": 0, "files_touched": 0,
+            })
+            stats["calls"] += 1
+            stats["total_s"] += elapsed
+            stats["max_s"] = max(stats["max_s"], elapsed)
+            stats["bytes_read"] += bytes_read
+            stats["bytes_written"] += bytes_written
+            stats["files_touched"] += files
+
+        if self.log_path:
+            entry = {
+                "time": time.time(),
+                "operation": name,
+                "wall_ms": round(elapsed * 1000, 3),
+                "bytes_read": bytes_read,
+                "bytes_written": bytes_written,
+                "files_touched": files,
+                "thread": threading.current_thread().name,
+            }
+            with self._lock:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+    def record_cache(self, name, hit):
+        """Records a hit or miss for the named cache."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.caches.setdefault(name, {"hits": 0, "misses": 0})
+            stats["hits" if hit else "misses"] += 1
+
+    def snapshot(self):
+        """Returns a copy of the collected statistics."""
+        with self._lock:
+            operations = {name: dict(stats) for name, stats in self.operations.items()}
+            caches = {}
+            for name, stats in self.caches.items():
+                lookups = stats["hits"] + stats["misses"]
+                caches[name] = dict(stats, hit_rate=stats["hits"] / lookups if lookups else 0.0)
+        for stats in operations.values():
+            stats["mean_s"] = stats["total_s"] / stats["calls"]
+        return {"operations": operations, "caches": caches}
+
+    def dump(self, path):
+        """Writes the current statistics as JSON."""
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=4)
+
+    def dump_cprofile(self, path):
+        """Stops the cProfile capture (if running) and writes it in pstats format."""
+        if not self.profiler:
+            return False
+        self.profiler.disable()
+        self.profiler.dump_stats(path)
+        return True
+
+
+perf = Instrumentation()
+perf.enable_from_env()
+
+
+def instrumented(name=None):
+    """Decorator that records each call of the wrapped function as an operation."""
+    def decorator(func):
+        op_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not perf.enabled:
+                return func(*args, **kwargs)
+            with perf.operation(op_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
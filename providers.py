@@ -0,0 +1,264 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import concurrent.futures
+import requests
+from requests.adapters import HTTPAdapter
+from profiling import perf
+from utils import cache_dir
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+
+# Successful responses are reused for this long.
+CACHE_TTL = 7 * 24 * 60 * 60
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Returns the requests session shared by all providers, so connections are pooled."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers["User-Agent"] = USER_AGENT
+        return _session
+
+
+def default_cache_path():
+    """Returns the response cache location under the XDG cache directory."""
+    return cache_dir("providers.sqlite")
+
+
+class ResponseCache:
+    """Persistent SQLite cache of provider results, keyed by provider name and query."""
+
+    def __init__(self, db_path=None, ttl=CACHE_TTL):
+        self.db_path = db_path or default_cache_path()
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS responses ("
+                              "provider TEXT NOT NULL, query TEXT NOT NULL, result TEXT NOT NULL, "
+                              "stored REAL NOT NULL, PRIMARY KEY (provider, query))")
+
+    def get(self, provider, query):
+        with self._lock:
+            row = self.conn.execute("SELECT result, stored FROM responses WHERE provider = ? AND query = ?",
+                                    (provider, query)).fetchone()
+        hit = row is not None and time.time() - row[1] < self.ttl
+        perf.record_cache(f"provider:{provider}", hit)
+        return json.loads(row[0]) if hit else None
+
+    def put(self, provider, query, result):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO responses (provider, query, result, stored) VALUES (?, ?, ?, ?)",
+                              (provider, query, json.dumps(result), time.time()))
+
+
+class RateLimiter:
+    """Spaces calls at least min_interval seconds apart, across threads."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Provider(ABC):
+    """
+    Base class for a metadata or artwork source. Subclasses set name and
+    kind ("metadata" or "artwork") and implement lookup(query, limit),
+    which returns (result, error) like the rest of the app's network
+    helpers. limit caps the number of artwork results; None means the
+    provider's default.
+    Metadata results are dicts with the keys get_vimm_info returns;
+    artwork results are lists of {"image", "thumbnail", "width", "height"} dicts.
+    """
+    name = "provider"
+    kind = "metadata"
+    min_interval = 1.0 # Seconds between requests to this source
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.rate_limiter = RateLimiter(self.min_interval)
+
+    def accepts(self, query):
+        """Returns True if this provider can answer the query."""
+        return True
+
+    @abstractmethod
+    def lookup(self, query, limit=None):
+        """
+        Queries the source directly, bypassing cache and rate limit.
+        Returns (result, error); result is None on failure. Must not raise.
+        """
+
+    def fetch(self, query, limit=None):
+        """Looks up a query through the response cache and rate limiter."""
+        cache_key = query if limit is None else f"{query}\x00{limit}"
+        if self.cache:
+            cached = self.cache.get(self.name, cache_key)
+            if cached is not None:
+                return cached, None
+        self.rate_limiter.wait()
+        with perf.operation(f"{type(self).__name__}.lookup"):
+            result, error = self.lookup(query, limit)
+        if result and self.cache:
+            self.cache.put(self.name, cache_key, result)
+        return result, error
+
+
+class VimmProvider(Provider):
+    """Game metadata scraped from a Vimm.net vault page; the query is the page URL."""
+    name = "vimm"
+    kind = "metadata"
+    min_interval = 1.0
+
+    def __init__(self, cache=None, base_url="https://vimm.net/"):
+        super().__init__(cache)
+        self.base_url = base_url
+
+    def accepts(self, query):
+        host = urlparse(query).netloc.lower()
+        netloc = urlparse(self.base_url).netloc.lower()
+        return bool(host) and (host == netloc or host.endswith("." + netloc))
+
+    def lookup(self, query, limit=None):
+        from vimm_scraper import get_vimm_info
+        return get_vimm_info(query, session=get_session())
+
+
+class DuckDuckGoImageProvider(Provider):
+    """Artwork from a DuckDuckGo image search; the query is free text."""
+    name = "duckduckgo_images"
+    kind = "artwork"
+    min_interval = 2.0 # DDG throttles aggressive clients
+    max_results = 30
+
+    def __init__(self, cache=None, search=None):
+        """search(query, max_results) returns DDG's raw result dicts; pass one to use a stand-in."""
+        super().__init__(cache)
+        self.search = search or self._search_ddg
+
+    @staticmethod
+    def _search_ddg(query, max_results):
+        from duckduckgo_search import DDGS
+        with DDGS(headers={'User-Agent': USER_AGENT}) as ddgs:
+            return ddgs.images(keywords=query, max_results=max_results) or []
+
+    def lookup(self, query, limit=None):
+        # DDG has no offset; a later page is a bigger request whose head the caller has already seen
+        try:
+            results = self.search(query, limit or self.max_results)
+            return [{
+                "image": res["image"],
+                "thumbnail": res.get("thumbnail"),
+                "width": res.get("width"),
+                "height": res.get("height"),
+            } for res in results], None
+        except Exception as e:
+            return None, f"Image search failed: {e}"
+
+
+def merge_results(kind, results):
+    """Merges results in provider priority order: first non-empty value per field, or all unique images."""
+    if kind == "artwork":
+        merged, seen = [], set()
+        for result in results:
+            for image in result:
+                if image["image"] not in seen:
+                    seen.add(image["image"])
+                    merged.append(image)
+        return merged
+    merged = {}
+    for result in results:
+        for key, value in result.items():
+            if value and not merged.get(key):
+                merged[key] = value
+    return merged
+
+
+class ProviderRegistry:
+    """Holds the configured providers and fans lookups out to them concurrently."""
+
+    def __init__(self, providers=None, max_workers=8):
+        self.providers = list(providers or [])
+        self.max_workers = max_workers
+
+    def register(self, provider):
+        self.providers.append(provider)
+
+    def lookup(self, kind, query, mode="first", timeout=30, limit=None):
+        """
+        Queries every provider of a kind that accepts the query, in parallel.
+        mode="first" returns the first good result; mode="merge" waits for
+        all and merges them in registration order. limit is passed on to
+        each provider. Returns (result, error).
+        """
+        providers = [p for p in self.providers if p.kind == kind and p.accepts(query)]
+        if not providers:
+            return None, "No provider can handle this query."
+
+        results = {}
+        errors = []
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(providers)))
+        try:
+            futures = {executor.submit(p.fetch, query, limit): p for p in providers}
+            for future in as_completed(futures, timeout=timeout):
+                provider = futures[future]
+                try:
+                    result, error = future.result()
+                except Exception as e:
+                    result, error = None, str(e)
+                if error or not result:
+                    errors.append(f"{provider.name}: {error or 'no result'}")
+                    continue
+                if mode == "first":
+                    return result, None
+                results[provider.name] = result
+        except concurrent.futures.TimeoutError: # Not the builtin TimeoutError before Python 3.11
+            errors.append("Timed out waiting for providers.")
+        finally:
+            # Don't hold the caller up for slower providers once we have an answer
+            executor.shutdown(wait=False)
+
+        if not results:
+            return None, "; ".join(errors)
+        ordered = [results[p.name] for p in providers if p.name in results]
+        return merge_results(kind, ordered), None
+
+
+_registry = None
+
+
+def get_registry():
+    """Returns the app-wide registry with the built-in providers."""
+    global _registry
+    if _registry is None:
+        try:
+            cache = ResponseCache()
+        except Exception as e:
+            print(f"Could not open provider cache: {e}")
+            cache = None
+        _registry = ProviderRegistry([VimmProvider(cache), DuckDuckGoImageProvider(cache)])
+    return _registry
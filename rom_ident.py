@@ -0,0 +1,405 @@
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import sqlite3
+import struct
+import threading
+import xml.etree.ElementTree as ET
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from title_match import clean_rom_title, default_titles_dir, TITLE_CATALOG_SUFFIXES
+from utils import cache_dir
+
+CHUNK_SIZE = 1024 * 1024
+HEADER_PEEK = 0x10000 # Enough to reach every internal header read below
+
+# Below this many uncached ROMs, hashing in-process beats starting a pool
+POOL_THRESHOLD = 4
+
+# --- ROM headers ---
+
+def _ascii_field(data, start, length):
+    return data[start:start + length].decode('ascii', 'ignore').replace('\x00', ' ').strip()
+
+
+def _snes_header(data, skip):
+    """Picks LoROM or HiROM by the header checksum pair that adds up to 0xFFFF."""
+    for offset in (0x7FC0, 0xFFC0):
+        base = skip + offset
+        if len(data) < base + 0x20:
+            continue
+        complement, checksum = struct.unpack_from('<HH', data, base + 0x1C)
+        if complement ^ checksum == 0xFFFF:
+            return {"platform": "SNES", "title": _ascii_field(data, base, 21)}
+    return {"platform": "SNES"}
+
+
+def read_rom_header(name, data, size):
+    """
+    Reads what's cheap from the start of a ROM: its platform, internal
+    title and serial, and how many leading bytes are a dump/copier header
+    that No-Intro DATs don't include in their checksums ("skip").
+    """
+    ext = os.path.splitext(name)[1].lower()
+    header = {"platform": "", "title": "", "serial": "", "skip": 0}
+    if data[:4] == b"NES\x1a":
+        header.update(platform="NES", skip=16)
+    elif ext in (".gb", ".gbc") and len(data) >= 0x150:
+        cgb = data[0x143] in (0x80, 0xC0)
+        header.update(platform="Game Boy Color" if cgb else "Game Boy",
+                      title=_ascii_field(data, 0x134, 11 if cgb else 16))
+    elif ext == ".gba" and len(data) >= 0xC0:
+        header.update(platform="Game Boy Advance", title=_ascii_field(data, 0xA0, 12),
+                      serial=_ascii_field(data, 0xAC, 4))
+    elif ext in (".sfc", ".smc"):
+        skip = 512 if size % 1024 == 512 else 0
+        header.update(_snes_header(data, skip), skip=skip)
+    elif len(data) >= 0x190 and data[0x100:0x104] == b"SEGA":
+        header.update(platform="Mega Drive",
+                      title=_ascii_field(data, 0x150, 48) or _ascii_field(data, 0x120, 48),
+                      serial=_ascii_field(data, 0x180, 14))
+    return header
+
+
+class RomHasher:
+    """
+    Computes CRC32, MD5 and SHA1 of a ROM's contents without any dump
+    header, fed chunk by chunk so copies can hash in the same pass.
+    Headered ROMs also get "full" digests of the whole file, for DATs
+    that list them headered.
+    """
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.header = None
+        self.pending = bytearray() # Held until the header has been read
+        self.offset = 0
+
+    def update(self, chunk):
+        if self.header is None:
+            self.pending += chunk
+            if len(self.pending) < min(HEADER_PEEK, self.size):
+                return
+            chunk = bytes(self.pending)
+            self._start(chunk)
+        self._feed(chunk)
+
+    def _start(self, first):
+        self.header = read_rom_header(self.name, first, self.size)
+        self.skip = self.header["skip"]
+        self.crc, self.md5, self.sha1 = 0, hashlib.md5(), hashlib.sha1()
+        if self.skip:
+            self.full_crc, self.full_md5, self.full_sha1 = 0, hashlib.md5(), hashlib.sha1()
+        self.pending = None
+
+    def _feed(self, chunk):
+        body = chunk[max(0, self.skip - self.offset):]
+        self.crc = zlib.crc32(body, self.crc)
+        self.md5.update(body)
+        self.sha1.update(body)
+        if self.skip:
+            self.full_crc = zlib.crc32(chunk, self.full_crc)
+            self.full_md5.update(chunk)
+            self.full_sha1.update(chunk)
+        self.offset += len(chunk)
+
+    def result(self):
+        """Returns the info dict hash_rom documents."""
+        if self.header is None:
+            first = bytes(self.pending)
+            self._start(first)
+            self._feed(first)
+        info = {
+            "size": self.offset - self.skip,
+            "crc32": f"{self.crc:08x}",
+            "md5": self.md5.hexdigest(),
+            "sha1": self.sha1.hexdigest(),
+            "header": self.header,
+        }
+        if self.skip:
+            info["full"] = {"size": self.offset, "crc32": f"{self.full_crc:08x}",
+                            "md5": self.full_md5.hexdigest(), "sha1": self.full_sha1.hexdigest()}
+        return info
+
+
+def hash_rom(path):
+    """
+    Streams a ROM once and returns (info, error), where info has the
+    size, crc32, md5 and sha1 of its headerless contents, the header
+    fields, and "full" digests for headered ROMs. A ROM inside a .zip or
+    .7z source is hashed as the file it unpacks to.
+    """
+    from rom_source import open_rom_source
+    try:
+        with open_rom_source(path) as (stream, name, size):
+            hasher = RomHasher(name, size)
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        return hasher.result(), None
+    except (OSError, ValueError, RuntimeError) as e:
+        return None, f"Could not read {os.path.basename(path)}: {e}"
+
+
+def _hash_rom_worker(path):
+    return path, hash_rom(path)
+
+# --- DAT hash index ---
+
+INDEX_MAGIC = b"EVSDHIX1"
+INDEX_HEADER = struct.Struct('<8sI')
+# crc32, first 8 bytes of sha1 (zeros if the DAT has none), record offset (0 = empty slot)
+INDEX_SLOT = struct.Struct('<I8sI')
+
+
+def default_index_path():
+    """Returns the hash index location, next to the title catalogs it's built from."""
+    return os.path.join(os.path.dirname(default_titles_dir()), "rom_hashes.idx")
+
+
+def _read_dat_roms(path):
+    """Yields (crc32, sha1, size, title, platform) for every ROM in a Logiqx-style DAT."""
+    platform = ""
+    for _, element in ET.iterparse(path, events=("end",)):
+        if element.tag == "header":
+            platform = (element.findtext("name") or "").strip()
+            element.clear()
+        elif element.tag in ("game", "machine"):
+            title = clean_rom_title(element.findtext("description") or element.get("name") or "")
+            for rom in element.iter("rom"):
+                crc = rom.get("crc")
+                if not crc:
+                    continue
+                yield (int(crc, 16), rom.get("sha1") or "", int(rom.get("size") or 0), title, platform)
+            element.clear()
+
+
+def build_hash_index(dat_paths, index_path):
+    """
+    Writes an open-addressing hash table of every ROM in the DATs to
+    index_path: a fixed header, a power-of-two array of 16-byte slots keyed
+    by CRC32, then the "title<TAB>platform<TAB>size" records the slots
+    point at. Returns the number of ROMs indexed.
+    """
+    roms = {}
+    for path in dat_paths:
+        for crc, sha1, size, title, platform in _read_dat_roms(path):
+            roms.setdefault((crc, sha1[:16]), (size, title, platform))
+
+    slot_count = 1
+    while slot_count < 2 * len(roms): # Keep the load factor at or below one half
+        slot_count *= 2
+    mask = slot_count - 1
+    slots = [None] * slot_count
+    records = bytearray(b"\n") # Offset 0 marks an empty slot
+    for (crc, sha1), (size, title, platform) in roms.items():
+        offset = len(records)
+        records += f"{title}\t{platform}\t{size}\n".encode('utf-8')
+        slot = crc & mask
+        while slots[slot] is not None:
+            slot = (slot + 1) & mask
+        slots[slot] = (crc, bytes.fromhex(sha1) if sha1 else b"\0" * 8, offset)
+
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, slot_count))
+        empty = INDEX_SLOT.pack(0, b"\0" * 8, 0)
+        f.write(b"".join(INDEX_SLOT.pack(*slot) if slot else empty for slot in slots))
+        f.write(records)
+    os.replace(temp_path, index_path)
+    return len(roms)
+
+
+class HashIndex:
+    """Read-only, memory-mapped view of an index written by build_hash_index."""
+
+    def __init__(self, index_path):
+        with open(index_path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, slot_count = INDEX_HEADER.unpack_from(self.mm, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{index_path} is not a ROM hash index.")
+        self.mask = slot_count - 1
+        self.records_start = INDEX_HEADER.size + slot_count * INDEX_SLOT.size
+
+    def lookup(self, crc32, sha1="", size=None):
+        """Finds a ROM by its digests. Returns {"title", "platform", "size"} or None."""
+        crc = int(crc32, 16)
+        sha1_prefix = bytes.fromhex(sha1[:16]) if sha1 else b""
+        slot = crc & self.mask
+        while True:
+            slot_crc, slot_sha1, offset = INDEX_SLOT.unpack_from(self.mm, INDEX_HEADER.size + slot * INDEX_SLOT.size)
+            if not offset:
+                return None
+            if slot_crc == crc and (not sha1_prefix or slot_sha1 in (sha1_prefix, b"\0" * 8)):
+                start = self.records_start + offset
+                end = self.mm.find(b"\n", start)
+                title, platform, record_size = self.mm[start:end].decode('utf-8').split("\t")
+                if not size or not int(record_size) or int(record_size) == size:
+                    return {"title": title, "platform": platform, "size": int(record_size)}
+            slot = (slot + 1) & self.mask
+
+    def identify(self, info):
+        """Matches the digests from hash_rom, headerless first. Returns a record or None."""
+        for digests in (info, info.get("full")):
+            if digests:
+                match = self.lookup(digests["crc32"], digests["sha1"], digests["size"])
+                if match:
+                    return match
+        return None
+
+    def close(self):
+        self.mm.close()
+
+
+def _dat_sources(dat_paths):
+    """Returns [name, mtime_ns, size] for each DAT, to tell when the set of DATs has changed."""
+    sources = []
+    for path in dat_paths:
+        st = os.stat(path)
+        sources.append([os.path.basename(path), st.st_mtime_ns, st.st_size])
+    return sources
+
+
+def load_default_index(titles_dir=None, index_path=None):
+    """
+    Opens the hash index for the DATs in the titles folder, rebuilding it
+    first if a DAT was added, removed or changed since it was built.
+    Returns None when there are no DATs.
+    """
+    titles_dir = titles_dir or default_titles_dir()
+    index_path = index_path or default_index_path()
+    if not os.path.isdir(titles_dir):
+        return None
+    dat_paths = [os.path.join(titles_dir, name) for name in sorted(os.listdir(titles_dir))
+                 if name.lower().endswith(TITLE_CATALOG_SUFFIXES) and not name.lower().endswith(".csv")]
+    if not dat_paths:
+        return None
+    try:
+        sources = _dat_sources(dat_paths)
+        sources_path = f"{index_path}.sources.json"
+        try:
+            with open(sources_path, 'r') as f:
+                built_from = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            built_from = None
+        if not os.path.exists(index_path) or built_from != sources:
+            build_hash_index(dat_paths, index_path)
+            with open(sources_path, 'w') as f:
+                json.dump(sources, f)
+        return HashIndex(index_path)
+    except (ET.ParseError, ValueError, OSError) as e:
+        print(f"Could not load ROM hash index: {e}")
+        return None
+
+# --- Digest cache ---
+
+def default_digest_cache_path():
+    """Returns the digest cache location under the XDG cache directory."""
+    return cache_dir("rom_digests.sqlite")
+
+
+class DigestCache:
+    """SQLite cache of hash_rom results keyed by (path, mtime, size), so unchanged ROMs are never re-read."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_digest_cache_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS digests ("
+                              "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, "
+                              "info TEXT NOT NULL)")
+
+    def get(self, path, st):
+        with self._lock:
+            row = self.conn.execute("SELECT info FROM digests WHERE path = ? AND mtime_ns = ? AND size = ?",
+                                    (os.path.realpath(path), st.st_mtime_ns, st.st_size)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, path, st, info):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO digests (path, mtime_ns, size, info) VALUES (?, ?, ?, ?)",
+                              (os.path.realpath(path), st.st_mtime_ns, st.st_size, json.dumps(info)))
+
+# --- Identification ---
+
+def identify_roms(paths, index=None, cache=None, max_workers=None):
+    """
+    Hashes ROMs (cached ones are not re-read; the rest go to a process
+    pool) and matches them against a HashIndex. Returns {path: (info, error)}
+    where info carries the digests, the header and "match" (a record or None).
+    """
+    results = {}
+    stats = {}
+    uncached = []
+    for path in paths:
+        try:
+            stats[path] = os.stat(path)
+        except OSError as e:
+            results[path] = (None, f"Could not read {os.path.basename(path)}: {e}")
+            continue
+        info = cache.get(path, stats[path]) if cache else None
+        if info is None:
+            uncached.append(path)
+        else:
+            results[path] = (info, None)
+
+    if len(uncached) < POOL_THRESHOLD:
+        hashed = map(_hash_rom_worker, uncached)
+    else:
+        # Called from QThreads: forking a process with live Qt and worker threads can deadlock the child
+        pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        hashed = pool.map(_hash_rom_worker, uncached, chunksize=4)
+    try:
+        for path, (info, error) in hashed:
+            if info and cache:
+                cache.put(path, stats[path], info)
+            results[path] = (info, error)
+    finally:
+        if len(uncached) >= POOL_THRESHOLD:
+            pool.shutdown()
+
+    for path, (info, error) in results.items():
+        if info is not None:
+            info["match"] = index.identify(info) if index else None
+    return results
+
+
+def fill_from_match(data, info):
+    """Fills a game data dict's empty title and platform from an identified ROM. Returns True on a match."""
+    match = info.get("match") if info else None
+    if not match:
+        return False
+    if not data.get("title"):
+        data["title"] = match["title"]
+    if not data.get("platform"):
+        data["platform"] = match["platform"] or info["header"].get("platform", "")
+    return True
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    if len(sys.argv) < 2:
+        print("Usage: python3 rom_ident.py <rom file or folder> [titles folder]")
+        sys.exit(1)
+    target = sys.argv[1]
+    paths = [os.path.join(target, name) for name in sorted(os.listdir(target))] if os.path.isdir(target) else [target]
+    paths = [path for path in paths if os.path.isfile(path)]
+    index = load_default_index(sys.argv[2] if len(sys.argv) > 2 else None)
+    start = time.perf_counter()
+    results = identify_roms(paths, index, DigestCache())
+    elapsed = time.perf_counter() - start
+    for path in paths:
+        info, error = results[path]
+        if error:
+            print(f"{os.path.basename(path)}: {error}")
+            continue
+        match = info["match"]["title"] if info["match"] else "(unknown)"
+        print(f"{info['crc32']}  {info['sha1']}  {os.path.basename(path)}  ->  {match}")
+    print(f"Identified {len(paths)} ROM(s) in {elapsed:.2f}s.")
@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    import py7zr
+    _BAD_ARCHIVE_ERRORS = (zipfile.BadZipFile, py7zr.Bad7zFile, OSError)
+except ImportError:
+    py7zr = None
+    _BAD_ARCHIVE_ERRORS = (zipfile.BadZipFile, OSError)
+
+ARCHIVE_SUFFIXES = (".zip", ".7z")
+
+# Archive members that are never the ROM itself
+IGNORED_MEMBER_SUFFIXES = (".txt", ".nfo", ".diz", ".pdf", ".jpg", ".png", ".url", ".htm", ".html")
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# py7zr can't stream, so a .7z member is unpacked whole; larger ones go to a temp file instead of RAM
+SEVEN_ZIP_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# A ROM source with its archive member already looked up: member is (name, size), or None for a plain file
+RomSource = namedtuple("RomSource", "path member")
+
+
+def _archive_rom_member(members):
+    """
+    Picks the ROM out of [(name, size)] archive members. Returns None when
+    there isn't exactly one candidate, e.g. an arcade romset, which the
+    core loads as the zip itself.
+    """
+    candidates = [(name, size) for name, size in members
+                  if not name.endswith("/") and not name.lower().endswith(IGNORED_MEMBER_SUFFIXES)]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def _archive_members(source_path):
+    """Lists [(name, size)] of an archive's members."""
+    if source_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(source_path) as archive:
+            return [(info.filename, info.file_size) for info in archive.infolist()]
+    if not py7zr:
+        raise RuntimeError("Reading .7z ROMs needs the 'py7zr' package.")
+    with py7zr.SevenZipFile(source_path, 'r') as archive:
+        return [(info.filename, info.uncompressed) for info in archive.list() if not info.is_directory]
+
+
+def rom_source_member(source_path):
+    """
+    Returns (name, size) of the ROM to unpack from an archive source, or
+    None to copy the file as is. Raises RuntimeError for a .7z when
+    py7zr isn't installed.
+    """
+    if not source_path.lower().endswith(ARCHIVE_SUFFIXES):
+        return None
+    try:
+        return _archive_rom_member(_archive_members(source_path))
+    except _BAD_ARCHIVE_ERRORS:
+        return None # Not a readable archive; treat it as a plain ROM
+
+
+def resolve_rom_source(source):
+    """
+    Looks up a ROM source path's archive member once, so the name, size
+    and contents can be read without listing the archive again. The
+    functions below take either a path or the RomSource this returns.
+    """
+    if isinstance(source, RomSource):
+        return source
+    return RomSource(source, rom_source_member(source))
+
+
+def rom_source_name(source):
+    """Returns the file name the ROM ends up with: the single ROM inside an archive, or the file itself."""
+    source = resolve_rom_source(source)
+    return os.path.basename(source.member[0]) if source.member else os.path.basename(source.path)
+
+
+def rom_source_size(source):
+    """Returns the size of the ROM as written to the card, i.e. unpacked if it comes from an archive."""
+    source = resolve_rom_source(source)
+    return source.member[1] if source.member else os.path.getsize(source.path)
+
+
+@contextmanager
+def open_rom_source(source):
+    """
+    Opens a ROM source for streaming and yields (stream, name, size).
+    A .zip holding a single ROM yields that member, decompressed on the
+    fly. py7zr can't stream, so a .7z member is unpacked in memory, or
+    into a temporary folder when it's over SEVEN_ZIP_MEMORY_LIMIT.
+    """
+    source_path, member = resolve_rom_source(source)
+    if member is None:
+        with open(source_path, 'rb') as f:
+            yield f, os.path.basename(source_path), os.fstat(f.fileno()).st_size
+    elif source_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(source_path) as archive, archive.open(member[0]) as stream:
+            yield stream, os.path.basename(member[0]), member[1]
+    elif member[1] <= SEVEN_ZIP_MEMORY_LIMIT:
+        with py7zr.SevenZipFile(source_path, 'r') as archive:
+            stream = archive.read([member[0]])[member[0]]
+        yield stream, os.path.basename(member[0]), member[1]
+    else:
+        temp_dir = tempfile.mkdtemp(prefix="eversd_7z_")
+        try:
+            with py7zr.SevenZipFile(source_path, 'r') as archive:
+                archive.extract(path=temp_dir, targets=[member[0]])
+            with open(os.path.join(temp_dir, member[0]), 'rb') as stream:
+                yield stream, os.path.basename(member[0]), member[1]
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def copy_rom(source, dest_path, chunk_size=COPY_CHUNK_SIZE):
+    """
+    Streams a ROM source (a path or RomSource) to dest_path, unpacking it
+    first if it's an archive, and hashes it in the same pass. Returns the
+    RomHasher info for the written file.
+    """
+    from rom_ident import RomHasher
+    with open_rom_source(source) as (stream, name, size), open(dest_path, 'wb') as out:
+        hasher = RomHasher(name, size)
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            out.write(chunk)
+            hasher.update(chunk)
+    return hasher.result()
@@ -0,0 +1,111 @@
+import os
+
+# Filesystems an EverSD card can be formatted with.
+CARD_FILESYSTEMS = {"vfat", "exfat", "msdos"}
+
+# Where desktop automounters and users typically mount removable media.
+MEDIA_ROOTS = ("/media", "/run/media", "/mnt")
+
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+
+
+def _unescape_mount_field(field):
+    """Decodes the octal escapes (e.g. '\\040' for a space) used in mountinfo."""
+    if "\\" not in field:
+        return field
+    out = []
+    i = 0
+    while i < len(field):
+        if field[i] == "\\" and field[i + 1:i + 4].isdigit():
+            out.append(chr(int(field[i + 1:i + 4], 8)))
+            i += 4
+        else:
+            out.append(field[i])
+            i += 1
+    return "".join(out)
+
+
+def parse_mountinfo(mountinfo_path=MOUNTINFO_PATH):
+    """
+    Parses a mountinfo file in a single read and returns a list of
+    mount dicts with 'mount_point', 'fs_type' and 'source' keys.
+    """
+    try:
+        with open(mountinfo_path, "r") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+
+    mounts = []
+    for line in lines:
+        # Format: id parent major:minor root mount_point options [optional...] - fstype source super_options
+        pre, sep, post = line.partition(" - ")
+        if not sep:
+            continue
+        pre_fields = pre.split(" ")
+        post_fields = post.split(" ")
+        if len(pre_fields) < 5 or len(post_fields) < 2:
+            continue
+        mounts.append({
+            "mount_point": _unescape_mount_field(pre_fields[4]),
+            "fs_type": post_fields[0],
+            "source": _unescape_mount_field(post_fields[1]),
+        })
+    return mounts
+
+
+def is_removable_device(source, sys_class_block="/sys/class/block"):
+    """
+    Checks sysfs to see whether a block device (or the disk it is a
+    partition of) is flagged as removable. Devices sysfs knows nothing
+    about are given the benefit of the doubt.
+    """
+    if not source.startswith("/dev/"):
+        return False
+    name = os.path.basename(os.path.realpath(source))
+    # SD slots wired directly to the host (mmcblk*) are always removable media.
+    if name.startswith("mmcblk"):
+        return True
+
+    device_dir = os.path.join(sys_class_block, name)
+    if not os.path.exists(device_dir):
+        return True
+    device_dir = os.path.realpath(device_dir)
+    # USB card readers frequently report removable=0, so the bus counts too.
+    if "/usb" in device_dir:
+        return True
+    # Partitions have no 'removable' flag of their own; the parent disk does.
+    for candidate in (device_dir, os.path.dirname(device_dir)):
+        try:
+            with open(os.path.join(candidate, "removable"), "r") as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return False
+
+
+def find_card_mounts(mountinfo_path=MOUNTINFO_PATH, media_roots=MEDIA_ROOTS, check_removable=True):
+    """Returns mount points of removable FAT/exFAT filesystems under the common media roots."""
+    card_mounts = []
+    for mount in parse_mountinfo(mountinfo_path):
+        if mount["fs_type"] not in CARD_FILESYSTEMS:
+            continue
+        mount_point = mount["mount_point"]
+        if not any(mount_point == root or mount_point.startswith(root + "/") for root in media_roots):
+            continue
+        if check_removable and not is_removable_device(mount["source"]):
+            continue
+        if mount_point not in card_mounts:
+            card_mounts.append(mount_point)
+    return card_mounts
+
+
+def is_eversd_root(path, logic):
+    """Cheap check for an EverSD layout: a 'game' directory or emulator cores in the root."""
+    return os.path.isdir(os.path.join(path, "game")) or bool(logic.find_emulator_files(path))
+
+
+def detect_eversd_cards(logic, mountinfo_path=MOUNTINFO_PATH, media_roots=MEDIA_ROOTS, check_removable=True):
+    """Returns the mount points of all mounted cards that look like an EverSD."""
+    return [path for path in find_card_mounts(mountinfo_path, media_roots, check_removable)
+            if is_eversd_root(path, logic)]
@@ -0,0 +1,83 @@
+import os
+import shutil
+
+# Assumed card write speed until one has been measured: the SD Class 10 minimum
+DEFAULT_WRITE_RATE = 10 * 1024 * 1024
+
+# Headroom left free on top of the plan, for the journal record and FAT directory growth
+RESERVE_BYTES = 1024 * 1024
+
+
+def free_space(path):
+    """Returns (free_bytes, cluster_size) for the filesystem holding path."""
+    if hasattr(os, "statvfs"):
+        st = os.statvfs(path)
+        # On FAT, f_bsize is the cluster size; f_frsize is the unit f_bavail counts in
+        return st.f_bavail * st.f_frsize, st.f_bsize or st.f_frsize
+    return shutil.disk_usage(path).free, 32 * 1024 # No statvfs on Windows; assume a typical exFAT cluster
+
+
+def on_disk_size(size, cluster_size):
+    """Rounds a file size up to whole clusters. Empty files take no cluster on FAT."""
+    return -(-size // cluster_size) * cluster_size
+
+
+class WritePlan:
+    """
+    The files an operation is about to write to one card. Journaled
+    operations stage new files next to the old ones, so both occupy space
+    until the commit; peak_bytes counts that worst case, with every file
+    rounded up to the card's cluster size.
+    """
+
+    def __init__(self, eversd_path):
+        self.eversd_path = eversd_path
+        self.free_bytes, self.cluster_size = free_space(eversd_path)
+        self.data_bytes = 0 # What actually gets written, for the time estimate
+        self.peak_bytes = 0
+        self.net_bytes = 0 # Change in used space once the operation is done
+        self.files = 0
+
+    def add_file(self, target_path, size):
+        """Adds one file of size bytes. An existing target_path is freed once it's overwritten."""
+        new_size = on_disk_size(size, self.cluster_size)
+        old_size = 0
+        if os.path.exists(target_path):
+            old_size = on_disk_size(os.path.getsize(target_path), self.cluster_size)
+        self.data_bytes += size
+        self.peak_bytes += new_size
+        self.net_bytes += new_size - old_size
+        self.files += 1
+
+    def fits(self):
+        return self.peak_bytes + RESERVE_BYTES <= self.free_bytes
+
+    def estimate_seconds(self, write_rate=None):
+        return self.data_bytes / (write_rate or DEFAULT_WRITE_RATE)
+
+    def check(self, write_rate=None):
+        """Returns (fits, message) describing the plan against the card's free space."""
+        mb = 1024 * 1024
+        if not self.fits():
+            return False, (f"Not enough space on the card: needs {(self.peak_bytes + RESERVE_BYTES) / mb:.1f} MB, "
+                           f"{self.free_bytes / mb:.1f} MB free.")
+        return True, (f"Writing {self.files} file(s), {self.data_bytes / mb:.1f} MB "
+                      f"(~{self.estimate_seconds(write_rate):.0f}s); {(self.free_bytes - self.net_bytes) / mb:.1f} MB "
+                      f"will be left free.")
+
+
+def raw_image_bytes(size):
+    """Upper bound on an optimized PNG of a given size: uncompressed RGBA plus chunk overhead."""
+    width, height = size
+    return width * height * 4 + height + 1024
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 3:
+        print("Usage: python3 space.py <eversd_path> <file> [file ...]")
+        sys.exit(1)
+    plan = WritePlan(sys.argv[1])
+    for path in sys.argv[2:]:
+        plan.add_file(os.path.join(sys.argv[1], "game", os.path.basename(path)), os.path.getsize(path))
+    print(f"Cluster size {plan.cluster_size} bytes. {plan.check()[1]}")
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import unittest
+
+from catalog_export import EXPORT_FORMAT, EXPORT_VERSION, export_catalog, import_catalog
+
+
+class CatalogRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.card = os.path.join(self.temp_dir.name, "card")
+        self.game_path = os.path.join(self.card, "game")
+        os.makedirs(self.game_path)
+        self.export_path = os.path.join(self.temp_dir.name, "catalog.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def add_game(self, base_name, title):
+        with open(os.path.join(self.game_path, f"{base_name}.gb"), "wb") as f:
+            f.write(b"rom")
+        with open(os.path.join(self.game_path, f"{base_name}.json"), "w") as f:
+            json.dump({"romFileName": f"{base_name}.gb", "romTitle": title}, f)
+
+    def test_names_scan_accepts_survive_a_round_trip(self):
+        for base_name in ("Super_Mario-Bros", "tetris"):
+            self.add_game(base_name, base_name)
+        exported, errors = export_catalog(self.card, self.export_path)
+        self.assertEqual((exported, errors), (2, []))
+
+        with open(os.path.join(self.game_path, "Super_Mario-Bros.json"), "w") as f:
+            json.dump({"romFileName": "Super_Mario-Bros.gb", "romTitle": "Changed"}, f)
+        report = import_catalog(self.card, self.export_path)
+        self.assertEqual(report["errors"], [])
+        self.assertEqual(report["updated"], ["Super_Mario-Bros"])
+        self.assertEqual(report["unchanged"], 1)
+
+    def test_unsafe_names_are_rejected(self):
+        with open(self.export_path, "w") as f:
+            f.write(json.dumps({"format": EXPORT_FORMAT, "version": EXPORT_VERSION}) + "\n")
+            for base_name in ("../escape", "/etc/passwd", "..", ""):
+                f.write(json.dumps({"base_name": base_name, "metadata": {"romFileName": "x.gb"}}) + "\n")
+        report = import_catalog(self.card, self.export_path)
+        self.assertEqual(len(report["errors"]), 4)
+        self.assertEqual(report["updated"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from cores import CoreRegistry, platform_extensions
+
+
+class PlatformExtensionsTest(unittest.TestCase):
+    def test_genesis_is_not_nes(self):
+        self.assertEqual(platform_extensions("Sega Genesis")[0], "md")
+        self.assertEqual(platform_extensions("Sega - Mega Drive - Genesis")[0], "md")
+
+    def test_header_and_dat_names(self):
+        self.assertEqual(platform_extensions("NES"), ("nes", "fds"))
+        self.assertEqual(platform_extensions("Nintendo - Nintendo Entertainment System"), ("nes", "fds"))
+        self.assertEqual(platform_extensions("Nintendo - Super Nintendo Entertainment System"), ("sfc", "smc"))
+        self.assertEqual(platform_extensions("Nintendo - Game Boy Color"), ("gbc", "gb"))
+        self.assertEqual(platform_extensions("SNK - Neo Geo Pocket"), ("ngp", "ngc"))
+        self.assertEqual(platform_extensions("Unknown Console"), ())
+
+
+class DefaultCoreTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.card = os.path.join(self.temp_dir.name, "card")
+        os.makedirs(self.card)
+        for core in ("fceumm_libretro.so", "genesis_plus_gx_libretro.so"):
+            with open(os.path.join(self.card, core), "wb") as f:
+                f.write(core.encode()) # No readable extension list, so the known-core table applies
+        self.registry = CoreRegistry(os.path.join(self.temp_dir.name, "cores.json"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_platform_picks_the_core_when_the_extension_does_not(self):
+        core = self.registry.default_core(self.card, "Sonic.rom", "Sega - Mega Drive - Genesis")
+        self.assertEqual(core, "genesis_plus_gx_libretro.so")
+        core = self.registry.default_core(self.card, "Mario.rom", "Nintendo - Nintendo Entertainment System")
+        self.assertEqual(core, "fceumm_libretro.so")
+
+    def test_extension_wins(self):
+        self.assertEqual(self.registry.default_core(self.card, "Mario.nes", "Sega Genesis"), "fceumm_libretro.so")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import unittest
+
+from journal import JOURNAL_DIR, Journal
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.card = self.temp_dir.name
+        self.game_path = os.path.join(self.card, "game")
+        os.makedirs(self.game_path)
+        self.journal = Journal(self.card)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.game_path, name)
+
+    def write(self, name, data):
+        with open(self.path(name), "w") as f:
+            f.write(data)
+
+    def read(self, name):
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def leave_record(self, op_id, record):
+        """Writes a record as a crashed process would have left it."""
+        os.makedirs(os.path.join(self.card, JOURNAL_DIR), exist_ok=True)
+        with open(os.path.join(self.card, JOURNAL_DIR, f"{op_id}.json"), "w") as f:
+            json.dump(dict(record, id=op_id), f)
+
+    def game_files(self):
+        return sorted(os.listdir(self.game_path))
+
+    def test_commit_applies_every_step(self):
+        self.write("old.json", "old")
+        self.write("gone.png", "x")
+        with self.journal.begin("update_game", "game") as txn:
+            txn.write(self.path("new.json"), "new")
+            txn.rename(self.path("old.json"), self.path("moved.json"))
+            txn.remove(self.path("gone.png"))
+            self.assertEqual(self.game_files(), ["gone.png", f"new.json.{txn.op_id}.tmp", "old.json"])
+        self.assertEqual(self.game_files(), ["moved.json", "new.json"])
+        self.assertEqual(self.read("new.json"), "new")
+        self.assertEqual(os.listdir(os.path.join(self.card, JOURNAL_DIR)), [])
+
+    def test_error_aborts(self):
+        self.write("game.json", "old")
+        with self.assertRaises(ValueError):
+            with self.journal.begin("update_game", "game") as txn:
+                txn.write(self.path("game.json"), "new")
+                raise ValueError("boom")
+        self.assertEqual(self.game_files(), ["game.json"])
+        self.assertEqual(self.read("game.json"), "old")
+
+    def test_live_transaction_is_not_recovered(self):
+        txn = self.journal.begin("create_game", "game")
+        txn.write(self.path("game.json"), "new")
+        self.assertEqual(self.journal.pending(), [])
+        self.assertEqual(self.journal.recover(), (0, 0, []))
+        txn.commit()
+        self.assertEqual(self.read("game.json"), "new")
+
+    def test_rollback_of_interrupted_operation(self):
+        self.write("game.json", "old")
+        # Same pid as this process, as after a reboot; not live, so it is recovered
+        op_id = f"1-{os.getpid()}-999"
+        self.write(f"game.json.{op_id}.tmp", "staged")
+        self.write(f"game.png.{op_id}.tmp.tmp", "half written")
+        self.leave_record(op_id, {"op": "update_game", "description": "game", "state": "pending",
+                                  "dirs": ["game"], "steps": []})
+        self.assertEqual(self.journal.recover(), (0, 1, []))
+        self.assertEqual(self.game_files(), ["game.json"])
+        self.assertEqual(self.read("game.json"), "old")
+        self.assertEqual(self.journal.pending(), [])
+
+    def test_roll_forward_of_committed_operation(self):
+        op_id = "2-1-0"
+        self.write("game.json", "old")
+        self.write(f"game.json.{op_id}.tmp", "new")
+        self.write("old.gb", "rom")
+        self.write("banner.png", "x")
+        self.leave_record(op_id, {"op": "rename_game", "description": "game", "state": "committed", "dirs": ["game"],
+                                  "steps": [
+                                      {"action": "write", "target": "game/game.json",
+                                       "staged": f"game/game.json.{op_id}.tmp"},
+                                      {"action": "rename", "source": "game/old.gb", "target": "game/new.gb"},
+                                      {"action": "remove", "target": "game/banner.png"},
+                                  ]})
+        self.assertEqual(self.journal.recover(), (1, 0, []))
+        self.assertEqual(self.game_files(), ["game.json", "new.gb"])
+        self.assertEqual(self.read("game.json"), "new")
+        # Repeating a half-applied roll forward is harmless
+        self.leave_record(op_id, {"op": "rename_game", "state": "committed", "steps": [
+            {"action": "rename", "source": "game/old.gb", "target": "game/new.gb"}]})
+        self.assertEqual(self.journal.recover(), (1, 0, []))
+        self.assertEqual(self.game_files(), ["game.json", "new.gb"])
+
+
+if __name__ == '__main__':
+    unittest.main()
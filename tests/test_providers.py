@@ -0,0 +1,156 @@
+import functools
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from providers import DuckDuckGoImageProvider, Provider, ProviderRegistry, ResponseCache, VimmProvider
+from vimm_scraper import parse_vimm_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class FixtureServer:
+    """Serves tests/fixtures/<site> over HTTP on localhost, counting requests."""
+
+    def __init__(self, site):
+        self.requests = 0
+        server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                super().do_GET()
+
+            def log_message(self, *args):
+                pass
+
+        handler = functools.partial(Handler, directory=os.path.join(FIXTURES, site))
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StaticProvider(Provider):
+    """Answers every query with a fixed result after an optional delay."""
+    min_interval = 0.0
+
+    def __init__(self, name, kind, result, delay=0.0):
+        self.name = name
+        self.kind = kind
+        self.result = result
+        self.delay = delay
+        super().__init__()
+
+    def lookup(self, query, limit=None):
+        time.sleep(self.delay)
+        return self.result, None if self.result else "no result"
+
+
+class VimmParseTest(unittest.TestCase):
+    def test_parse_vault_page(self):
+        with open(os.path.join(FIXTURES, "vimm", "vault", "4157"), "rb") as f:
+            details = parse_vimm_page(f.read())
+        self.assertEqual(details["title"], "Mario Tennis")
+        self.assertEqual(details["platform"], "Game Boy Color")
+        self.assertEqual(details["release_date"], "2000")
+        self.assertEqual(details["developer"], "Camelot")
+        self.assertEqual(details["publisher"], "Nintendo")
+        self.assertEqual(details["genre"], "Sports")
+
+
+class VimmProviderTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer("vimm")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(os.path.join(self.temp_dir.name, "providers.sqlite"))
+        self.provider = VimmProvider(self.cache, base_url=self.server.base_url)
+
+    def tearDown(self):
+        self.cache.conn.close()
+        self.server.close()
+        self.temp_dir.cleanup()
+
+    def test_fetch_from_fixture_server_and_cache(self):
+        url = f"{self.server.base_url}vault/4157"
+        self.assertTrue(self.provider.accepts(url))
+        details, error = self.provider.fetch(url)
+        self.assertIsNone(error)
+        self.assertEqual(details["title"], "Mario Tennis")
+        details, error = self.provider.fetch(url)
+        self.assertEqual(details["publisher"], "Nintendo")
+        self.assertEqual(self.server.requests, 1) # The second fetch came from the cache
+
+    def test_missing_page_is_an_error(self):
+        details, error = self.provider.fetch(f"{self.server.base_url}vault/0")
+        self.assertIsNone(details)
+        self.assertIn("404", error)
+
+    def test_accepts_only_the_configured_host(self):
+        provider = VimmProvider()
+        self.assertTrue(provider.accepts("https://vimm.net/vault/4157"))
+        self.assertTrue(provider.accepts("https://www.vimm.net/vault/4157"))
+        self.assertFalse(provider.accepts("https://evilvimm.net/vault/4157"))
+        self.assertFalse(provider.accepts("Mario Tennis"))
+
+
+class RegistryTest(unittest.TestCase):
+    def test_merge_artwork_in_registration_order(self):
+        search = lambda query, max_results: [
+            {"image": "http://a/1.png", "thumbnail": "http://a/1t.png", "width": 474, "height": 666},
+            {"image": "http://a/2.png", "width": 100, "height": 100},
+        ][:max_results]
+        registry = ProviderRegistry([
+            DuckDuckGoImageProvider(search=search),
+            StaticProvider("other", "artwork", [{"image": "http://a/2.png"}, {"image": "http://b/3.png"}]),
+        ])
+        images, error = registry.lookup("artwork", "mario tennis box art", mode="merge")
+        self.assertIsNone(error)
+        self.assertEqual([image["image"] for image in images], ["http://a/1.png", "http://a/2.png", "http://b/3.png"])
+        self.assertEqual(images[0]["thumbnail"], "http://a/1t.png")
+
+    def test_limit_reaches_the_provider(self):
+        search = lambda query, max_results: [{"image": f"http://a/{i}.png"} for i in range(max_results)]
+        registry = ProviderRegistry([DuckDuckGoImageProvider(search=search)])
+        images, _ = registry.lookup("artwork", "query", mode="merge", limit=5)
+        self.assertEqual(len(images), 5)
+
+    def test_merge_metadata_fills_empty_fields(self):
+        registry = ProviderRegistry([
+            StaticProvider("first", "metadata", {"title": "Mario Tennis", "genre": ""}),
+            StaticProvider("second", "metadata", {"title": "Other", "genre": "Sports"}),
+        ])
+        details, error = registry.lookup("metadata", "query", mode="merge")
+        self.assertEqual(details, {"title": "Mario Tennis", "genre": "Sports"})
+
+    def test_first_mode_does_not_wait_for_slow_providers(self):
+        registry = ProviderRegistry([
+            StaticProvider("slow", "metadata", {"title": "Slow"}, delay=1.0),
+            StaticProvider("fast", "metadata", {"title": "Fast"}),
+        ])
+        start = time.perf_counter()
+        details, _ = registry.lookup("metadata", "query", mode="first")
+        self.assertEqual(details["title"], "Fast")
+        self.assertLess(time.perf_counter() - start, 0.9)
+
+    def test_timeout_is_reported(self):
+        registry = ProviderRegistry([StaticProvider("slow", "metadata", {"title": "Slow"}, delay=1.0)])
+        details, error = registry.lookup("metadata", "query", timeout=0.1)
+        self.assertIsNone(details)
+        self.assertIn("Timed out", error)
+
+    def test_no_provider(self):
+        details, error = ProviderRegistry([]).lookup("metadata", "query")
+        self.assertIsNone(details)
+        self.assertTrue(error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+import zipfile
+
+from rom_source import RomSource, copy_rom, resolve_rom_source, rom_source_name, rom_source_size
+
+
+class RomSourceTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.rom = os.urandom(5000)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def make_zip(self, name, members):
+        with zipfile.ZipFile(self.path(name), "w") as archive:
+            for member, data in members.items():
+                archive.writestr(member, data)
+        return self.path(name)
+
+    def test_single_rom_zip_is_unpacked(self):
+        source = resolve_rom_source(self.make_zip("game.zip", {"Game.gb": self.rom, "readme.txt": "hi"}))
+        self.assertEqual(source.member, ("Game.gb", len(self.rom)))
+        self.assertEqual(rom_source_name(source), "Game.gb")
+        self.assertEqual(rom_source_size(source), len(self.rom))
+        info = copy_rom(source, self.path("out.gb"))
+        with open(self.path("out.gb"), "rb") as f:
+            self.assertEqual(f.read(), self.rom)
+        self.assertEqual(info["size"], len(self.rom))
+
+    def test_romset_zip_is_copied_as_is(self):
+        path = self.make_zip("set.zip", {"a.rom": b"a", "b.rom": b"b"})
+        self.assertEqual(resolve_rom_source(path), RomSource(path, None))
+        self.assertEqual(rom_source_name(path), "set.zip")
+        self.assertEqual(rom_source_size(path), os.path.getsize(path))
+
+    def test_resolved_source_is_not_listed_again(self):
+        path = self.make_zip("game.zip", {"Game.gb": self.rom})
+        source = resolve_rom_source(path)
+        os.remove(path) # Name and size now come from the RomSource alone
+        self.assertIs(resolve_rom_source(source), source)
+        self.assertEqual(rom_source_name(source), "Game.gb")
+        self.assertEqual(rom_source_size(source), len(self.rom))
+
+    def test_unreadable_zip_is_a_plain_file(self):
+        with open(self.path("broken.zip"), "wb") as f:
+            f.write(b"not a zip")
+        self.assertIsNone(resolve_rom_source(self.path("broken.zip")).member)
+
+
+if __name__ == '__main__':
+    unittest.main()
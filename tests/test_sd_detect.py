@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+from sd_detect import detect_eversd_cards, find_card_mounts, is_removable_device, parse_mountinfo
+
+MOUNTINFO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mountinfo")
+
+
+class ParseMountinfoTest(unittest.TestCase):
+    def test_parses_well_formed_lines(self):
+        mounts = parse_mountinfo(mountinfo_path=MOUNTINFO)
+        self.assertEqual(len(mounts), 11) # The line without " - " and the one without a source are skipped
+        self.assertEqual(mounts[0], {"mount_point": "/", "fs_type": "ext4", "source": "/dev/vda1"})
+
+    def test_decodes_octal_escapes(self):
+        mount_points = [mount["mount_point"] for mount in parse_mountinfo(mountinfo_path=MOUNTINFO)]
+        self.assertIn("/media/user/My Card", mount_points)
+        self.assertIn("/mnt/evercade/Tab\tCard", mount_points)
+
+    def test_missing_file_is_empty(self):
+        self.assertEqual(parse_mountinfo(mountinfo_path="/nonexistent/mountinfo"), [])
+
+
+class FindCardMountsTest(unittest.TestCase):
+    def test_keeps_fat_filesystems_under_media_roots(self):
+        mounts = find_card_mounts(mountinfo_path=MOUNTINFO, check_removable=False)
+        self.assertEqual(mounts, [
+            "/run/media/user/EVERSD",
+            "/media/user/My Card",
+            "/mnt",
+            "/mnt/evercade/Tab\tCard",
+            "/media/user/EVERSD",
+        ])
+
+    def test_custom_media_roots(self):
+        mounts = find_card_mounts(mountinfo_path=MOUNTINFO, media_roots=("/mnt",), check_removable=False)
+        self.assertEqual(mounts, ["/mnt", "/mnt/evercade/Tab\tCard"])
+
+
+class RemovableDeviceTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.sys_class_block = os.path.join(self.temp_dir.name, "class", "block")
+        os.makedirs(self.sys_class_block)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def add_device(self, name, device_dir):
+        """Links /sys/class/block/<name> to a device folder, as the kernel does."""
+        device_dir = os.path.join(self.temp_dir.name, "devices", device_dir)
+        os.makedirs(device_dir)
+        os.symlink(device_dir, os.path.join(self.sys_class_block, name))
+        return device_dir
+
+    def test_partition_uses_parent_disk_flag(self):
+        partition_dir = self.add_device("sdb1", "pci0/ata1/block/sdb/sdb1")
+        with open(os.path.join(os.path.dirname(partition_dir), "removable"), "w") as f:
+            f.write("1\n")
+        self.assertTrue(is_removable_device("/dev/sdb1", self.sys_class_block))
+
+    def test_fixed_disk_is_not_removable(self):
+        partition_dir = self.add_device("sda1", "pci0/ata0/block/sda/sda1")
+        with open(os.path.join(os.path.dirname(partition_dir), "removable"), "w") as f:
+            f.write("0\n")
+        self.assertFalse(is_removable_device("/dev/sda1", self.sys_class_block))
+
+    def test_unknown_device_is_given_the_benefit_of_the_doubt(self):
+        self.assertTrue(is_removable_device("/dev/sdz1", self.sys_class_block))
+
+    def test_usb_reader_counts_as_removable(self):
+        self.add_device("sdc1", "pci0/usb1/1-1/block/sdc/sdc1")
+        self.assertTrue(is_removable_device("/dev/sdc1", self.sys_class_block))
+
+    def test_sd_slot_and_non_device_sources(self):
+        self.assertTrue(is_removable_device("/dev/mmcblk0p1", self.sys_class_block))
+        self.assertFalse(is_removable_device("tmpfs", self.sys_class_block))
+
+
+class DetectCardsTest(unittest.TestCase):
+    def test_only_eversd_layouts_are_detected(self):
+        class Logic:
+            def find_emulator_files(self, path):
+                return ["core.so"] if path == "/mnt" else []
+
+        cards = detect_eversd_cards(Logic(), mountinfo_path=MOUNTINFO, check_removable=False)
+        self.assertEqual(cards, ["/mnt"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+import csv
+import math
+import os
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter
+from logic import make_safe_base_name
+from utils import data_dir
+
+TITLE_CATALOG_SUFFIXES = (".dat", ".xml", ".csv")
+
+# Fields a catalog entry can fill in, named as in AddGameDialog.get_data()
+MATCH_FIELDS = ("title", "platform", "genre", "publisher", "developer", "release_date")
+
+# CSV header aliases, lowercased
+CSV_COLUMNS = {
+    "title": ("title", "name", "game"),
+    "platform": ("platform", "system", "console"),
+    "genre": ("genre", "category"),
+    "publisher": ("publisher", "manufacturer"),
+    "developer": ("developer",),
+    "release_date": ("release_date", "year", "released"),
+}
+
+NGRAM_SIZE = 3
+MIN_MATCH_SCORE = 0.6
+MAX_CANDIDATES = 32 # Entries scored exactly per lookup
+
+_TAG_PATTERN = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+
+
+def default_titles_dir():
+    """Returns the folder title catalogs are loaded from, under the XDG data directory."""
+    return data_dir("titles")
+
+
+def clean_rom_title(file_name):
+    """Turns a ROM filename like 'Super Mario World (USA) [!].sfc' into 'Super Mario World'."""
+    title = os.path.splitext(os.path.basename(file_name))[0]
+    title = _TAG_PATTERN.sub('', title).replace('_', ' ')
+    return ' '.join(title.split())
+
+
+def ngrams(key):
+    """Returns the set of n-grams of a normalized title, with its ends marked."""
+    padded = f"^{key}$"
+    return {padded[i:i + NGRAM_SIZE] for i in range(max(1, len(padded) - NGRAM_SIZE + 1))}
+
+
+def _read_dat(path):
+    """Yields entries from a Logiqx-style XML DAT (No-Intro, Redump, MAME)."""
+    platform = ""
+    for _, element in ET.iterparse(path, events=("end",)):
+        if element.tag == "header":
+            platform = (element.findtext("name") or "").strip()
+            element.clear()
+        elif element.tag in ("game", "machine"):
+            name = element.findtext("description") or element.get("name") or ""
+            yield {
+                "title": clean_rom_title(name),
+                "platform": platform,
+                "genre": (element.findtext("genre") or "").strip(),
+                "publisher": (element.findtext("publisher") or element.findtext("manufacturer") or "").strip(),
+                "developer": (element.findtext("developer") or "").strip(),
+                "release_date": (element.findtext("year") or "").strip(),
+            }
+            element.clear()
+
+
+def _read_csv(path):
+    """Yields entries from a CSV with a header row; see CSV_COLUMNS for accepted column names."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = {}
+        for field, aliases in CSV_COLUMNS.items():
+            for header in reader.fieldnames or []:
+                if header.strip().lower() in aliases:
+                    columns[field] = header
+                    break
+        if "title" not in columns:
+            raise ValueError(f"{os.path.basename(path)} has no title column.")
+        for row in reader:
+            yield {field: (row.get(header) or "").strip() for field, header in columns.items()}
+
+
+class TitleCatalog:
+    """
+    An in-memory catalog of known games with a precomputed n-gram index
+    for fuzzy title lookups. Titles are normalized with the same rules
+    create_game_entry uses for base filenames, so a match key is also
+    the base name the game would get on the card.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.by_key = {} # normalized title -> entry id, for exact hits
+        self.keys = [] # entry id -> normalized title
+        self.index = {} # n-gram -> [entry id]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry):
+        key = make_safe_base_name(entry.get("title", ""))
+        if not key or key in self.by_key:
+            return
+        entry_id = len(self.entries)
+        self.entries.append(entry)
+        self.by_key[key] = entry_id
+        self.keys.append(key)
+        for gram in ngrams(key):
+            self.index.setdefault(gram, []).append(entry_id)
+
+    def load_file(self, path):
+        """Adds every entry of a DAT/XML or CSV file. Returns the number of entries read."""
+        reader = _read_csv if path.lower().endswith(".csv") else _read_dat
+        count = 0
+        for entry in reader(path):
+            self.add(entry)
+            count += 1
+        return count
+
+    @classmethod
+    def load_dir(cls, directory=None):
+        """Builds a catalog from every title file in a folder. Unreadable files are skipped."""
+        catalog = cls()
+        directory = directory or default_titles_dir()
+        if not os.path.isdir(directory):
+            return catalog
+        for name in sorted(os.listdir(directory)):
+            if not name.lower().endswith(TITLE_CATALOG_SUFFIXES):
+                continue
+            try:
+                catalog.load_file(os.path.join(directory, name))
+            except (ET.ParseError, ValueError, OSError, csv.Error) as e:
+                print(f"Could not load title catalog {name}: {e}")
+        return catalog
+
+    def match(self, rom_name, min_score=MIN_MATCH_SCORE):
+        """
+        Finds the catalog entry closest to a ROM filename or title.
+        Returns (entry, score) with score in [0, 1], or (None, 0.0).
+        """
+        key = make_safe_base_name(clean_rom_title(rom_name))
+        if not key:
+            return None, 0.0
+        entry_id = self.by_key.get(key)
+        if entry_id is not None:
+            return self.entries[entry_id], 1.0
+
+        grams = ngrams(key)
+        # Any title scoring min_score must share at least one of the rarest
+        # grams, so the very common ones don't need their postings walked
+        min_common = math.ceil(min_score * len(grams) / (2.0 - min_score))
+        rare_grams = sorted((g for g in grams if g in self.index), key=lambda g: len(self.index[g]))
+        shared = Counter()
+        for gram in rare_grams[:len(grams) - min_common + 1]:
+            shared.update(self.index[gram])
+
+        best_id, best_score = None, 0.0
+        for entry_id, _ in shared.most_common(MAX_CANDIDATES):
+            # Dice coefficient over the two n-gram sets
+            candidate = ngrams(self.keys[entry_id])
+            score = 2.0 * len(grams & candidate) / (len(grams) + len(candidate))
+            if score > best_score:
+                best_id, best_score = entry_id, score
+        if best_id is None or best_score < min_score:
+            return None, 0.0
+        return self.entries[best_id], best_score
+
+    def fill(self, data, min_score=MIN_MATCH_SCORE, name=None):
+        """
+        Fills the empty metadata fields of a game data dict from the best
+        match for name, defaulting to its ROM (or its title, if no ROM is
+        set). Fields the user already filled are left alone. Returns the
+        match score, or 0.0.
+        """
+        name = name or data.get("rom_path") or data.get("title")
+        if not name:
+            return 0.0
+        entry, score = self.match(name, min_score)
+        if entry is None:
+            return 0.0
+        for field in MATCH_FIELDS:
+            if entry.get(field) and not data.get(field):
+                data[field] = entry[field]
+        return score
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    if len(sys.argv) < 3:
+        print("Usage: python3 title_match.py <catalog file or folder> <rom folder>")
+        sys.exit(1)
+    catalog = TitleCatalog()
+    if os.path.isdir(sys.argv[1]):
+        catalog = TitleCatalog.load_dir(sys.argv[1])
+    else:
+        catalog.load_file(sys.argv[1])
+    rom_names = sorted(os.listdir(sys.argv[2]))
+    start = time.perf_counter()
+    results = [(name, *catalog.match(name)) for name in rom_names]
+    elapsed = time.perf_counter() - start
+    for name, entry, score in results:
+        print(f"{score:4.2f}  {name}  ->  {entry['title'] if entry else '(no match)'}")
+    matched = sum(1 for _, entry, _ in results if entry)
+    rate = len(rom_names) / elapsed if elapsed else 0
+    print(f"Matched {matched}/{len(rom_names)} ROMs against {len(catalog)} titles ({rate:.0f} ROMs/s).")
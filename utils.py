@@ -1,38 +1,269 @@
 
 from PIL import Image
+import io
 import os
+from profiling import instrumented
 
+# For compatibility with older Pillow versions
+_Resampling = Image.Resampling if hasattr(Image, "Resampling") else Image
+_Quantize = Image.Quantize if hasattr(Image, "Quantize") else Image
+_Dither = Image.Dither if hasattr(Image, "Dither") else Image
+
+
+def _pick_resample_filter(scale):
+    """Chooses the resampling filter for a given scale factor (output / input)."""
+    if scale > 1.0:
+        # Upscaling: LANCZOS only adds ringing here and costs more
+        return _Resampling.BICUBIC
+    return _Resampling.LANCZOS
+
+
+# Refuse anything bigger than this many pixels; far beyond any real box art,
+# but stops a decompression bomb from eating all memory.
+MAX_IMAGE_PIXELS = 40_000_000
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+# Magic bytes of the formats we accept, checked before Pillow sees the file.
+IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+]
+
+# The Evercade finds a game's images by these suffixes of its base name, at
+# these sizes. Boxart is written in both variants; the first is preferred.
+BOXART_SIZE = (474, 666)
+BANNER_SIZE = (1920, 551)
+BOXART_SUFFIXES = ("0_1080.png", "0.png")
+BANNER_SUFFIX = "_gamebanner.png"
+IMAGE_NAME_SUFFIXES = {"boxart": BOXART_SUFFIXES, "banner": (BANNER_SUFFIX,)}
+IMAGE_SUFFIXES = BOXART_SUFFIXES + (BANNER_SUFFIX,)
+IMAGE_SIZES = {"boxart": BOXART_SIZE, "banner": BANNER_SIZE}
+
+
+def sniff_image_format(header):
+    """Returns the image format (as a file extension) from the first bytes of a file, or None."""
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+def fit_size(image_size, size):
+    """Returns the largest size with the image's aspect ratio that fits within size."""
+    width, height = image_size
+    target_width, target_height = size
+    target_ratio = target_width / target_height
+    img_ratio = width / height
+
+    if img_ratio > target_ratio:
+        new_width = target_width
+        new_height = int(new_width / img_ratio)
+    else:
+        new_height = target_height
+        new_width = int(new_height * img_ratio)
+    return max(new_width, 1), max(new_height, 1)
+
+
+def load_image(input_path, size=None):
+    """
+    Opens, validates and normalizes an image. Returns (image, error).
+
+    The format is checked from magic bytes, oversized images are refused,
+    animations are reduced to their first frame, CMYK and palette images
+    are converted to RGB/RGBA, and metadata is stripped. Given a size,
+    JPEGs are decoded at the smallest scale that still covers it.
+    """
+    try:
+        with open(input_path, "rb") as f:
+            image_format = sniff_image_format(f.read(16))
+        if not image_format:
+            return None, f"{os.path.basename(input_path)} is not a supported image file."
+
+        img = Image.open(input_path)
+        try:
+            if img.width * img.height > MAX_IMAGE_PIXELS:
+                return None, f"Image is too large ({img.width}x{img.height})."
+            if getattr(img, "is_animated", False):
+                img.seek(0)
+            if size:
+                # The aspect ratio comes from the full-size header, so drafting doesn't change it.
+                img.draft("RGB", fit_size(img.size, size))
+
+            has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+            normalized = img.convert("RGBA" if has_alpha else "RGB") # Always a new, fully decoded image
+        finally:
+            img.close()
+
+        normalized.info = {} # Drop EXIF, ICC profiles, comments etc.
+        return normalized, None
+    except Image.DecompressionBombError:
+        return None, "Image is too large."
+    except Exception as e:
+        return None, f"Could not decode image: {e}"
+
+
+def fit_image(img, size):
+    """
+    Resizes a loaded image to the specified size, maintaining aspect ratio
+    by adding transparent letterboxing (padding).
+    """
+    target_width, target_height = size
+    new_width, new_height = fit_size(img.size, size)
+
+    # Cheap integer box-reduction first, leaving at least 2x for the final filter
+    reduce_factor = int(min(img.width / new_width, img.height / new_height) / 2)
+    if reduce_factor >= 2:
+        img = img.reduce(reduce_factor)
+
+    if img.size != (new_width, new_height):
+        img = img.resize((new_width, new_height), _pick_resample_filter(new_width / img.width))
+
+    if (new_width, new_height) == size:
+        # Already the right shape; no letterboxing needed
+        return img
+
+    background = Image.new("RGBA", size, (255, 255, 255, 0))
+    paste_x = (target_width - new_width) // 2
+    paste_y = (target_height - new_height) // 2
+    background.paste(img, (paste_x, paste_y))
+    return background
+
+
+# How boxart and banners are written to the card.
+#   quantize:       reduce to a 256-colour palette (with alpha). Lossy, but a fraction of the size.
+#   compress_level: zlib level, 0-9.
+#   zlib_strategy:  zlib strategy passed to the encoder (None for the default; 1 = FILTERED, 3 = RLE).
+#   optimize:       let the encoder search for the smallest output (slow).
+#   report_savings: also encode a plain Pillow PNG to report the bytes saved (doubles encode time).
+DEFAULT_PNG_OPTIONS = {
+    "quantize": False,
+    "compress_level": 6, # zlib's default; 9 costs several times the CPU for a few percent
+    "zlib_strategy": None,
+    "optimize": False,
+    "report_savings": False,
+}
+
+# Names accepted for zlib_strategy on the command line
+ZLIB_STRATEGIES = {"default": None, "filtered": 1, "huffman": 2, "rle": 3, "fixed": 4}
+
+
+def _reduce_png_mode(img, quantize):
+    """Picks the cheapest pixel format that represents the image (exactly, unless quantize is set)."""
+    if img.mode == "RGBA" and img.getchannel("A").getextrema() == (255, 255):
+        img = img.convert("RGB") # Alpha carries no information
+    if quantize:
+        method = _Quantize.FASTOCTREE if img.mode == "RGBA" else _Quantize.MEDIANCUT
+        return img.quantize(colors=256, method=method)
+    if img.mode == "RGB":
+        colors = img.getcolors(256)
+        if colors is not None:
+            # Few enough colours for an exact palette
+            palette = Image.new("P", (1, 1))
+            palette.putpalette([channel for _, rgb in colors for channel in rgb])
+            return img.quantize(palette=palette, dither=_Dither.NONE)
+    return img
+
+
+def encode_png(img, options=None):
+    """Returns the image encoded as PNG bytes using the given output options."""
+    options = dict(DEFAULT_PNG_OPTIONS, **(options or {}))
+    img = _reduce_png_mode(img, options["quantize"])
+    save_args = {"compress_level": options["compress_level"], "optimize": options["optimize"]}
+    if options["zlib_strategy"] is not None:
+        save_args["compress_type"] = options["zlib_strategy"]
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG", **save_args)
+    return buffer.getvalue()
+
+
+def optimize_png(img, options=None):
+    """
+    Encodes the image with the given output options and returns
+    (png_bytes, bytes_saved). bytes_saved compares with a plain Pillow PNG
+    save and is only measured with the report_savings option; otherwise None.
+    """
+    data = encode_png(img, options)
+    if not (options or {}).get("report_savings"):
+        return data, None
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return data, len(buffer.getvalue()) - len(data)
+
+
+@instrumented()
 def resize_image(input_path, output_path, size):
     """
     Resizes an image to the specified size, maintaining aspect ratio
     by adding transparent letterboxing (padding).
     """
+    img, error = load_image(input_path, size)
+    if error:
+        print(f"Error resizing image: {error}")
+        return False
     try:
-        with Image.open(input_path) as img:
-            img = img.convert("RGBA")
-
-            target_width, target_height = size
-            target_ratio = target_width / target_height
-            img_ratio = img.width / img.height
-
-            if img_ratio > target_ratio:
-                new_width = target_width
-                new_height = int(new_width / img_ratio)
-            else:
-                new_height = target_height
-                new_width = int(new_height * img_ratio)
-
-            # For compatibility with older Pillow versions
-            resample_filter = Image.Resampling.LANCZOS if hasattr(Image, "Resampling") else Image.LANCZOS
-            resized_img = img.resize((new_width, new_height), resample_filter)
-
-            background = Image.new("RGBA", size, (255, 255, 255, 0))
-            paste_x = (target_width - new_width) // 2
-            paste_y = (target_height - new_height) // 2
-            background.paste(resized_img, (paste_x, paste_y))
-
-            background.save(output_path, "PNG")
+        png_bytes = encode_png(fit_image(img, size))
+        with open(output_path, "wb") as f:
+            f.write(png_bytes)
         return True
     except Exception as e:
         print(f"Error resizing image: {e}")
         return False
+
+
+def make_thumbnail(input_path, size):
+    """
+    Returns PNG bytes of the image shrunk to fit within size, or None if
+    the image can't be read.
+    """
+    img, error = load_image(input_path, size)
+    if error:
+        print(f"Error creating thumbnail: {error}")
+        return None
+    try:
+        img.thumbnail(size)
+        return encode_png(img)
+    except Exception as e:
+        print(f"Error creating thumbnail: {e}")
+        return None
+
+
+def atomic_write(path, data):
+    """
+    Writes bytes or text to path through a temp file in the same directory
+    and a rename, so a crash or a pulled card never leaves a half-written file.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+APP_DIR_NAME = "eversd_manager"
+
+
+def data_dir(*parts):
+    """Returns a path under the app's XDG data directory (~/.local/share/eversd_manager)."""
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(data_home, APP_DIR_NAME, *parts)
+
+
+def cache_dir(*parts):
+    """Returns a path under the app's XDG cache directory (~/.cache/eversd_manager)."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, APP_DIR_NAME, *parts)